@@ -13,7 +13,15 @@ PATH_ROOT = Path(__file__).parents[1]
 # # Path to the data folders
 PATH_DATA           = Path(PATH_ROOT, 'data')
 PATH_DATA_RAW       = Path(PATH_DATA, 'raw')
+PATH_DATA_INTERIM   = Path(PATH_DATA, 'interim')
+PATH_DATA_HASHED    = Path(PATH_DATA_INTERIM, 'hashed')
+PATH_DATA_SCORES    = Path(PATH_DATA_INTERIM, 'sentence_scores.sqlite')
+PATH_DATA_FIN_CACHE = Path(PATH_DATA_INTERIM, 'financials.csv')
 PATH_DATA_PROCESSED = Path(PATH_DATA, 'processed')
+PATH_DATA_SENTENCES = Path(PATH_DATA_PROCESSED, 'sentences')
+PATH_DATA_LEASES    = Path(PATH_DATA, 'leases')
+PATH_DATA_CATALOG   = Path(PATH_DATA, 'catalog.sqlite')
+PATH_DATA_FIN_DB    = Path(PATH_DATA, 'financials.sqlite')
 
 # Path to the model folder
 PATH_MODELS         = Path(PATH_ROOT, 'models')
@@ -22,6 +30,7 @@ PATH_MODELS         = Path(PATH_ROOT, 'models')
 PATH_REP            = Path(PATH_ROOT, 'reports')
 PATH_REP_DAT        = Path(PATH_REP, 'data')
 PATH_REP_FIG        = Path(PATH_REP, 'figures')
+PATH_REP_PROF       = Path(PATH_REP, 'profiles')
 PATH_REP_HTML       = Path(PATH_REP, 'html')
 PATH_REP_PDF        = Path(PATH_REP, 'pdf')
 PATH_REP_TEMPL      = Path(PATH_REP, 'templates')
@@ -0,0 +1,153 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Runs the stages of the project in a single process.
+
+Usage::
+
+    python -m src {dataset,plot,evaluate,predict,all} [--force] [--profile]
+
+All the stages share the loaded state: the processed files are globbed
+once, the data frames are loaded once, and the estimators fitted by the
+evaluation are reused for the prediction.
+"""
+
+# -------------------------------------------------------------------------
+#   Author(s): Christoph Jaeggli
+#   Institute: (None)
+#
+#   MIT License
+#   Copyright (c) 2020 Christoph Jaeggli
+#
+#   This program is distributed in the hope that it will be useful, but
+#   WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+
+# Standard library
+import argparse
+# Third party requirements
+# Local imports
+from src._paths import PATH_DATA_RAW
+from src.data._catalog import get_processed_files
+from src._settings import PATTERNS_OF_INTEREST
+import src.profiling as prof
+
+# Constants
+_STAGES = ['dataset', 'plot', 'evaluate', 'predict']
+
+
+class PipelineState:
+    """Loaded state that is shared between the stages. Everything is loaded
+    lazily on first use and kept until `invalidate` is called.
+    """
+
+    def __init__(self, patterns=None):
+        self.patterns = PATTERNS_OF_INTEREST if patterns is None else patterns
+        self.fitted = {}
+        self._files = None
+        self._df = {}
+
+    @property
+    def files(self):
+        """Processed .json files (c.f. `get_processed_files`)."""
+        if self._files is None:
+            self._files = get_processed_files()
+        return self._files
+
+    def get_df(self, normalized):
+        """Returns the (normalized) data frame (c.f. `utl.load_data`)."""
+        import src.utils as utl
+        if normalized not in self._df:
+            self._df[normalized] = utl.load_data(self.files, self.patterns,
+                                                 normalized=normalized)
+        return self._df[normalized]
+
+    def invalidate(self):
+        """Drops everything that depends on the processed files."""
+        self.fitted = {}
+        self._files = None
+        self._df = {}
+
+
+def run_dataset(state, args):
+    """Stage 'dataset' (c.f. `src/data/make_dataset.py`)."""
+    from src.data.make_dataset import get_raw_file_pairs, make_dataset,\
+        make_dataset_pipeline, print_pipeline_stats
+
+    pairs = get_raw_file_pairs(PATH_DATA_RAW)
+    if args.pipeline:
+        print_pipeline_stats(make_dataset_pipeline(pairs))
+    else:
+        make_dataset(pairs)
+    state.invalidate()
+
+
+def run_plot(state, args):
+    """Stage 'plot' (c.f. `src/visualization/plot_past_evolution.py`)."""
+    from src.visualization.plot_past_evolution import plot_past_evolution
+
+    df = state.get_df(normalized=False)
+    nrend = plot_past_evolution(df, state.patterns, batch=True,
+                                force=args.force)
+    print(f'Rendered {nrend} figures')
+
+
+def run_evaluate(state, args):
+    """Stage 'evaluate' (c.f. `src/visualization/print_clf_performance.py`)."""
+    from src.visualization.print_clf_performance import _CLF, _NPAST,\
+        _NKFOLD, evaluate_classifiers, print_results
+
+    df = state.get_df(normalized=True)
+    results = evaluate_classifiers(df, _CLF, _NPAST, _NKFOLD,
+                                   fitted=state.fitted)
+    print_results(results)
+
+
+def run_predict(state, args):
+    """Stage 'predict' (c.f. `src/visualization/plot_profit_prediction.py`).
+    """
+    import matplotlib.pyplot as plt
+    from sklearn.ensemble import BaggingRegressor
+    from src.visualization.plot_profit_prediction import _NPAST,\
+        predict_and_plot
+
+    df = state.get_df(normalized=True)
+    clf = state.fitted.get(('BaggingRegressor', _NPAST), BaggingRegressor())
+    predict_and_plot(df, clf, _NPAST, force=args.force)
+    plt.close('all')
+
+
+_RUN = {
+    'dataset':  run_dataset,
+    'plot':     run_plot,
+    'evaluate': run_evaluate,
+    'predict':  run_predict,
+}
+
+
+def _parse_args():
+    """Parses the command line arguments."""
+    parser = argparse.ArgumentParser(
+        prog='python -m src', description=__doc__.split('\n')[0])
+    parser.add_argument('stage', choices=_STAGES + ['all'],
+                        help="stage to run, 'all' runs all of them")
+    parser.add_argument('--force', action='store_true',
+                        help='render also the figures that are up to date')
+    parser.add_argument('--pipeline', action='store_true',
+                        help="use the asyncio pipeline in stage 'dataset'")
+    prof.add_profile_argument(parser)
+    return parser.parse_args()
+
+
+if __name__ == '__main__':
+    import matplotlib
+    matplotlib.use('Agg')
+
+    arguments = _parse_args()
+    stages = _STAGES if arguments.stage == 'all' else [arguments.stage]
+
+    pipeline_state = PipelineState()
+    with prof.profile('src', arguments.profile):
+        for stage in stages:
+            print(f'\n=== {stage} ===')
+            with prof.stage(stage):
+                _RUN[stage](pipeline_state, arguments)
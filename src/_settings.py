@@ -10,11 +10,90 @@ PATTERNS_OF_INTEREST = [
     r'mitarbeite(n|nd|r|rin|rinnen)',
     r'kunde[n]?',
 ]
+
+# Store only running statistics and some example sentences per pattern in the
+# processed data sets (instead of all the matching sentences)
+MOOD_SUMMARY = False
+MOOD_NSAMPLES = 5
+
+# Reuse the scores of sentences (exact and near duplicates) seen in previous
+# runs (c.f. `src/features/_sentence_dedup.py`): minimal estimated Jaccard
+# similarity of the word bigrams, MinHash signature length, and LSH bands
+MOOD_DEDUP = False
+DEDUP_THRESHOLD = 0.8
+DEDUP_NPERM = 64
+DEDUP_NBANDS = 16
+
+# Write the sentences with their pages, pattern hits, and scores as Arrow IPC
+# files (c.f. `src/features/_sentence_store.py`, needs pyarrow)
+SENTENCE_STORE = False
+
+# Backend of the pdf text extraction ('fitz', 'PyPDF2', or 'auto'). 'auto'
+# reads with the fastest backend first and reads the pages of poor quality
+# again with the next one (c.f. `src/features/_text_quality.py`): minimal
+# number of characters, maximal share of replacement characters, and minimal
+# share of letters and digits per page, and the share of poor pages above
+# which the whole document is read again
+PDF_BACKEND = 'fitz'
+PDF_MIN_CHARS = 20
+PDF_MAX_REPLACEMENT = 0.01
+PDF_MIN_ALNUM = 0.5
+PDF_MAX_POOR = 0.5
+
+# Skip pages with little prose (tables, financial statements) before the NLP
+# (c.f. `src/features/_page_filter.py`): minimal share of alphabetic tokens,
+# minimal number of words, and maximal share of table-cell text blocks
+PAGE_FILTER = False
+PAGE_MIN_ALPHA = 0.6
+PAGE_MIN_WORDS = 20
+PAGE_MAX_CELLS = 0.7
+
+# Approximate word counts of `print_word_counts.py --approx` (c.f.
+# `src/features/_word_sketch.py`): relative error bound, probability of
+# exceeding it, and number of tracked most frequent words
+WORD_SKETCH_EPSILON = 1e-4
+WORD_SKETCH_DELTA = 1e-3
+WORD_SKETCH_NTOP = 1000
+
+# Sentence splitting backend ('punkt' or 'german') and additional
+# abbreviations for the 'german' splitter
+SENTENCE_SPLITTER = 'punkt'
+SENTENCE_ABBREVIATIONS = []
+
+# Hashed text features (c.f. `src/features/build_hashed_features.py`): number
+# of hash buckets and number of sentences vectorized at once
+TEXT_HASH_NFEATURES = 2**12
+TEXT_HASH_BATCH = 1000
+
+# Source of the financial metadata (premium, profit, equity): 'json' reads the
+# raw .json file of each report, 'sql' queries the table `FIN_TABLE` on the
+# SQL server of `_user.py` (needs pyodbc), and 'sqlite' the same table in a
+# local stand-in database (c.f. `src/data/_financials.py`)
+FIN_SOURCE = 'json'
+FIN_TABLE = 'Financials'
+FIN_POOL_SIZE = 2
+
+# Local NLP service (c.f. `src/nlp_service.py`)
+NLP_SERVICE_HOST = '127.0.0.1'
+NLP_SERVICE_PORT = 8765
+
+# Profiling of the scripts (c.f. `src/profiling.py`): environment switch,
+# sampling interval in seconds, and packages whose time is reported
+PROFILE_ENV = 'JFF_PROFILE'
+PROFILE_INTERVAL = 0.005
+PROFILE_PACKAGES = {
+    'TextBlobDE':   ('textblob_de', 'textblob'),
+    'spaCy':        ('spacy', 'thinc'),
+    'fitz':         ('fitz', 'pymupdf'),
+}
+
+DF_COL_COMPANY = 'Company'
 DF_COL_YEAR = 'Year'
 DF_COL_PROFIT = 'Profit'
 DF_COL_NWORDS = 'NWords'
 DF_COL_COUNT = 'Count_'
 DF_COL_POL = 'Polarity_'
+DF_COL_HASH = 'Hash_'
 
 # Normalizing profit
 PROFIT_NORMALIZATION = int(1e6)
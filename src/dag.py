@@ -0,0 +1,411 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Declarative stage graph that rebuilds only the stale outputs.
+
+Usage::
+
+    python -m src.dag [--force] [--dry-run] [--nprocs N]
+
+Each stage declares its input files, its output files, the settings it
+depends on, and the stages it depends on:
+
+    extract     data/raw/*.pdf              -> data/interim/{,pages/}*.json
+    mood        data/interim/*.json,
+                data/interim/pages/*.json,
+                data/raw/*.json,
+                data/financials.sqlite      -> data/processed/*.json
+    features    data/processed/*.json       -> reports/data/features*.csv
+    evaluate    features                    -> reports/data/clf_performance.csv
+    figures     features                    -> reports/figures/{Count,...}.svg
+    prediction  features                    -> reports/figures/Prediction.svg
+    report      features, evaluate, figures,
+                prediction                  -> reports/html/report.html
+
+A stage is rebuilt if one of its outputs is missing, or if the fingerprint
+of its input files (content hashes) and settings differs from the one that
+was stored after its last run (in `data/.dag_state.json`). Stages whose
+dependencies are done run in parallel processes. Note that changes of the
+code itself are not tracked, use `--force` in that case (it re-renders the
+figures and the report sections as well, even if their own fingerprints
+match). Neither are the financial metadata on the SQL server
+(`FIN_SOURCE = 'sql'`).
+"""
+
+# -------------------------------------------------------------------------
+#   Author(s): Christoph Jaeggli
+#   Institute: (None)
+#
+#   MIT License
+#   Copyright (c) 2020 Christoph Jaeggli
+#
+#   This program is distributed in the hope that it will be useful, but
+#   WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+
+# Standard library
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from pathlib import Path
+import argparse
+import hashlib
+import json
+import time
+# Third party requirements
+# Local imports
+from src._paths import PATH_DATA, PATH_DATA_RAW, PATH_DATA_INTERIM,\
+    PATH_DATA_PROCESSED, PATH_DATA_FIN_DB, PATH_REP_DAT, PATH_REP_FIG,\
+    PATH_REP_HTML, PATH_REP_TEMPL
+import src._settings as settings
+
+# Constants
+_STATE_FILE = Path(PATH_DATA, '.dag_state.json')
+_FEATURES = 'features'
+_FEATURES_NORMALIZED = 'features_normalized'
+_CLF_PERFORMANCE = 'clf_performance'
+_HASH_BLOCKSIZE = 1 << 20
+
+
+class Stage:
+    """Node of the stage graph.
+
+    Args:
+        name (str): Name of the stage.
+        run (callable): Function that builds the outputs, called with the
+            argument `force` (rebuild even the outputs that are cached by
+            the function itself, e.g. figures and report fragments).
+        inputs (list of tuple): Input files as `(folder, glob pattern)`.
+        outputs (list of tuple): Output files as `(folder, glob pattern)`,
+            each pattern has to match at least one file after the run.
+        settings (list of str): Names of the settings in `src._settings`
+            the stage depends on.
+        deps (list of str): Names of the stages that have to run before.
+    """
+
+    def __init__(self, name, run, inputs, outputs, settings=(), deps=()):
+        self.name = name
+        self.run = run
+        self.inputs = list(inputs)
+        self.outputs = list(outputs)
+        self.settings = list(settings)
+        self.deps = list(deps)
+
+    def get_input_files(self):
+        """Returns the sorted list of the current input files."""
+        files = set()
+        for folder, pattern in self.inputs:
+            files.update(Path(folder).glob(pattern))
+        return sorted(files)
+
+    def has_outputs(self):
+        """Checks whether every output pattern matches at least one file."""
+        return all(any(Path(folder).glob(pattern))
+                   for folder, pattern in self.outputs)
+
+
+def build(stages, force=False, dry_run=False, nprocs=None):
+    """Runs the stale stages of the graph, independent stages in parallel.
+
+    Args:
+        stages (list of Stage): Stage graph.
+        force (bool, optional): Rebuild all the stages.
+        dry_run (bool, optional): Only print which stages would run (assuming
+            that the upstream stages do not change their outputs).
+        nprocs (int, optional): Maximal number of stages running in parallel.
+
+    Returns:
+        list of str: Names of the stages that have been run.
+    """
+    by_name = {stage.name: stage for stage in stages}
+    for stage in stages:
+        unknown = [dep for dep in stage.deps if dep not in by_name]
+        if unknown:
+            raise ValueError(f"Stage '{stage.name}' depends on unknown "
+                             f"stage(s) {unknown}.")
+
+    state = _load_state()
+    hashes = state.setdefault('hashes', {})
+    fingerprints = state.setdefault('stages', {})
+
+    done, running, ran = set(), {}, []
+    with ProcessPoolExecutor(max_workers=nprocs,
+                             initializer=_init_worker) as executor:
+        while len(done) < len(stages):
+            # Submit all stages whose dependencies are done
+            ready = [s for s in stages if s.name not in done
+                     and s.name not in running.values()
+                     and all(dep in done for dep in s.deps)]
+            for stage in ready:
+                fingerprint = _get_fingerprint(stage, hashes)
+                stale = (force or not stage.has_outputs()
+                         or fingerprints.get(stage.name) != fingerprint
+                         or (dry_run and any(dep in ran
+                                             for dep in stage.deps)))
+                if not stale:
+                    print(f'{stage.name:12} up to date')
+                    done.add(stage.name)
+                elif dry_run:
+                    print(f'{stage.name:12} would run')
+                    ran.append(stage.name)
+                    done.add(stage.name)
+                else:
+                    print(f'{stage.name:12} started')
+                    future = executor.submit(_run_stage, stage.run, force)
+                    running[future] = stage.name
+
+            if not running:
+                if len(done) < len(stages) and not ready:
+                    raise RuntimeError('The stage graph contains a cycle.')
+                continue
+
+            # Wait for the next finished stage
+            finished, _ = wait(list(running), return_when=FIRST_COMPLETED)
+            for future in finished:
+                name = running.pop(future)
+                elapsed = future.result()
+                stage = by_name[name]
+                if not stage.has_outputs():
+                    raise RuntimeError(f"Stage '{name}' did not produce all "
+                                       f"of its outputs.")
+                fingerprints[name] = _get_fingerprint(stage, hashes)
+                _save_state(state)
+                print(f'{name:12} done ({elapsed:.1f}s)')
+                ran.append(name)
+                done.add(name)
+
+    return ran
+
+
+def get_stages():
+    """Returns the stage graph of the project.
+
+    Returns:
+        list of Stage: Stages.
+    """
+    return [
+        Stage('extract', _run_extract,
+              inputs=[(PATH_DATA_RAW, '*.pdf')],
+              outputs=[(PATH_DATA_INTERIM, '*.json')],
+              settings=['SENTENCE_SPLITTER', 'SENTENCE_ABBREVIATIONS',
+                        'PAGE_FILTER', 'PAGE_MIN_ALPHA', 'PAGE_MIN_WORDS',
+                        'PAGE_MAX_CELLS', 'PDF_BACKEND', 'PDF_MIN_CHARS',
+                        'PDF_MAX_REPLACEMENT', 'PDF_MIN_ALNUM',
+                        'PDF_MAX_POOR']),
+        Stage('mood', _run_mood,
+              inputs=[(PATH_DATA_INTERIM, '*.json'),
+                      (PATH_DATA_INTERIM, 'pages/*.json'),
+                      (PATH_DATA_RAW, '*.json'),
+                      (PATH_DATA_FIN_DB.parent, PATH_DATA_FIN_DB.name)],
+              outputs=[(PATH_DATA_PROCESSED, '*.json')],
+              settings=['PATTERNS_OF_INTEREST', 'MOOD_SUMMARY',
+                        'MOOD_NSAMPLES', 'SEED', 'MOOD_DEDUP',
+                        'DEDUP_THRESHOLD', 'DEDUP_NPERM', 'DEDUP_NBANDS',
+                        'FIN_SOURCE', 'FIN_TABLE', 'SENTENCE_STORE'],
+              deps=['extract']),
+        Stage('features', _run_features,
+              inputs=[(PATH_DATA_PROCESSED, '*.json')],
+              outputs=[(PATH_REP_DAT, f'{_FEATURES}.csv'),
+                       (PATH_REP_DAT, f'{_FEATURES_NORMALIZED}.csv')],
+              settings=['PATTERNS_OF_INTEREST', 'PROFIT_NORMALIZATION'],
+              deps=['mood']),
+        Stage('evaluate', _run_evaluate,
+              inputs=[(PATH_REP_DAT, f'{_FEATURES_NORMALIZED}.csv')],
+              outputs=[(PATH_REP_DAT, f'{_CLF_PERFORMANCE}.csv')],
+              settings=['SEED'],
+              deps=['features']),
+        Stage('figures', _run_figures,
+              inputs=[(PATH_REP_DAT, f'{_FEATURES}.csv')],
+              outputs=[(PATH_REP_FIG, 'Profit.svg')],
+              settings=['PATTERNS_OF_INTEREST', 'CLR_CHART_12', 'FONTSIZE',
+                        'MARKERSIZE', 'LINEWIDTH'],
+              deps=['features']),
+        Stage('prediction', _run_prediction,
+              inputs=[(PATH_REP_DAT, f'{_FEATURES_NORMALIZED}.csv')],
+              outputs=[(PATH_REP_FIG, 'Prediction.svg')],
+              settings=['SEED', 'CLR_CHART_02', 'CLR_CHART_12', 'FONTSIZE',
+                        'MARKERSIZE', 'LINEWIDTH'],
+              deps=['features']),
+        Stage('report', _run_report,
+              inputs=[(PATH_REP_DAT, f'{_FEATURES}.csv'),
+                      (PATH_REP_DAT, f'{_CLF_PERFORMANCE}.csv'),
+                      (PATH_REP_FIG, '*.svg'),
+                      (PATH_REP_TEMPL, '*.html')],
+              outputs=[(PATH_REP_HTML, 'report.html')],
+              settings=['PATTERNS_OF_INTEREST'],
+              deps=['evaluate', 'figures', 'prediction']),
+    ]
+
+
+# Private functions
+def _get_fingerprint(stage, hashes):
+    """Fingerprint of the input files and the settings of a stage."""
+    files = {str(file): _hash_file(file, hashes)
+             for file in stage.get_input_files()}
+    values = {name: getattr(settings, name) for name in stage.settings}
+    content = json.dumps([files, values], sort_keys=True, default=str)
+    return hashlib.sha256(content.encode('utf-8')).hexdigest()
+
+
+def _hash_file(file, hashes):
+    """Content hash of a file, reused as long as size and mtime agree."""
+    stat = file.stat()
+    key = str(file)
+    cached = hashes.get(key)
+    if cached is not None and cached[:2] == [stat.st_size, stat.st_mtime_ns]:
+        return cached[2]
+
+    sha = hashlib.sha256()
+    with open(file, 'rb') as bfile:
+        for block in iter(lambda: bfile.read(_HASH_BLOCKSIZE), b''):
+            sha.update(block)
+    hashes[key] = [stat.st_size, stat.st_mtime_ns, sha.hexdigest()]
+    return hashes[key][2]
+
+
+def _load_state():
+    """Loads the stored fingerprints."""
+    try:
+        with open(_STATE_FILE, 'r') as sfile:
+            return json.load(sfile)
+    except FileNotFoundError:
+        return {}
+
+
+def _save_state(state):
+    """Stores the fingerprints (atomically)."""
+    Path(PATH_DATA).mkdir(parents=True, exist_ok=True)
+    tmp = _STATE_FILE.with_suffix('.tmp')
+    with open(tmp, 'w') as sfile:
+        json.dump(state, sfile)
+    tmp.replace(_STATE_FILE)
+
+
+def _init_worker():
+    """Prepares a worker process for headless rendering."""
+    import matplotlib
+    matplotlib.use('Agg')
+
+
+def _run_stage(run, force=False):
+    """Runs a stage function and returns the elapsed time."""
+    tic = time.perf_counter()
+    run(force=force)
+    return time.perf_counter() - tic
+
+
+def _read_features(name):
+    """Reads a feature table written by the stage 'features'."""
+    import pandas as pd
+    return pd.read_csv(Path(PATH_REP_DAT, name).with_suffix('.csv'),
+                       index_col=[0, 1])
+
+
+def _run_extract(force=False):
+    """Stage 'extract': caches the sentences of each pdf file (of the prose
+    pages only if `PAGE_FILTER` is set, as in `make_dataset.py`).
+    """
+    import src.utils as utl
+    from src.data.make_dataset import get_raw_file_pairs, save_sentences
+
+    for pdf_file, _ in get_raw_file_pairs(PATH_DATA_RAW):
+        document = utl.read_pdf(PATH_DATA_RAW, pdf_file.stem,
+                                layout=settings.PAGE_FILTER)
+        if settings.PAGE_FILTER:
+            document = utl.filter_pages(document)
+        sentences, pages = utl.get_sentences_from_document(document,
+                                                           pages=True)
+        save_sentences(pdf_file.stem, sentences, pages)
+
+
+def _run_mood(force=False):
+    """Stage 'mood': scores the cached sentences (reusing the scores of
+    duplicates if `MOOD_DEDUP` is set, with the financial metadata of
+    `FIN_SOURCE`, and writing the sentence files if `SENTENCE_STORE` is set,
+    as in `make_dataset.py`).
+    """
+    from src.data._catalog import Catalog
+    from src.data.make_dataset import get_raw_file_pairs, load_pages,\
+        load_sentences, save_dataset, score_sentences, _get_deduplicator,\
+        _get_raw_datasets, _write_sentence_file
+
+    pairs = get_raw_file_pairs(PATH_DATA_RAW)
+    catalog = Catalog()
+    catalog.register(pairs)
+    dedup = _get_deduplicator() if settings.MOOD_DEDUP else None
+    datasets = _get_raw_datasets(pairs, settings.FIN_SOURCE)
+    for pdf_file, json_file in pairs:
+        data = datasets.get(pdf_file.stem)
+        if data is None:
+            with open(str(json_file), 'r') as jfile:
+                data = json.load(jfile)
+        sentences = load_sentences(pdf_file.stem)
+        scores = {} if settings.SENTENCE_STORE else None
+        score_sentences(data, sentences, dedup=dedup, scores=scores)
+        save_dataset(pdf_file.stem, data)
+        if settings.SENTENCE_STORE:
+            _write_sentence_file(pdf_file.stem, data, sentences,
+                                 load_pages(pdf_file.stem), scores)
+        catalog.set_status(pdf_file.stem, 'processed')
+
+
+def _run_features(force=False):
+    """Stage 'features': writes the feature tables."""
+    import src.utils as utl
+
+    files = sorted(Path(PATH_DATA_PROCESSED).glob('*.json'))
+    Path(PATH_REP_DAT).mkdir(parents=True, exist_ok=True)
+    for name, normalized in [(_FEATURES, False), (_FEATURES_NORMALIZED, True)]:
+        df = utl.load_data(files, settings.PATTERNS_OF_INTEREST,
+                           normalized=normalized)
+        df.to_csv(Path(PATH_REP_DAT, name).with_suffix('.csv'))
+
+
+def _run_evaluate(force=False):
+    """Stage 'evaluate': writes the performance of the classifiers."""
+    import pandas as pd
+    from src.visualization.print_clf_performance import _CLF, _NPAST,\
+        _NKFOLD, evaluate_classifiers
+
+    df = _read_features(_FEATURES_NORMALIZED)
+    results = evaluate_classifiers(df, _CLF, _NPAST, _NKFOLD)
+    results = pd.DataFrame(results, columns=['Name', 'Profit', 'RMSE', 'R2'])
+    results.to_csv(Path(PATH_REP_DAT, _CLF_PERFORMANCE).with_suffix('.csv'),
+                   index=False)
+
+
+def _run_figures(force=False):
+    """Stage 'figures': plots the past evolution."""
+    from src.visualization.plot_past_evolution import plot_past_evolution
+
+    df = _read_features(_FEATURES)
+    plot_past_evolution(df, settings.PATTERNS_OF_INTEREST, batch=True,
+                        force=force)
+
+
+def _run_prediction(force=False):
+    """Stage 'prediction': plots the profit prediction."""
+    import matplotlib.pyplot as plt
+    from src.visualization.plot_profit_prediction import predict_and_plot
+
+    df = _read_features(_FEATURES_NORMALIZED)
+    predict_and_plot(df, force=force)
+    plt.close('all')
+
+
+def _run_report(force=False):
+    """Stage 'report': builds the HTML report."""
+    from src.visualization.build_html_report import build_report
+
+    build_report(force=force)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--force', action='store_true',
+                        help='rebuild all the stages')
+    parser.add_argument('--dry-run', action='store_true',
+                        help='only print which stages are stale')
+    parser.add_argument('--nprocs', type=int, default=None,
+                        help='maximal number of stages running in parallel')
+    args = parser.parse_args()
+
+    build(get_stages(), force=args.force, dry_run=args.dry_run,
+          nprocs=args.nprocs)
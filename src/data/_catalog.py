@@ -0,0 +1,240 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Defines a SQLite catalog of the raw and processed documents.
+"""
+
+# -------------------------------------------------------------------------
+#   Authors: Christoph Jaeggli
+#   Institute: (None)
+#
+#   MIT License
+#   Copyright (c) 2020 Christoph Jaeggli
+#
+#   This program is distributed in the hope that it will be useful, but
+#   WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+
+
+# Standard library
+from contextlib import closing
+from pathlib import Path
+import hashlib
+import sqlite3
+import time
+# Third party requirements
+# Local imports
+from src._paths import PATH_DATA_CATALOG, PATH_DATA_PROCESSED
+
+# Constants
+_TIMEOUT = 30.
+_CHUNK_SIZE = 1 << 20
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS documents (
+    filename        TEXT PRIMARY KEY,
+    company         TEXT,
+    year            INTEGER,
+    pdf_file        TEXT,
+    json_file       TEXT,
+    pdf_size        INTEGER,
+    pdf_mtime       REAL,
+    pdf_sha256      TEXT,
+    json_size       INTEGER,
+    json_mtime      REAL,
+    json_sha256     TEXT,
+    npages          INTEGER,
+    backend         TEXT,
+    elapsed         REAL,
+    status          TEXT NOT NULL DEFAULT 'pending',
+    error           TEXT,
+    updated         REAL
+);
+CREATE INDEX IF NOT EXISTS documents_company_year
+    ON documents (company, year);
+CREATE INDEX IF NOT EXISTS documents_status
+    ON documents (status, company, year);
+"""
+
+
+class Catalog:
+    """Records for each document (keyed by the file name without suffix)
+    company, year, hashes of the raw files, page count, extraction backend,
+    processing time, and status.
+
+    The status is one of 'pending', 'processing', 'processed', or 'failed'.
+    A document that changed since it has been processed (different hash of
+    the pdf or the metadata) is pending again, hence an interrupted run can
+    be resumed by processing the pending documents only (c.f. `get_pending`).
+
+    Each call opens its own short connection, such that the catalog can be
+    used from several threads and processes at once.
+
+    Args:
+        path (Path, optional): SQLite database file.
+    """
+
+    def __init__(self, path=PATH_DATA_CATALOG):
+        self._path = Path(path)
+        self._path.parent.mkdir(parents=True, exist_ok=True)
+        with closing(self._connect()) as con, con:
+            con.executescript(_SCHEMA)
+
+    def register(self, pairs):
+        """Adds or updates the raw files. The hashes are only recomputed if
+        the size or the modification time of a file has changed.
+
+        Args:
+            pairs (list of tuple): Pairs of .pdf and .json files (c.f.
+                `make_dataset.get_raw_file_pairs`).
+
+        Returns:
+            int: Number of new or changed documents.
+        """
+        nchanged = 0
+        with closing(self._connect()) as con, con:
+            for pdf_file, json_file in pairs:
+                filename = pdf_file.stem
+                row = con.execute('SELECT * FROM documents WHERE filename = ?',
+                                  (filename,)).fetchone()
+                pdf = _get_file_info(pdf_file, row, 'pdf')
+                jsn = _get_file_info(json_file, row, 'json')
+
+                changed = row is None or \
+                    pdf['sha256'] != row['pdf_sha256'] or \
+                    jsn['sha256'] != row['json_sha256']
+                status = 'pending' if changed else row['status']
+                nchanged += changed
+
+                company, year = _split_filename(filename)
+                con.execute(
+                    'INSERT OR REPLACE INTO documents (filename, company, '
+                    'year, pdf_file, json_file, pdf_size, pdf_mtime, '
+                    'pdf_sha256, json_size, json_mtime, json_sha256, npages, '
+                    'backend, elapsed, status, error, updated) VALUES '
+                    '(?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                    (filename, company, year, str(pdf_file), str(json_file),
+                     pdf['size'], pdf['mtime'], pdf['sha256'],
+                     jsn['size'], jsn['mtime'], jsn['sha256'],
+                     None if changed else row['npages'],
+                     None if changed else row['backend'],
+                     None if changed else row['elapsed'],
+                     status, None if changed else row['error'], time.time()))
+        return nchanged
+
+    def get_pending(self, pairs):
+        """Returns the pairs that are not processed (or whose processed file
+        is missing), i.e. the remaining work of an interrupted run.
+        """
+        processed = {row['filename'] for row in self.select(status='processed')
+                     if _get_processed_file(row['filename']).exists()}
+        return [pair for pair in pairs if pair[0].stem not in processed]
+
+    def select(self, company=None, first=None, last=None, status=None):
+        """Returns the documents of a company and a range of years, ordered
+        by company and year.
+
+        Args:
+            company (str, optional): Company, default is all.
+            first (int, optional): First year (inclusive).
+            last (int, optional): Last year (inclusive).
+            status (str, optional): Status, default is any.
+
+        Returns:
+            list of dict: Catalog entries.
+        """
+        clauses, params = [], []
+        for clause, value in [('company = ?', company), ('year >= ?', first),
+                              ('year <= ?', last), ('status = ?', status)]:
+            if value is not None:
+                clauses.append(clause)
+                params.append(value)
+        where = f'WHERE {" AND ".join(clauses)}' if clauses else ''
+
+        with closing(self._connect()) as con:
+            rows = con.execute(f'SELECT * FROM documents {where} '
+                               f'ORDER BY company, year', params).fetchall()
+        return [dict(row) for row in rows]
+
+    def set_status(self, filename, status, **fields):
+        """Sets the status of a document together with some other columns
+        (e.g. `npages`, `backend`, `elapsed`, or `error`).
+        """
+        company, year = _split_filename(filename)
+        columns = ['status', 'updated'] + list(fields)
+        values = [status, time.time()] + list(fields.values())
+        assignments = ', '.join(f'{col} = ?' for col in columns)
+        with closing(self._connect()) as con, con:
+            con.execute('INSERT OR IGNORE INTO documents (filename, company, '
+                        'year) VALUES (?, ?, ?)', (filename, company, year))
+            con.execute(f'UPDATE documents SET {assignments} '
+                        f'WHERE filename = ?', values + [filename])
+
+    def _connect(self):
+        con = sqlite3.connect(self._path, timeout=_TIMEOUT)
+        con.row_factory = sqlite3.Row
+        return con
+
+
+def get_processed_files(company=None, first=None, last=None,
+                        path=PATH_DATA_CATALOG):
+    """Returns the processed .json files of a company and a range of years.
+
+    The files are selected by the catalog if it exists, otherwise by
+    globbing `PATH_DATA_PROCESSED`.
+
+    Args:
+        company (str, optional): Company, default is all.
+        first (int, optional): First year (inclusive).
+        last (int, optional): Last year (inclusive).
+        path (Path, optional): SQLite database file.
+
+    Returns:
+        list of Path: Processed files ordered by company and year.
+    """
+    if Path(path).exists():
+        rows = Catalog(path).select(company, first, last, status='processed')
+        return [_get_processed_file(row['filename']) for row in rows]
+
+    files = []
+    for file in sorted(Path(PATH_DATA_PROCESSED).glob('*.json')):
+        comp, year = _split_filename(file.stem)
+        if company is not None and comp != company:
+            continue
+        if year is not None and ((first is not None and year < first) or
+                                 (last is not None and year > last)):
+            continue
+        files.append(file)
+    return files
+
+
+def _get_file_info(file, row, prefix):
+    """Returns size, modification time, and sha256 of a raw file (the hash
+    is taken from the catalog entry `row` if the file did not change).
+    """
+    stat = Path(file).stat()
+    info = {'size': stat.st_size, 'mtime': stat.st_mtime}
+    if row is not None and row[f'{prefix}_size'] == info['size'] and \
+            row[f'{prefix}_mtime'] == info['mtime']:
+        info['sha256'] = row[f'{prefix}_sha256']
+        return info
+
+    digest = hashlib.sha256()
+    with open(file, 'rb') as rfile:
+        for chunk in iter(lambda: rfile.read(_CHUNK_SIZE), b''):
+            digest.update(chunk)
+    info['sha256'] = digest.hexdigest()
+    return info
+
+
+def _get_processed_file(filename):
+    """Returns the processed .json file of a document."""
+    return Path(PATH_DATA_PROCESSED, filename).with_suffix('.json')
+
+
+def _split_filename(filename):
+    """Splits a file name like 'MainCompany_2009' into company and year
+    (None if there is no year).
+    """
+    company, _, year = Path(filename).stem.rpartition('_')
+    if not company or not year.isdigit():
+        return Path(filename).stem, None
+    return company, int(year)
@@ -0,0 +1,311 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Defines a bulk loader of the financial metadata (premium, profit, and
+equity) of the reports from a SQL database.
+"""
+
+# -------------------------------------------------------------------------
+#   Authors: Christoph Jaeggli
+#   Institute: (None)
+#
+#   MIT License
+#   Copyright (c) 2020 Christoph Jaeggli
+#
+#   This program is distributed in the hope that it will be useful, but
+#   WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+
+
+# Standard library
+from contextlib import closing, contextmanager
+from functools import partial
+from pathlib import Path
+import json
+import os
+import queue
+import sqlite3
+import threading
+# Third party requirements
+import pandas as pd
+# Local imports
+from src._paths import PATH_DATA_FIN_CACHE, PATH_DATA_FIN_DB
+from src._settings import DF_COL_COMPANY, DF_COL_YEAR, DF_COL_PROFIT
+from src._settings import FIN_SOURCE, FIN_TABLE, FIN_POOL_SIZE
+
+# Constants
+_COLUMNS = ['Premium', DF_COL_PROFIT, 'Equity']
+_MAX_PARAMS = 900           # SQLite limits the number of query parameters
+_TIMEOUT = 30.
+
+
+class ConnectionPool:
+    """Hands out at most `size` connections and keeps them open for reuse.
+
+    Args:
+        connect (callable): Function without arguments that opens a new
+            DB-API connection.
+        size (int, optional): Maximal number of open connections.
+    """
+
+    def __init__(self, connect, size=FIN_POOL_SIZE):
+        self._connect = connect
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(size)
+
+    @contextmanager
+    def connection(self):
+        """Returns a context manager that lends a connection (blocks if all
+        of them are in use). A connection that raised is closed rather than
+        put back.
+        """
+        with self._slots:
+            try:
+                con = self._idle.get_nowait()
+            except queue.Empty:
+                con = self._connect()
+            try:
+                yield con
+            except Exception:
+                con.close()
+                raise
+            self._idle.put(con)
+
+    def close(self):
+        """Closes the idle connections."""
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                return
+
+
+class FinancialsLoader:
+    """Loads the financial metadata of many (company, year) pairs by one bulk
+    query and caches them locally.
+
+    The table `table` has the columns 'Company', 'Year', 'Premium', 'Profit',
+    and 'Equity' (one row per report). The rows that are not in the local
+    cache are fetched at once (the companies in chunks of `_MAX_PARAMS`) and
+    added to the cache, hence a second run does not query the database. The
+    cache is ignored if the stand-in database is newer than it, changes on
+    the SQL server are only seen after `clear_cache` (c.f. the option
+    `--refresh-financials` of `make_dataset.py`).
+
+    Args:
+        source (str {'sql', 'sqlite'}, optional): The SQL server of `_user.py`
+            or the local stand-in database `path` (c.f. `build_standin`).
+        table (str, optional): Name of the table.
+        pool_size (int, optional): Maximal number of open connections.
+        cache (Path, optional): Local cache (.csv), None disables it.
+        path (Path, optional): Stand-in database (source 'sqlite').
+    """
+
+    def __init__(self, source=FIN_SOURCE, table=FIN_TABLE,
+                 pool_size=FIN_POOL_SIZE, cache=PATH_DATA_FIN_CACHE,
+                 path=PATH_DATA_FIN_DB):
+        if source == 'sql':
+            connect = connect_sql_server
+        elif source == 'sqlite':
+            connect = partial(connect_sqlite, path)
+        else:
+            raise ValueError(f"Unknown source of the financial metadata "
+                             f"'{source}'.")
+        self._table = table
+        self._cache = None if cache is None else Path(cache)
+        self._source_file = Path(path) if source == 'sqlite' else None
+        self._pool = ConnectionPool(connect, pool_size)
+
+    def load(self, keys, refresh=False):
+        """Returns the financial metadata of some reports.
+
+        Args:
+            keys (list of tuple): Pairs `(company, year)`.
+            refresh (bool, optional): Ignore the local cache.
+
+        Returns:
+            DataFrame: Columns 'Premium', 'Profit', and 'Equity' indexed by
+                `DF_COL_COMPANY` and `DF_COL_YEAR` in the order of `keys`.
+        """
+        keys = [(str(comp), int(year)) for comp, year in keys]
+        cached = _empty_frame() if refresh else self._read_cache()
+
+        missing = [key for key in dict.fromkeys(keys)
+                   if key not in cached.index]
+        if missing:
+            fetched = self._query(missing)
+            cached = pd.concat([cached, fetched])
+            cached = cached[~cached.index.duplicated(keep='last')]
+            self._write_cache(cached)
+
+        absent = [key for key in missing if key not in cached.index]
+        if absent:
+            raise KeyError(f'No financial metadata for {len(absent)} '
+                           f'reports, e.g. {absent[:3]}.')
+        return cached.loc[keys]
+
+    def close(self):
+        """Closes the pooled connections."""
+        self._pool.close()
+
+    def _query(self, keys):
+        """Fetches the rows of the companies of `keys` in their range of
+        years and keeps those of `keys`.
+        """
+        companies = sorted({comp for comp, _ in keys})
+        years = [year for _, year in keys]
+        rows = []
+        with self._pool.connection() as con:
+            cursor = con.cursor()
+            for lo in range(0, len(companies), _MAX_PARAMS):
+                chunk = companies[lo:lo + _MAX_PARAMS]
+                cursor.execute(
+                    f'SELECT Company, Year, {", ".join(_COLUMNS)} '
+                    f'FROM {self._table} '
+                    f'WHERE Company IN ({",".join("?" * len(chunk))}) '
+                    f'AND Year BETWEEN ? AND ?',
+                    chunk + [min(years), max(years)])
+                rows.extend(tuple(row) for row in cursor.fetchall())
+            cursor.close()
+
+        df = _make_frame(rows)
+        return df[df.index.isin(keys)]
+
+    def _read_cache(self):
+        """Reads the cache unless it is missing or older than the stand-in
+        database.
+        """
+        if self._cache is None or not self._cache.is_file():
+            return _empty_frame()
+        if self._source_file is not None and self._source_file.is_file() \
+                and self._source_file.stat().st_mtime > \
+                self._cache.stat().st_mtime:
+            return _empty_frame()
+        df = pd.read_csv(self._cache, dtype={DF_COL_COMPANY: str})
+        return _make_frame(df.itertuples(index=False, name=None))
+
+    def _write_cache(self, df):
+        """Writes the cache atomically (several workers might share it)."""
+        if self._cache is None:
+            return
+        self._cache.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self._cache.with_name(f'.{self._cache.name}.{os.getpid()}.tmp')
+        df.to_csv(tmp)
+        os.replace(tmp, self._cache)
+
+
+def build_standin(json_files, path=PATH_DATA_FIN_DB, table=FIN_TABLE):
+    """Writes the financial metadata of raw .json files into a local SQLite
+    database with the layout of the SQL server (e.g. for tests or without
+    access to the server).
+
+    Args:
+        json_files (list of Path): Raw .json files.
+        path (Path, optional): SQLite database file.
+        table (str, optional): Name of the table.
+
+    Returns:
+        int: Number of written rows.
+    """
+    rows = []
+    for file in json_files:
+        with open(str(file), 'r') as jfile:
+            content = json.load(jfile)
+        company = Path(file).stem.rsplit('_', 1)[0]
+        year = int(content['Metadata']['Year'])
+        rows.append((company, year) +
+                    tuple(content['Data'][col] for col in _COLUMNS))
+
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    with closing(connect_sqlite(path, create=True)) as con, con:
+        con.execute(f'CREATE TABLE IF NOT EXISTS {table} ('
+                    f'Company TEXT, Year INTEGER, '
+                    f'{", ".join(f"{col} REAL" for col in _COLUMNS)}, '
+                    f'PRIMARY KEY (Company, Year))')
+        con.executemany(f'INSERT OR REPLACE INTO {table} VALUES '
+                        f'({", ".join("?" * (len(_COLUMNS) + 2))})', rows)
+    return len(rows)
+
+
+def clear_cache(cache=PATH_DATA_FIN_CACHE):
+    """Removes the local cache of the financial metadata, such that the next
+    load queries the database again.
+    """
+    Path(cache).unlink(missing_ok=True)
+
+
+def connect_sql_server():
+    """Opens a connection to the SQL server of `_user.py` (needs pyodbc)."""
+    try:
+        import pyodbc
+    except ImportError as err:
+        raise ImportError("The source 'sql' needs the package pyodbc, use "
+                          "the source 'sqlite' for a local database.") from err
+    return pyodbc.connect(get_connection_string())
+
+
+def connect_sqlite(path=PATH_DATA_FIN_DB, create=False):
+    """Opens a connection to a local SQLite database (that can be passed
+    between the threads of a pool).
+    """
+    if not create and not Path(path).is_file():
+        raise FileNotFoundError(f'{path} does not exist, build it by '
+                                f'`python -m src.data.build_financials_db`.')
+    return sqlite3.connect(path, timeout=_TIMEOUT, check_same_thread=False)
+
+
+def get_connection_string():
+    """Returns the ODBC connection string of the settings in `_user.py`."""
+    from _user import SQL_CON_DRIVER, SQL_CON_SERVER, SQL_CON_DATABASE,\
+        SQL_CON_TRUSTED
+
+    return f'DRIVER={SQL_CON_DRIVER};SERVER={SQL_CON_SERVER};' \
+           f'DATABASE={SQL_CON_DATABASE};{SQL_CON_TRUSTED}'
+
+
+def get_raw_datasets(pairs, loader):
+    """Returns the raw data sets of some reports (as read from their .json
+    files by `make_dataset`) built from the financial metadata.
+
+    Args:
+        pairs (list of tuple): Pairs of .pdf and .json files (c.f.
+            `make_dataset.get_raw_file_pairs`).
+        loader (FinancialsLoader): Loader of the financial metadata.
+
+    Returns:
+        dict: Raw data set per file name.
+    """
+    names = [pdf_file.stem for pdf_file, _ in pairs]
+    keys = [name.rsplit('_', 1) for name in names]
+    df = loader.load([(comp, int(year)) for comp, year in keys])
+
+    datasets = {}
+    for name, row in zip(names, df.itertuples()):
+        datasets[name] = {
+            'Metadata': {
+                'Filename': name,
+                'Year':     int(row.Index[1]),
+            },
+            'Data': {col: _to_number(getattr(row, col)) for col in _COLUMNS},
+        }
+    return datasets
+
+
+def _empty_frame():
+    return _make_frame([])
+
+
+def _make_frame(rows):
+    """Returns the rows `(company, year, premium, profit, equity)` as a
+    DataFrame indexed by company and year.
+    """
+    df = pd.DataFrame(list(rows),
+                      columns=[DF_COL_COMPANY, DF_COL_YEAR] + _COLUMNS)
+    df[DF_COL_COMPANY] = df[DF_COL_COMPANY].astype(str)
+    df[DF_COL_YEAR] = df[DF_COL_YEAR].astype(int)
+    return df.set_index([DF_COL_COMPANY, DF_COL_YEAR])
+
+
+def _to_number(value):
+    """Converts a value into an int if it is integral, else into a float."""
+    value = float(value)
+    return int(value) if value.is_integer() else value
@@ -0,0 +1,181 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Defines a coordinator-free work queue based on lease files in a shared
+directory.
+"""
+
+# -------------------------------------------------------------------------
+#   Authors: Christoph Jaeggli
+#   Institute: (None)
+#
+#   MIT License
+#   Copyright (c) 2020 Christoph Jaeggli
+#
+#   This program is distributed in the hope that it will be useful, but
+#   WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+
+
+# Standard library
+from pathlib import Path
+import json
+import os
+import socket
+import threading
+import time
+import uuid
+# Third party requirements
+# Local imports
+
+
+class LeaseQueue:
+    """Claims work items by creating lease files atomically.
+
+    A lease is a file `<key>.lease` in the lease directory that is created
+    with `O_CREAT | O_EXCL`, hence exactly one worker can hold it. The holder
+    renews the lease by touching the file. A lease whose modification time is
+    older than `ttl` seconds belongs to a dead worker and may be reclaimed by
+    another one: the stale file is first renamed to a unique name (only one of
+    several competing workers succeeds) and then claimed as usual.
+
+    Args:
+        path (Path): Lease directory (shared between all the workers).
+        ttl (float, optional): Lease time to live in seconds.
+        worker_id (str, optional): Identifier of the worker, default is
+            built from host name, process id, and a random suffix.
+    """
+
+    def __init__(self, path, ttl=300., worker_id=None):
+        if worker_id is None:
+            worker_id = f'{socket.gethostname()}-{os.getpid()}-' \
+                        f'{uuid.uuid4().hex[:6]}'
+        self.worker_id = worker_id
+        self._path = Path(path)
+        self._ttl = ttl
+        self._path.mkdir(parents=True, exist_ok=True)
+
+    def try_claim(self, key):
+        """Tries to claim a work item.
+
+        Returns:
+            bool: True if the lease has been acquired.
+        """
+        file = self._get_file(key)
+        if self._is_expired(file):
+            self._break(file)
+
+        try:
+            fd = os.open(file, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        except FileExistsError:
+            return False
+
+        with os.fdopen(fd, 'w') as lfile:
+            json.dump({'worker': self.worker_id, 'claimed': time.time()},
+                      lfile)
+        return True
+
+    def renew(self, key):
+        """Renews a lease held by this worker.
+
+        Returns:
+            bool: False if the lease has been broken (and possibly re-claimed
+                by another worker).
+        """
+        file = self._get_file(key)
+        if self._get_owner(file) != self.worker_id:
+            return False
+        try:
+            os.utime(file)
+        except FileNotFoundError:
+            return False
+        return True
+
+    def release(self, key):
+        """Releases a lease held by this worker.
+
+        The lease might have expired and been re-claimed by another worker,
+        hence it is first renamed to a unique name and restored if it belongs
+        to someone else.
+        """
+        file = self._get_file(key)
+        tomb = file.with_name(f'{file.name}.{self.worker_id}.released')
+        try:
+            os.rename(file, tomb)
+        except FileNotFoundError:
+            return
+
+        if self._get_owner(tomb) != self.worker_id:
+            try:
+                os.link(tomb, file)
+            except FileExistsError:
+                pass
+        tomb.unlink()
+
+    def keep_alive(self, key):
+        """Returns a context manager that renews the lease in a background
+        thread and releases it at exit.
+        """
+        return _KeepAlive(self, key, interval=self._ttl / 3)
+
+    def _get_file(self, key):
+        """Returns the lease file of a key."""
+        return Path(self._path, f'{key}.lease')
+
+    def _get_owner(self, file):
+        """Returns the worker holding a lease file (None if unreadable)."""
+        try:
+            with open(file, 'r') as lfile:
+                return json.load(lfile).get('worker')
+        except (OSError, ValueError):
+            return None
+
+    def _is_expired(self, file):
+        """Checks if a lease file is older than the time to live."""
+        try:
+            return time.time() - file.stat().st_mtime > self._ttl
+        except FileNotFoundError:
+            return False
+
+    def _break(self, file):
+        """Removes an expired lease (at most one worker succeeds)."""
+        tomb = file.with_name(f'{file.name}.{self.worker_id}.expired')
+        try:
+            os.rename(file, tomb)
+        except FileNotFoundError:
+            return
+
+        # Another worker might have broken and re-claimed the lease between
+        # the check and the rename, restore the fresh lease in that case
+        if not self._is_expired(tomb):
+            try:
+                os.link(tomb, file)
+            except FileExistsError:
+                pass
+        tomb.unlink()
+
+
+class _KeepAlive:
+    """Renews a lease periodically while the body of a with statement runs."""
+
+    def __init__(self, queue, key, interval):
+        self._queue = queue
+        self._key = key
+        self._interval = interval
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self._queue.release(self._key)
+        return False
+
+    def _run(self):
+        while not self._stop.wait(self._interval):
+            if not self._queue.renew(self._key):
+                # Lease has been broken, the work is done twice (idempotent)
+                return
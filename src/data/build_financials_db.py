@@ -0,0 +1,53 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Builds the local SQLite stand-in of the financial metadata database.
+
+The premium, the profit, and the equity of the raw .json files are written
+to the table `FIN_TABLE` of `data/financials.sqlite`, which has the layout of
+the table on the SQL server. With `FIN_SOURCE = 'sqlite'` (or the option
+`--financials sqlite` of `make_dataset.py`) the data sets are then generated
+from the stand-in instead of the per-report .json files, e.g. to test the
+bulk loader (c.f. `_financials.FinancialsLoader`) without the server.
+"""
+
+# -------------------------------------------------------------------------
+#   Author(s): Christoph Jaeggli
+#   Institute: (None)
+#
+#   MIT License
+#   Copyright (c) 2020 Christoph Jaeggli
+#
+#   This program is distributed in the hope that it will be useful, but
+#   WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+
+# Standard library
+import argparse
+# Third party requirements
+# Local imports
+from src._paths import PATH_DATA_RAW, PATH_DATA_FIN_DB
+from src._settings import FIN_TABLE
+from src.data._financials import build_standin
+from src.data.make_dataset import get_raw_file_pairs
+import src.profiling as prof
+
+
+def _parse_args():
+    """Parses the command line arguments."""
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--path', default=PATH_DATA_FIN_DB,
+                        help='SQLite database file')
+    parser.add_argument('--table', default=FIN_TABLE,
+                        help='name of the table')
+    prof.add_profile_argument(parser)
+    return parser.parse_args()
+
+
+if __name__ == '__main__':
+    args = _parse_args()
+
+    with prof.profile('build_financials_db', args.profile):
+        pairs = get_raw_file_pairs(PATH_DATA_RAW)
+        nrows = build_standin([json_file for _, json_file in pairs],
+                              path=args.path, table=args.table)
+        print(f'Wrote {nrows} reports to {args.path}')
@@ -13,13 +13,80 @@ The data sets are json files of the form:
         "Profit":    int,
         "Equity":    int,
         "Mood": {
-          "Pat_01":     dict (as in `utl.compute_pat_mood`),
+          "Pat_01":     dict (as in `utl.compute_pat_mood`, full or summary),
           "Pat_02":     dict ( " ),
           ....
         }
         "NWords":   int
       }
     }
+
+Besides the plain sequential mode, the data sets can be generated by an
+asyncio driven pipeline (option `--pipeline`) in which reading the metadata,
+extracting the pdf, scoring the sentences, and writing the processed file run
+as separate stages connected by bounded queues. The I/O stages run on threads
+and the CPU stages on a process pool such that disk access and NLP overlap.
+
+With the option `--shard` the data sets are generated by independent workers
+(on one or several machines sharing `data/`) that claim the documents by
+lease files in `data/leases` (c.f. `_work_queue.LeaseQueue`). Leases of dead
+workers expire and are reclaimed, documents with an up to date processed file
+are skipped, and the processed files are written atomically. Use `--workers N`
+to start N local worker processes.
+
+With the option `--summary` (or `MOOD_SUMMARY` in the settings) only running
+statistics and a few example sentences are stored per pattern.
+
+With the option `--dedup` (or `MOOD_DEDUP` in the settings) the scores of the
+sentences are stored in `data/interim/sentence_scores.sqlite` and reused for
+exact and near duplicates in later documents and runs (c.f.
+`_sentence_dedup.SentenceDeduplicator`), such that the scoring cost of a new
+report tracks the amount of new text. The share of reused sentences is
+printed and stored as 'Dedup' in the metadata of each data set.
+
+With the option `--page-filter` (or `PAGE_FILTER` in the settings) the pages
+with little prose (tables, financial statements) are skipped before the
+sentences are split and scored (c.f. `_page_filter.PageFilter`). The skipped
+pages are printed and stored as 'SkippedPages' in the metadata of each data
+set.
+
+The pdf text is extracted by the package `PDF_BACKEND` of the settings. With
+'auto' the fastest package is tried first and the pages of poor quality (or
+the whole document) are read again by the next one (c.f. `utl.read_pdf`). The
+package that has been used and the pages and seconds of every package run
+are stored as 'Extraction' in the metadata of each data set (c.f.
+`src/visualization/print_pdf_backend_stats.py`).
+
+Every run records the documents in the SQLite catalog `data/catalog.sqlite`
+(c.f. `_catalog.Catalog`): company, year, file hashes, page count, extraction
+backend, processing time, and status. With the option `--resume` only the
+documents that are not processed yet (or changed since) are processed, e.g.
+to continue an interrupted run.
+
+The sentences of each pdf are cached in `data/interim`. After changing
+`PATTERNS_OF_INTEREST` the option `--update-patterns` adds the moods of the
+new patterns to the existing data sets and removes those of the removed
+patterns, computed from the cached sentences only (c.f. `update_patterns`).
+
+With the option `--sentence-store` (or `SENTENCE_STORE` in the settings) the
+sentences of each report are written as well to `data/processed/sentences`
+as an Arrow IPC file with the page, the pattern hits (bitmasks), and the
+polarity and subjectivity of each sentence. Readers memory map these files
+and filter them by pattern, company, or year (c.f.
+`_sentence_store.SentenceStore`). Together with `--update-patterns` the
+sentence files of the updated data sets are rewritten with the new patterns.
+
+The financial metadata (premium, profit, equity) are read from the raw .json
+file of each report by default. With the option `--financials sql` (or
+`FIN_SOURCE` in the settings) they are loaded for all the reports by one bulk
+query over pooled connections and cached in `data/interim/financials.csv`
+(c.f. `_financials.FinancialsLoader`), `--financials sqlite` uses the local
+stand-in database of `build_financials_db.py` instead of the server. The
+cache follows the changes of the stand-in database, the option
+`--refresh-financials` discards it to see the changes on the server.
+
+With the option `--profile` the stages of the sequential mode are profiled
+(c.f. `src/profiling.py`).
 """
 
 # -------------------------------------------------------------------------
@@ -34,48 +101,898 @@ The data sets are json files of the form:
 #   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
 
 # Standard library
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from pathlib import Path
+import argparse
+import asyncio
 import json
+import multiprocessing
+import os
+import re
+import socket
+import time
+import zlib
 # Third party requirements
 # Local imports
-from src._paths import PATH_DATA_RAW, PATH_DATA_PROCESSED
-from src._settings import PATTERNS_OF_INTEREST, DF_COL_NWORDS
+from src._paths import PATH_DATA_RAW, PATH_DATA_INTERIM, PATH_DATA_PROCESSED,\
+    PATH_DATA_LEASES, PATH_DATA_SCORES, PATH_DATA_SENTENCES
+from src.data._catalog import Catalog
+from src.data._financials import FinancialsLoader, clear_cache,\
+    get_raw_datasets
+from src.data._work_queue import LeaseQueue
+from src._settings import PATTERNS_OF_INTEREST, DF_COL_NWORDS, MOOD_SUMMARY
+from src._settings import MOOD_DEDUP, DEDUP_THRESHOLD, DEDUP_NPERM,\
+    DEDUP_NBANDS, SEED
+from src._settings import PAGE_FILTER, FIN_SOURCE, SENTENCE_STORE
+from src.features._sentence_dedup import SentenceDeduplicator
+import src.profiling as prof
 import src.utils as utl
 
 # Constants
+_MAX_IN_FLIGHT = 4
+_NTHREADS = 2
+_STAGES = ['read', 'extract', 'score', 'write']
+_LEASE_TTL = 300.
+_PAGES_DIR = 'pages'          # Subfolder of the cached sentence pages
 
-if __name__ == '__main__':
-    pdf_files = Path(PATH_DATA_RAW).glob("*.pdf")
-    json_files = Path(PATH_DATA_RAW).glob("*.json")
 
-    for pdf_file, json_file in zip(pdf_files, json_files):
+def get_raw_file_pairs(path=PATH_DATA_RAW):
+    """Returns the pairs of corresponding .pdf and .json files.
 
+    Args:
+        path (Path): Folder containing the raw files.
+
+    Returns:
+        list of tuple: Pairs `(pdf_file, json_file)` sorted by file name.
+    """
+    pdf_files = sorted(Path(path).glob("*.pdf"))
+    json_files = sorted(Path(path).glob("*.json"))
+
+    pairs = []
+    for pdf_file, json_file in zip(pdf_files, json_files):
         # Check if they are referring to the corresponding file
-        filename = pdf_file.parts[-1].split('.')[0]
-        if filename != json_file.parts[-1].split('.')[0]:
+        if pdf_file.stem != json_file.stem:
             raise ValueError(f'{pdf_file.parts[-1]} and {json_file.parts[-1]} '
                              f'do not refer to corresponding files.')
-        print(f'Generate data set {filename}...', end='')
+        pairs.append((pdf_file, json_file))
+
+    return pairs
+
+
+def make_dataset(pairs, summary=MOOD_SUMMARY, catalog=None, dedup=MOOD_DEDUP,
+                 page_filter=PAGE_FILTER, financials=FIN_SOURCE,
+                 store=SENTENCE_STORE):
+    """Generates the processed data sets one file after the other.
+
+    Args:
+        pairs (list of tuple): Pairs of .pdf and .json files (c.f.
+            `get_raw_file_pairs`).
+        summary (bool, optional): Store summary moods (c.f.
+            `utl.compute_pat_mood`).
+        catalog (Catalog, optional): Catalog that records the documents.
+        dedup (bool, optional): Reuse the scores of duplicate sentences.
+        page_filter (bool, optional): Skip the pages with little prose.
+        financials (str {'json', 'sql', 'sqlite'}, optional): Source of the
+            financial metadata (c.f. `FIN_SOURCE`).
+        store (bool, optional): Write the sentence files as well.
+
+    Returns:
+        None
+    """
+    datasets = _get_raw_datasets(pairs, financials)
+    for pdf_file, json_file in pairs:
+        item = _new_item(pdf_file, json_file, summary, dedup, page_filter,
+                         datasets.get(pdf_file.stem), store)
+        print(f'Generate data set {item["filename"]}...', end='')
+        item = _run_stages(item, catalog)
+        print(f'done{_get_page_note(item)}{_get_backend_note(item)}'
+              f'{_get_dedup_note(item)}')
+
+
+def make_dataset_pipeline(pairs, max_in_flight=_MAX_IN_FLIGHT, nprocs=None,
+                          summary=MOOD_SUMMARY, catalog=None,
+                          dedup=MOOD_DEDUP, page_filter=PAGE_FILTER,
+                          financials=FIN_SOURCE, store=SENTENCE_STORE):
+    """Generates the processed data sets by an asyncio pipeline.
+
+    The stages `read` and `write` run on a thread pool, the stages `extract`
+    and `score` on a process pool. At most `max_in_flight` documents are
+    between the first and the last stage at any time.
+
+    Args:
+        pairs (list of tuple): Pairs of .pdf and .json files (c.f.
+            `get_raw_file_pairs`).
+        max_in_flight (int, optional): Maximal number of documents that are
+            processed concurrently.
+        nprocs (int, optional): Number of worker processes, default is the
+            number of CPUs.
+        summary (bool, optional): Store summary moods (c.f.
+            `utl.compute_pat_mood`).
+        catalog (Catalog, optional): Catalog that records the documents.
+        dedup (bool, optional): Reuse the scores of duplicate sentences.
+        page_filter (bool, optional): Skip the pages with little prose.
+        financials (str {'json', 'sql', 'sqlite'}, optional): Source of the
+            financial metadata (c.f. `FIN_SOURCE`).
+        store (bool, optional): Write the sentence files as well.
+
+    Returns:
+        dict: Pipeline statistics (c.f. `print_pipeline_stats`).
+    """
+    if max_in_flight < 1:
+        raise ValueError(f'max_in_flight must be positive, '
+                         f'got {max_in_flight}.')
+    if nprocs is None:
+        nprocs = os.cpu_count() or 1
+
+    datasets = _get_raw_datasets(pairs, financials)
+    return asyncio.run(_run_pipeline(pairs, max_in_flight, nprocs, summary,
+                                     catalog, dedup, page_filter, datasets,
+                                     store))
+
+
+def make_dataset_sharded(pairs, summary=MOOD_SUMMARY, worker_id=None,
+                         ttl=_LEASE_TTL, catalog=None, dedup=MOOD_DEDUP,
+                         page_filter=PAGE_FILTER, financials=FIN_SOURCE,
+                         store=SENTENCE_STORE):
+    """Generates the processed data sets that are neither up to date nor
+    claimed by another worker.
+
+    Args:
+        pairs (list of tuple): Pairs of .pdf and .json files (c.f.
+            `get_raw_file_pairs`).
+        summary (bool, optional): Store summary moods (c.f.
+            `utl.compute_pat_mood`).
+        worker_id (str, optional): Identifier of the worker.
+        ttl (float, optional): Lease time to live in seconds.
+        catalog (Catalog, optional): Catalog that records the documents.
+        dedup (bool, optional): Reuse the scores of duplicate sentences.
+        page_filter (bool, optional): Skip the pages with little prose.
+        financials (str {'json', 'sql', 'sqlite'}, optional): Source of the
+            financial metadata (c.f. `FIN_SOURCE`).
+        store (bool, optional): Write the sentence files as well.
+
+    Returns:
+        list of str: File names processed by this worker.
+    """
+    queue = LeaseQueue(PATH_DATA_LEASES, ttl=ttl, worker_id=worker_id)
+    datasets = _get_raw_datasets(pairs, financials)
+
+    # Start at a worker dependent position to reduce contention
+    if pairs:
+        offset = zlib.crc32(queue.worker_id.encode('utf-8')) % len(pairs)
+        pairs = pairs[offset:] + pairs[:offset]
+
+    processed = []
+    for pdf_file, json_file in pairs:
+        filename = pdf_file.stem
+        if _is_up_to_date(pdf_file, json_file):
+            _record_processed(catalog, filename)
+            continue
+        if not queue.try_claim(filename):
+            continue
+
+        with queue.keep_alive(filename):
+            # Another worker might have finished it in the meantime
+            if _is_up_to_date(pdf_file, json_file):
+                _record_processed(catalog, filename)
+                continue
+            print(f'[{queue.worker_id}] Generate data set {filename}...')
+            _run_stages(_new_item(pdf_file, json_file, summary, dedup,
+                                  page_filter, datasets.get(filename),
+                                  store), catalog)
+            processed.append(filename)
+
+    return processed
+
+
+def load_dataset(filename):
+    """Loads a processed data set (c.f. `save_dataset`).
+
+    Args:
+        filename (str): File name.
+
+    Returns:
+        dict: Data set.
+    """
+    file = Path(PATH_DATA_PROCESSED, filename).with_suffix('.json')
+    with open(file, 'r') as dfile:
+        return json.load(dfile)
+
+
+def load_pages(filename):
+    """Loads the cached page of each sentence of a pdf file (c.f.
+    `save_sentences`).
+
+    Args:
+        filename (str): File name.
+
+    Returns:
+        list of int: Page of each sentence, None if not cached.
+    """
+    file = Path(PATH_DATA_INTERIM, _PAGES_DIR, filename).with_suffix('.json')
+    try:
+        with open(file, 'r') as pfile:
+            return json.load(pfile)
+    except FileNotFoundError:
+        return None
+
+
+def load_sentences(filename):
+    """Loads the cached sentences of a pdf file (c.f. `save_sentences`).
+
+    Args:
+        filename (str): File name.
+
+    Returns:
+        list of str: List of sentences.
+    """
+    file = Path(PATH_DATA_INTERIM, filename).with_suffix('.json')
+    with open(file, 'r') as sfile:
+        return json.load(sfile)
+
+
+def print_pipeline_stats(stats, indent=4):
+    """Prints the throughput and the queue depths of a pipeline run.
+
+    Args:
+        stats (dict): Statistics as returned by `make_dataset_pipeline`.
+        indent (int, optional): Indentation.
+
+    Returns:
+        None
+    """
+    ndocs, elapsed = stats['ndocs'], stats['elapsed']
+    rate = ndocs / elapsed if elapsed > 0 else float('nan')
+    print('')
+    print(f'Processed {ndocs} documents in {elapsed:.1f}s ({rate:.2f} docs/s)')
+    print(f'{"STAGE":>{indent + 8}}{"BUSY [s]":>12}{"QMEAN":>10}{"QMAX":>8}')
+    for name in _STAGES:
+        stage = stats['stages'][name]
+        depths = stage['depths']
+        qmean = sum(depths) / len(depths) if depths else 0.
+        qmax = max(depths) if depths else 0
+        print(f'{name:>{indent + 8}}{stage["busy"]:12.2f}'
+              f'{qmean:10.2f}{qmax:8d}')
+
+
+def save_dataset(filename, data):
+    """Saves a processed data set.
+
+    Args:
+        filename (str): File name.
+        data (dict): Data set.
+
+    Returns:
+        None
+    """
+    file = Path(PATH_DATA_PROCESSED, filename).with_suffix('.json')
+
+    # Write to a temporary file first such that readers never see a partial
+    # data set (several workers might write the same file)
+    tmp = file.with_name(f'.{file.name}.{os.getpid()}.tmp')
+    with open(tmp, 'w') as dfile:
+        json.dump(data, dfile)
+    os.replace(tmp, file)
+
+
+def save_sentences(filename, sentences, pages=None):
+    """Caches the sentences of a pdf file in `PATH_DATA_INTERIM` (and their
+    pages in a subfolder, c.f. `load_pages`).
+
+    Args:
+        filename (str): File name.
+        sentences (list of str): List of sentences.
+        pages (list of int, optional): Page of each sentence, a previously
+            cached one is removed if omitted.
+
+    Returns:
+        None
+    """
+    Path(PATH_DATA_INTERIM).mkdir(parents=True, exist_ok=True)
+    file = Path(PATH_DATA_INTERIM, filename).with_suffix('.json')
+    with open(file, 'w') as sfile:
+        json.dump(sentences, sfile)
+
+    file = Path(PATH_DATA_INTERIM, _PAGES_DIR, filename).with_suffix('.json')
+    if pages is None:
+        file.unlink(missing_ok=True)
+    else:
+        file.parent.mkdir(parents=True, exist_ok=True)
+        with open(file, 'w') as pfile:
+            json.dump([int(page) for page in pages], pfile)
+
+
+def score_sentences(data, sentences, summary=MOOD_SUMMARY, dedup=None,
+                    patterns=PATTERNS_OF_INTEREST, scores=None):
+    """Adds the mood of each pattern and the text length to a data set (the
+    moods of other patterns already in the data set are kept).
+
+    Args:
+        data (dict): Data set as read from the raw .json file.
+        sentences (list of str): List of sentences.
+        summary (bool, optional): Store summary moods (c.f.
+            `utl.compute_pat_mood`).
+        dedup (SentenceDeduplicator, optional): Store of scored sentences
+            whose scores are reused for duplicates (and which is updated).
+        patterns (list of str, optional): Regex patterns.
+        scores (dict, optional): Filled with the `(polarity, subjectivity)`
+            of the sentences matching any pattern.
+
+    Returns:
+        dict: The data set `data`.
+    """
+    # Score the sentences matching any pattern once, reuse known scores
+    if dedup is not None or scores is not None:
+        pats = [re.compile(pat) for pat in patterns]
+        matching = [sent for sent in sentences
+                    if any(pat.search(sent) for pat in pats)]
+        computed, stats = utl.compute_sentence_scores(matching, dedup)
+        if dedup is not None:
+            ntotal = sum(stats.values())
+            stats['Ratio'] = (stats['Exact'] + stats['Near']) / ntotal \
+                if ntotal else 0.
+            data['Metadata']['Dedup'] = stats
+        if scores is None:
+            scores = computed
+        else:
+            scores.update(computed)
+
+    # Compute polarity and subjectivities for each pattern
+    moods = data['Data'].setdefault('Mood', {})
+    for pat in patterns:
+        mood = utl.compute_pat_mood(pat, sentences, summary=summary,
+                                    scores=scores)
+        moods[str(pat)] = mood
+
+    # Add information about text length
+    data['Data'][DF_COL_NWORDS] = sum([len(s) for s in sentences])
+
+    return data
 
-        # Get a list of sentences from the pdf
-        sentences = utl.get_sentences_from_pdf(PATH_DATA_RAW, filename)
 
-        # Get additional data from .json file
-        with open(str(json_file), 'r') as jfile:
-            data = json.load(jfile)
+def update_patterns(pairs, patterns=PATTERNS_OF_INTEREST,
+                    summary=MOOD_SUMMARY, catalog=None, dedup=MOOD_DEDUP,
+                    page_filter=PAGE_FILTER, financials=FIN_SOURCE,
+                    store=SENTENCE_STORE):
+    """Brings the moods of the processed data sets in line with `patterns`
+    without reading the pdf files again.
 
-        # Compute polarity and subjectivities for each pattern
-        data['Data']['Mood'] = {}
-        for pat in PATTERNS_OF_INTEREST:
-            mood = utl.compute_pat_mood(pat, sentences)
-            data['Data']['Mood'][str(pat)] = mood
+    For each data set, the moods of the patterns it does not hold yet (or in
+    the other format, c.f. `summary`) are computed from the cached sentences
+    (c.f. `save_sentences`) and merged into the processed file, and the moods
+    of patterns that are not in `patterns` anymore are removed. The moods of
+    the other patterns are kept as they are. Data sets whose processed file
+    or cached sentences are missing or older than the raw files are
+    generated from scratch, all at once after the updates (such that the
+    financial metadata are loaded by a single bulk query). Every data set
+    that is written or found up to date is marked as processed in `catalog`.
+    With `store`, the sentence file of each updated data set is rewritten
+    with the bitmasks and the scores of `patterns` (the scores of the
+    previous file are reused).
 
-        # Add information about text length
-        data['Data'][DF_COL_NWORDS] = sum([len(s) for s in sentences])
+    Notes
+        The cached sentences are those of the run that cached them, i.e. a
+        change of the sentence splitter or of the page filter requires a
+        full run.
 
-        # Save data set
-        file = Path(PATH_DATA_PROCESSED, filename).with_suffix('.json')
-        with open(file, 'w') as dfile:
-            json.dump(data, dfile)
+    Args:
+        pairs (list of tuple): Pairs of .pdf and .json files (c.f.
+            `get_raw_file_pairs`).
+        patterns (list of str, optional): Regex patterns.
+        summary (bool, optional): Store summary moods (c.f.
+            `utl.compute_pat_mood`).
+        catalog (Catalog, optional): Catalog that records the documents.
+        dedup (bool, optional): Reuse the scores of duplicate sentences.
+        page_filter (bool, optional): Skip the pages with little prose
+            (documents generated from scratch only).
+        financials (str {'json', 'sql', 'sqlite'}, optional): Source of the
+            financial metadata (documents generated from scratch only).
+        store (bool, optional): Write the sentence files (data sets whose
+            pages are not cached are generated from scratch).
+
+    Returns:
+        dict: Number of 'Updated', 'Unchanged', and 'Generated' data sets.
+    """
+    counts = {'Updated': 0, 'Unchanged': 0, 'Generated': 0}
+    stale = []
+    for pdf_file, json_file in pairs:
+        filename = pdf_file.stem
+        if not _is_up_to_date(pdf_file, json_file) or \
+                not _has_cached_sentences(pdf_file):
+            stale.append((pdf_file, json_file))
+            continue
+
+        data = load_dataset(filename)
+        missing, removed = _get_pattern_changes(data, patterns, summary)
+        if not missing and not removed:
+            _record_processed(catalog, filename)
+            counts['Unchanged'] += 1
+            continue
+        pages = load_pages(filename) if store else None
+        if store and pages is None:
+            stale.append((pdf_file, json_file))
+            continue
+
+        print(f'Update data set {filename} (+{len(missing)} '
+              f'-{len(removed)} patterns)...', end='')
+        _record_start(catalog, {'filename': filename})
+        try:
+            sentences = load_sentences(filename)
+            deduplicator = _get_deduplicator() if dedup else None
+            scores = {} if store else None
+            for pat in removed:
+                del data['Data']['Mood'][pat]
+            if missing:
+                score_sentences(data, sentences, summary=summary,
+                                patterns=missing, dedup=deduplicator,
+                                scores=scores)
+            save_dataset(filename, data)
+            if store:
+                _update_sentence_file(filename, data, sentences, pages,
+                                      patterns, scores, deduplicator)
+        except Exception as err:
+            if catalog is not None:
+                catalog.set_status(filename, 'failed', error=repr(err))
+            raise
+        _record_processed(catalog, filename)
+        counts['Updated'] += 1
         print('done')
 
+    if stale:
+        make_dataset(stale, summary=summary, catalog=catalog, dedup=dedup,
+                     page_filter=page_filter, financials=financials,
+                     store=store)
+        counts['Generated'] = len(stale)
+
+    return counts
+
+
+# Private functions
+def _is_up_to_date(pdf_file, json_file):
+    """Checks if the processed data set is newer than the raw files."""
+    file = Path(PATH_DATA_PROCESSED, pdf_file.stem).with_suffix('.json')
+    try:
+        mtime = file.stat().st_mtime
+    except FileNotFoundError:
+        return False
+    return mtime >= max(pdf_file.stat().st_mtime, json_file.stat().st_mtime)
+
+
+def _has_cached_sentences(pdf_file):
+    """Checks if the cached sentences are newer than the pdf file."""
+    file = Path(PATH_DATA_INTERIM, pdf_file.stem).with_suffix('.json')
+    try:
+        mtime = file.stat().st_mtime
+    except FileNotFoundError:
+        return False
+    return mtime >= pdf_file.stat().st_mtime
+
+
+def _get_pattern_changes(data, patterns, summary):
+    """Returns the patterns a data set is missing (absent or stored in the
+    other format) and the stored patterns that are not in `patterns`.
+    """
+    moods = data['Data'].get('Mood', {})
+    missing = [str(pat) for pat in patterns
+               if str(pat) not in moods or
+               ('Count' in moods[str(pat)]) != summary]
+    removed = [pat for pat in moods if pat not in map(str, patterns)]
+    return missing, removed
+
+
+def _run_shard_worker(worker_id, summary, ttl, dedup, page_filter,
+                      financials, store, resume=False):
+    """Entry point of a local shard worker process (with `resume` only the
+    documents that are pending according to the catalog are processed).
+    """
+    catalog = Catalog()
+    pairs = get_raw_file_pairs(PATH_DATA_RAW)
+    if resume:
+        pairs = catalog.get_pending(pairs)
+    processed = make_dataset_sharded(pairs, summary=summary,
+                                     worker_id=worker_id, ttl=ttl,
+                                     catalog=catalog, dedup=dedup,
+                                     page_filter=page_filter,
+                                     financials=financials, store=store)
+    print(f'[{worker_id}] processed {len(processed)} data sets')
+
+
+def _new_item(pdf_file, json_file, summary=False, dedup=False,
+              page_filter=False, data=None, store=False):
+    """Returns the work item that is passed from one stage to the next (the
+    raw data set `data` is read from `json_file` if it is not given).
+    """
+    return {
+        'filename':     pdf_file.stem,
+        'json_file':    json_file,
+        'summary':      summary,
+        'dedup':        dedup,
+        'page_filter':  page_filter,
+        'store':        store,
+        'data':         data,
+        'sentences':    None,
+        'pages':        None,
+        'scores':       None,
+        'npages':       None,
+        'backend':      None,
+        'timing':       {},
+    }
+
+
+def _get_raw_datasets(pairs, financials):
+    """Returns the raw data sets from the financial metadata source (empty
+    for 'json', the .json files are read by the stage 'read').
+    """
+    if financials == 'json':
+        return {}
+    loader = FinancialsLoader(financials)
+    try:
+        return get_raw_datasets(pairs, loader)
+    finally:
+        loader.close()
+
+
+def _get_backend_note(item):
+    """Returns the extraction packages of a processed item if more than one
+    has been run (c.f. `PDF_BACKEND = 'auto'`).
+    """
+    extraction = item['data']['Metadata'].get('Extraction')
+    if extraction is None or len(extraction['Packages']) < 2:
+        return ''
+    return f' (read by {extraction["Backend"]})'
+
+
+def _get_deduplicator():
+    """Returns the store of scored sentences (c.f. `MOOD_DEDUP`)."""
+    return SentenceDeduplicator(PATH_DATA_SCORES, threshold=DEDUP_THRESHOLD,
+                                nperm=DEDUP_NPERM, nbands=DEDUP_NBANDS,
+                                seed=SEED)
+
+
+def _get_dedup_note(item):
+    """Returns the share of reused sentences of a processed item."""
+    stats = item['data']['Metadata'].get('Dedup')
+    if stats is None:
+        return ''
+    ntotal = stats['Exact'] + stats['Near'] + stats['New']
+    return f' (reused {stats["Ratio"]:.0%} of {ntotal} scored sentences)'
+
+
+def _get_page_note(item):
+    """Returns the skipped pages of a processed item."""
+    skipped = item['data']['Metadata'].get('SkippedPages')
+    if skipped is None:
+        return ''
+    pages = ', '.join(str(num + 1) for num in skipped)
+    return f' (skipped {len(skipped)} of {item["npages"]} pages' \
+           f'{": " + pages if pages else ""})'
+
+
+def _get_extraction(document):
+    """Returns the extraction statistics of a document as stored in the
+    metadata of the data set (the pages per second of a corpus are the sum of
+    the pages over the sum of the seconds).
+    """
+    metadata = document['metadata']
+    packages = {}
+    for backend, stats in metadata['extraction'].items():
+        packages[backend] = {'Pages': stats['pages'],
+                             'Seconds': round(stats['seconds'], 6)}
+        if 'error' in stats:
+            packages[backend]['Error'] = stats['error']
+    return {'Backend': metadata['backend'], 'Packages': packages}
+
+
+def _record_start(catalog, item):
+    """Marks a document as being processed in the catalog."""
+    if catalog is not None:
+        catalog.set_status(item['filename'], 'processing', error=None)
+
+
+def _record_processed(catalog, filename):
+    """Marks a document whose processed file is up to date as processed in
+    the catalog (without changing page count, backend, and elapsed time).
+    """
+    if catalog is not None:
+        catalog.set_status(filename, 'processed', error=None)
+
+
+def _record_done(catalog, item):
+    """Marks a document as processed in the catalog."""
+    if catalog is not None:
+        catalog.set_status(item['filename'], 'processed',
+                           npages=item['npages'], backend=item['backend'],
+                           elapsed=sum(item['timing'].values()))
+
+
+def _run_stages(item, catalog=None):
+    """Runs the four stages one after the other (each one is a profiling
+    stage, c.f. `src/profiling.py`).
+    """
+    _record_start(catalog, item)
+    try:
+        for stage in (_stage_read, _stage_extract, _stage_score,
+                      _stage_write):
+            name = stage.__name__[len('_stage_'):]
+            tic = time.perf_counter()
+            with prof.stage(name):
+                item = stage(item)
+            item['timing'][name] = time.perf_counter() - tic
+    except Exception as err:
+        if catalog is not None:
+            catalog.set_status(item['filename'], 'failed', error=repr(err))
+        raise
+    _record_done(catalog, item)
+    return item
+
+
+def _stage_read(item):
+    """Reads the additional data from the .json file (unless it has been
+    loaded in bulk, c.f. `FIN_SOURCE`).
+    """
+    if item['data'] is not None:
+        return item
+    with open(str(item['json_file']), 'r') as jfile:
+        item['data'] = json.load(jfile)
+    return item
+
+
+def _stage_extract(item):
+    """Gets the list of sentences from the pdf."""
+    document = utl.read_pdf(PATH_DATA_RAW, item['filename'],
+                            layout=item['page_filter'])
+    item['npages'] = document['metadata']['npages']
+    item['backend'] = document['metadata']['backend']
+    item['data']['Metadata']['Extraction'] = _get_extraction(document)
+    if item['page_filter']:
+        document = utl.filter_pages(document)
+        skipped = document['metadata']['skipped_pages']
+        item['data']['Metadata']['SkippedPages'] = skipped
+    if item['store']:
+        item['sentences'], item['pages'] = utl.get_sentences_from_document(
+            document, pages=True)
+    else:
+        item['sentences'] = utl.get_sentences_from_document(document)
+
+    # Cache the sentences for later pattern updates (c.f. `update_patterns`)
+    save_sentences(item['filename'], item['sentences'], item['pages'])
+    return item
+
+
+def _stage_score(item):
+    """Computes polarity and subjectivities for each pattern."""
+    dedup = _get_deduplicator() if item['dedup'] else None
+    scores = {} if item['store'] else None
+    score_sentences(item['data'], item['sentences'], summary=item['summary'],
+                    dedup=dedup, scores=scores)
+
+    # The sentences are not needed anymore (unless they are stored)
+    if item['store']:
+        item['scores'] = scores
+    else:
+        item['sentences'] = None
+    return item
+
+
+def _stage_write(item):
+    """Saves the data set (and the sentence file)."""
+    save_dataset(item['filename'], item['data'])
+    if item['store']:
+        _write_sentence_file(item['filename'], item['data'],
+                             item['sentences'], item['pages'], item['scores'])
+        item['sentences'], item['pages'], item['scores'] = None, None, None
+    return item
+
+
+def _write_sentence_file(filename, data, sentences, pages, scores,
+                         patterns=PATTERNS_OF_INTEREST):
+    """Writes the sentences of a data set to the sentence store (c.f.
+    `SENTENCE_STORE`).
+    """
+    from src.features._sentence_store import get_sentence_file,\
+        write_sentences
+
+    file = get_sentence_file(PATH_DATA_SENTENCES, filename)
+    write_sentences(file, filename, int(data['Metadata']['Year']), sentences,
+                    pages, patterns, scores)
+
+
+def _update_sentence_file(filename, data, sentences, pages, patterns, scores,
+                          dedup=None):
+    """Rewrites the sentence file of an updated data set. The `scores` of
+    the sentences matching new patterns are completed by those of the other
+    matching sentences, read from the previous file or computed.
+    """
+    from src.features._sentence_store import SentenceStore,\
+        get_sentence_file
+
+    pats = [re.compile(pat) for pat in patterns]
+    rest = [sent for sent in dict.fromkeys(sentences) if sent not in scores
+            and any(pat.search(sent) for pat in pats)]
+
+    file = get_sentence_file(PATH_DATA_SENTENCES, filename)
+    if rest and file.is_file():
+        table = SentenceStore(PATH_DATA_SENTENCES).read_file(
+            file, scored=True,
+            columns=['Sentence', 'Polarity', 'Subjectivity'])
+        stored = set(rest)
+        for sent, pol, subj in zip(*(table[col].to_pylist()
+                                     for col in table.column_names)):
+            if sent in stored:
+                scores[sent] = (pol, subj)
+        rest = [sent for sent in rest if sent not in scores]
+
+    scores.update(utl.compute_sentence_scores(rest, dedup)[0])
+    _write_sentence_file(filename, data, sentences, pages, scores, patterns)
+
+
+async def _run_pipeline(pairs, max_in_flight, nprocs, summary, catalog,
+                        dedup, page_filter, datasets, store):
+    """Runs the four stages concurrently and collects the statistics."""
+    loop = asyncio.get_running_loop()
+    slots = asyncio.Semaphore(max_in_flight)
+    queues = {name: asyncio.Queue(maxsize=max_in_flight) for name in _STAGES}
+    stats = {
+        'ndocs':    0,
+        'elapsed':  0.,
+        'stages':   {name: {'busy': 0., 'depths': []} for name in _STAGES},
+    }
+
+    threads = ThreadPoolExecutor(max_workers=_NTHREADS)
+    procs = ProcessPoolExecutor(max_workers=nprocs)
+    stage_defs = [
+        ('read',    _stage_read,    threads,    1),
+        ('extract', _stage_extract, procs,      nprocs),
+        ('score',   _stage_score,   procs,      nprocs),
+        ('write',   _stage_write,   threads,    1),
+    ]
+
+    async def feed():
+        for pdf_file, json_file in pairs:
+            await slots.acquire()
+            item = _new_item(pdf_file, json_file, summary, dedup,
+                             page_filter, datasets.get(pdf_file.stem), store)
+            await loop.run_in_executor(threads, _record_start, catalog, item)
+            await queues['read'].put(item)
+        await queues['read'].put(None)
+
+    async def work(name, func, executor, q_in, q_out):
+        stage = stats['stages'][name]
+        while True:
+            item = await q_in.get()
+            if item is None:
+                # Let the sibling workers see the end marker as well
+                await q_in.put(None)
+                return
+            stage['depths'].append(q_in.qsize())
+            tic = time.perf_counter()
+            item = await loop.run_in_executor(executor, func, item)
+            item['timing'][name] = time.perf_counter() - tic
+            stage['busy'] += item['timing'][name]
+            if q_out is None:
+                await loop.run_in_executor(threads, _record_done, catalog,
+                                           item)
+                stats['ndocs'] += 1
+                print(f'Generate data set {item["filename"]}...done'
+                      f'{_get_page_note(item)}{_get_backend_note(item)}'
+                      f'{_get_dedup_note(item)}')
+                slots.release()
+            else:
+                await q_out.put(item)
+
+    async def run_stage(iq, name, func, executor, nworkers):
+        q_in = queues[name]
+        q_out = queues[_STAGES[iq + 1]] if iq + 1 < len(_STAGES) else None
+        await asyncio.gather(*[
+            work(name, func, executor, q_in, q_out)
+            for _ in range(nworkers)
+        ])
+        if q_out is not None:
+            await q_out.put(None)
+
+    tic = time.perf_counter()
+    try:
+        await asyncio.gather(
+            feed(),
+            *[run_stage(iq, *sdef) for iq, sdef in enumerate(stage_defs)],
+        )
+    finally:
+        threads.shutdown()
+        procs.shutdown()
+    stats['elapsed'] = time.perf_counter() - tic
+
+    return stats
+
+
+def _parse_args():
+    """Parses the command line arguments."""
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--pipeline', action='store_true',
+                        help='overlap I/O and CPU stages by an asyncio '
+                             'pipeline')
+    parser.add_argument('--max-in-flight', type=int, default=_MAX_IN_FLIGHT,
+                        help='maximal number of documents in the pipeline')
+    parser.add_argument('--nprocs', type=int, default=None,
+                        help='number of worker processes for the CPU stages')
+    parser.add_argument('--summary', action=argparse.BooleanOptionalAction,
+                        default=MOOD_SUMMARY,
+                        help='store only running statistics per pattern')
+    parser.add_argument('--dedup', action=argparse.BooleanOptionalAction,
+                        default=MOOD_DEDUP,
+                        help='reuse the scores of duplicate sentences')
+    parser.add_argument('--page-filter',
+                        action=argparse.BooleanOptionalAction,
+                        default=PAGE_FILTER,
+                        help='skip the pages with little prose (tables, '
+                             'financial statements)')
+    parser.add_argument('--sentence-store',
+                        action=argparse.BooleanOptionalAction,
+                        default=SENTENCE_STORE,
+                        help='write the scored sentences as Arrow IPC files')
+    parser.add_argument('--financials', default=FIN_SOURCE,
+                        choices=['json', 'sql', 'sqlite'],
+                        help='source of the financial metadata')
+    parser.add_argument('--refresh-financials', action='store_true',
+                        help='discard the local cache of the financial '
+                             'metadata')
+    parser.add_argument('--shard', action='store_true',
+                        help='claim the documents by lease files such that '
+                             'several workers can share the data folder')
+    parser.add_argument('--workers', type=int, default=1,
+                        help='number of local shard workers')
+    parser.add_argument('--lease-ttl', type=float, default=_LEASE_TTL,
+                        help='lease time to live in seconds')
+    parser.add_argument('--update-patterns', action='store_true',
+                        help='add and remove pattern moods of the processed '
+                             'data sets from the cached sentences')
+    parser.add_argument('--resume', action='store_true',
+                        help='process only the documents that are not '
+                             'processed according to the catalog')
+    prof.add_profile_argument(parser)
+    return parser.parse_args()
+
+
+if __name__ == '__main__':
+    args = _parse_args()
+    with prof.profile('make_dataset', args.profile):
+        file_pairs = get_raw_file_pairs(PATH_DATA_RAW)
+        corpus = Catalog()
+        corpus.register(file_pairs)
+        if args.refresh_financials:
+            clear_cache()
+        if args.resume:
+            file_pairs = corpus.get_pending(file_pairs)
+
+        if args.update_patterns:
+            update_counts = update_patterns(
+                file_pairs, summary=args.summary, catalog=corpus,
+                dedup=args.dedup, page_filter=args.page_filter,
+                financials=args.financials, store=args.sentence_store)
+            print(', '.join(f'{key} {val}'
+                            for key, val in update_counts.items()))
+        elif args.shard:
+            workers = [
+                multiprocessing.Process(
+                    target=_run_shard_worker,
+                    args=(f'{socket.gethostname()}-{os.getpid()}-{iw}',
+                          args.summary, args.lease_ttl, args.dedup,
+                          args.page_filter, args.financials,
+                          args.sentence_store, args.resume))
+                for iw in range(args.workers)
+            ]
+            for worker in workers:
+                worker.start()
+            for worker in workers:
+                worker.join()
+        elif args.pipeline:
+            pipeline_stats = make_dataset_pipeline(
+                file_pairs, max_in_flight=args.max_in_flight,
+                nprocs=args.nprocs, summary=args.summary, catalog=corpus,
+                dedup=args.dedup, page_filter=args.page_filter,
+                financials=args.financials, store=args.sentence_store)
+            print_pipeline_stats(pipeline_stats)
+        else:
+            make_dataset(file_pairs, summary=args.summary, catalog=corpus,
+                         dedup=args.dedup, page_filter=args.page_filter,
+                         financials=args.financials,
+                         store=args.sentence_store)
@@ -0,0 +1,72 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Defines bag of words features of a document by the hashing trick, i.e.
+without a fitted vocabulary and with bounded memory.
+"""
+
+# -------------------------------------------------------------------------
+#   Authors: Christoph Jaeggli
+#   Institute: (None)
+#
+#   MIT License
+#   Copyright (c) 2020 Christoph Jaeggli
+#
+#   This program is distributed in the hope that it will be useful, but
+#   WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+
+
+# Standard library
+from itertools import islice
+# Third party requirements
+import numpy as np
+import scipy.sparse as sp
+from sklearn.feature_extraction.text import HashingVectorizer
+from sklearn.preprocessing import normalize
+# Local imports
+
+
+class HashedTextVectorizer:
+    """Maps the sentences of a document to a single sparse row vector of
+    hashed term frequencies.
+
+    The sentences are vectorized in batches of `batch_size` and summed up,
+    hence at most one batch of sentences and one sparse row are held at a
+    time. The resulting row is scaled to unit euclidean norm such that long
+    and short reports are comparable.
+
+    Args:
+        nfeatures (int): Number of hash buckets (columns).
+        batch_size (int, optional): Number of sentences vectorized at once.
+    """
+
+    def __init__(self, nfeatures, batch_size=1000):
+        self.nfeatures = nfeatures
+        self._batch_size = batch_size
+        self._vectorizer = HashingVectorizer(
+            n_features=nfeatures,
+            alternate_sign=False,
+            norm=None,
+            lowercase=False,        # sentences are normalized already
+            dtype=np.float32,
+        )
+
+    def transform(self, sentences):
+        """Returns the hashed features of a document.
+
+        Args:
+            sentences (iterable of str): Sentences of the document.
+
+        Returns:
+            csr_matrix: Row vector of shape `(1, nfeatures)`.
+        """
+        sentences = iter(sentences)
+        row = sp.csr_matrix((1, self.nfeatures), dtype=np.float32)
+        while True:
+            batch = list(islice(sentences, self._batch_size))
+            if not batch:
+                break
+            counts = self._vectorizer.transform(batch)
+            row = row + sp.csr_matrix(counts.sum(axis=0), dtype=np.float32)
+            row.eliminate_zeros()
+        return normalize(row)
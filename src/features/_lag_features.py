@@ -0,0 +1,120 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Defines a lag feature matrix that is built once for the maximal number of
+past years and sliced for any smaller number.
+"""
+
+# -------------------------------------------------------------------------
+#   Authors: Christoph Jaeggli
+#   Institute: (None)
+#
+#   MIT License
+#   Copyright (c) 2020 Christoph Jaeggli
+#
+#   This program is distributed in the hope that it will be useful, but
+#   WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+
+
+# Standard library
+# Third party requirements
+import numpy as np
+import scipy.sparse as sp
+# Local imports
+from src._settings import DF_COL_COMPANY
+import src.utils as utl
+
+
+class LagFeatures:
+    """Lag features of a panel (c.f. `utl.load_data`) for all numbers of past
+    years up to `max_npast`.
+
+    The matrix is built once by `utl.get_shifted_columns` with `max_npast-1`
+    shifts. Its columns are ordered by lag, hence the features for `npast`
+    years are the first `npast * ncolumns` columns, which is a view of the
+    matrix. The rows of the supervised set are a view as well whenever they
+    are contiguous (e.g. for a single company).
+
+    If sparse `text` features are given (c.f. `utl.get_hashed_matrix`), the
+    ones of the current year are appended to the lag features and all the
+    sets are sparse matrices.
+
+    Args:
+        df (DataFrame): Data (c.f. `utl.load_data`).
+        columns (list of str): Feature columns.
+        target (str): Target column (next years value is predicted).
+        max_npast (int): Maximal number of past years.
+        text (csr_matrix, optional): Sparse features, one row per row of
+            `df`.
+    """
+
+    def __init__(self, df, columns, target, max_npast, text=None):
+        if max_npast < 1:
+            raise ValueError(f'max_npast must be positive, got {max_npast}.')
+        self.max_npast = max_npast
+        self._ncols = len(columns)
+
+        shifted = utl.get_shifted_columns(df[columns], max_npast - 1)
+        self._X = np.ascontiguousarray(shifted.to_numpy())
+        self._nan = np.isnan(self._X)
+        self._text = text
+
+        # Next years target of the same entity and the last row per entity
+        if DF_COL_COMPANY in (df.index.names or []):
+            groups = df[target].groupby(level=DF_COL_COMPANY, sort=False)
+            entities = df.index.get_level_values(DF_COL_COMPANY)
+        else:
+            groups = df[target]
+            entities = np.zeros(len(df), dtype=int)
+        self._y = groups.shift(-1).to_numpy()
+        last = np.r_[np.asarray(entities[1:] != entities[:-1]), True]
+        self._last = np.flatnonzero(last)
+        self.entities = list(np.asarray(entities)[self._last])
+
+    def features(self, npast):
+        """Returns all rows of the features for `npast` years (view)."""
+        return self._with_text(self._X[:, :self._get_ncols(npast)],
+                               slice(None))
+
+    def supervised_set(self, npast):
+        """Returns the features and targets of the rows for which all the
+        features and the next years target are known.
+
+        Returns:
+            tuple: `(X, y)`.
+        """
+        ncols = self._get_ncols(npast)
+        mask = ~self._nan[:, :ncols].any(axis=1) & ~np.isnan(self._y)
+        rows = _as_slice(mask)
+        return self._with_text(self._X[rows, :ncols], rows), self._y[rows]
+
+    def unsupervised_set(self, npast):
+        """Returns the features of the last row of each entity (in the order
+        of `entities`), for which the next years target is unknown.
+        """
+        X = self._X[self._last, :self._get_ncols(npast)]
+        return self._with_text(X, self._last)
+
+    def _with_text(self, X, rows):
+        """Appends the sparse features of the given rows."""
+        if self._text is None:
+            return X
+        return sp.hstack([sp.csr_matrix(X), self._text[rows]], format='csr')
+
+    def _get_ncols(self, npast):
+        if not 1 <= npast <= self.max_npast:
+            raise ValueError(f'npast must be in [1, {self.max_npast}], '
+                             f'got {npast}.')
+        return npast * self._ncols
+
+
+def _as_slice(mask):
+    """Returns a slice if the selected rows are contiguous (such that the
+    indexing gives a view), the boolean mask otherwise.
+    """
+    ind = np.flatnonzero(mask)
+    if ind.size == 0:
+        return slice(0, 0)
+    if ind[-1] - ind[0] + 1 == ind.size:
+        return slice(ind[0], ind[-1] + 1)
+    return mask
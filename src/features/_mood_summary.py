@@ -0,0 +1,100 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Defines running statistics for the mood of the sentences matching a
+pattern (constant memory per pattern).
+"""
+
+# -------------------------------------------------------------------------
+#   Authors: Christoph Jaeggli
+#   Institute: (None)
+#
+#   MIT License
+#   Copyright (c) 2020 Christoph Jaeggli
+#
+#   This program is distributed in the hope that it will be useful, but
+#   WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+
+
+# Standard library
+import math
+import random
+# Third party requirements
+# Local imports
+
+
+class MoodSummary:
+    """Keeps count, mean, variance, minimum, and maximum of the polarity and
+    the subjectivity together with a fixed-size uniform sample of example
+    sentences (reservoir sampling).
+    """
+
+    def __init__(self, nsamples=5, seed=None):
+        self._nsamples = nsamples
+        self._rng = random.Random(seed)
+        self._count = 0
+        self._examples = []
+        self._stats = {
+            'Polarity':     _RunningStats(),
+            'Subjectivity': _RunningStats(),
+        }
+
+    @property
+    def count(self):
+        """Number of sentences seen so far."""
+        return self._count
+
+    def update(self, sentence, polarity, subjectivity):
+        """Adds the mood of a sentence to the statistics."""
+        self._count += 1
+        self._stats['Polarity'].update(polarity)
+        self._stats['Subjectivity'].update(subjectivity)
+
+        # Reservoir sampling of the example sentences
+        if len(self._examples) < self._nsamples:
+            self._examples.append(sentence)
+        else:
+            j = self._rng.randrange(self._count)
+            if j < self._nsamples:
+                self._examples[j] = sentence
+
+    def to_dict(self):
+        """Returns the statistics as a json serializable dict."""
+        mood = {'Count': self._count}
+        for key, stats in self._stats.items():
+            mood[key] = stats.to_dict()
+        mood['Examples'] = list(self._examples)
+        return mood
+
+
+class _RunningStats:
+    """Welford's online algorithm for mean and variance."""
+
+    def __init__(self):
+        self._n = 0
+        self._mean = 0.
+        self._m2 = 0.
+        self._min = math.inf
+        self._max = -math.inf
+
+    def update(self, value):
+        """Adds a value."""
+        self._n += 1
+        delta = value - self._mean
+        self._mean += delta / self._n
+        self._m2 += delta * (value - self._mean)
+        self._min = min(self._min, value)
+        self._max = max(self._max, value)
+
+    def to_dict(self):
+        """Returns mean, (population) variance, minimum, and maximum. All the
+        values are None if no value has been added.
+        """
+        if self._n == 0:
+            return {'Mean': None, 'Var': None, 'Min': None, 'Max': None}
+        return {
+            'Mean':     self._mean,
+            'Var':      self._m2 / self._n,
+            'Min':      self._min,
+            'Max':      self._max,
+        }
@@ -0,0 +1,101 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Defines a cheap classifier that separates prose pages from tables,
+financial statements, and other pages with little running text.
+"""
+
+# -------------------------------------------------------------------------
+#   Authors: Christoph Jaeggli
+#   Institute: (None)
+#
+#   MIT License
+#   Copyright (c) 2020 Christoph Jaeggli
+#
+#   This program is distributed in the hope that it will be useful, but
+#   WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+
+
+# Standard library
+import re
+# Third party requirements
+# Local imports
+
+# Constants
+_RE_WORD = re.compile(r'[^\W\d_]{2,}')
+_MAX_CELL_WORDS = 3
+
+
+class PageFilter:
+    """Classifies a page as prose by its alphabetic-token density and, if
+    available, by layout hints of the text blocks (c.f. `get_layout`).
+
+    A page is prose if
+        - it has at least `min_words` alphabetic words,
+        - at least `min_alpha` of its whitespace separated tokens are
+          alphabetic words (numbers, amounts, and dates are not), and
+        - at most `max_cells` of its text blocks look like table cells.
+
+    Args:
+        min_alpha (float, optional): Minimal share of alphabetic tokens.
+        min_words (int, optional): Minimal number of alphabetic words.
+        max_cells (float, optional): Maximal share of table-cell blocks.
+    """
+
+    def __init__(self, min_alpha=0.6, min_words=20, max_cells=0.7):
+        self.min_alpha = min_alpha
+        self.min_words = min_words
+        self.max_cells = max_cells
+
+    def score(self, text):
+        """Returns the number of alphabetic words of a page and their share
+        of all the tokens.
+        """
+        tokens = text.split()
+        nwords = sum(1 for tok in tokens if _RE_WORD.fullmatch(tok.strip(
+            '.,;:!?()[]"\'«»„“-–')))
+        return nwords, nwords / len(tokens) if tokens else 0.
+
+    def is_prose(self, text, layout=None):
+        """Checks if a page is prose.
+
+        Args:
+            text (str): Text of the page.
+            layout (tuple, optional): Number of text blocks and share of
+                table-cell blocks (c.f. `get_layout`).
+
+        Returns:
+            bool
+        """
+        nwords, alpha = self.score(text)
+        if nwords < self.min_words or alpha < self.min_alpha:
+            return False
+        if layout is not None and layout[0] > 0 and \
+                layout[1] > self.max_cells:
+            return False
+        return True
+
+
+def get_layout(blocks):
+    """Returns the layout hints of a page from its text blocks.
+
+    Args:
+        blocks (list of tuple): Blocks as returned by fitz's
+            `page.get_text('blocks')`, i.e. `(x0, y0, x1, y1, text, num,
+            type)`.
+
+    Returns:
+        tuple: Number of text blocks and share of them that look like table
+            cells (at most `_MAX_CELL_WORDS` words per line on average, or
+            more digits than letters).
+    """
+    texts = [blk[4] for blk in blocks if blk[6] == 0]
+    ncells = 0
+    for text in texts:
+        lines = [line for line in text.splitlines() if line.strip()]
+        nwords = len(text.split())
+        ndigits = sum(ch.isdigit() for ch in text)
+        nalpha = sum(ch.isalpha() for ch in text)
+        if nwords <= _MAX_CELL_WORDS * max(len(lines), 1) or ndigits > nalpha:
+            ncells += 1
+    return len(texts), ncells / len(texts) if texts else 0.
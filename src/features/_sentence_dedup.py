@@ -0,0 +1,231 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Defines a persistent store of sentence scores that finds exact and near
+duplicates by MinHash and locality sensitive hashing (LSH).
+"""
+
+# -------------------------------------------------------------------------
+#   Authors: Christoph Jaeggli
+#   Institute: (None)
+#
+#   MIT License
+#   Copyright (c) 2020 Christoph Jaeggli
+#
+#   This program is distributed in the hope that it will be useful, but
+#   WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+
+
+# Standard library
+from collections import defaultdict
+from contextlib import closing
+from pathlib import Path
+import hashlib
+import sqlite3
+# Third party requirements
+import numpy as np
+# Local imports
+
+# Constants
+_PRIME = np.uint64((1 << 61) - 1)      # Mersenne prime of the MinHash
+_LOW_BITS = 30
+_MAX_PARAMS = 900           # SQLite limits the number of query parameters
+_TIMEOUT = 30.
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS sentences (
+    key             TEXT PRIMARY KEY,
+    polarity        REAL,
+    subjectivity    REAL,
+    signature       BLOB
+);
+CREATE TABLE IF NOT EXISTS buckets (
+    band            INTEGER,
+    bucket          INTEGER,
+    key             TEXT,
+    PRIMARY KEY (band, bucket, key)
+) WITHOUT ROWID;
+"""
+
+
+class SentenceDeduplicator:
+    """Stores the polarity and the subjectivity of scored sentences and finds
+    the stored sentences that are identical or nearly identical to new ones.
+
+    A sentence is represented by the set of its word bigrams. Its MinHash
+    signature of `nperm` values estimates the Jaccard similarity between two
+    sentences. The signature is split into `nbands` bands, two sentences
+    sharing all the values of one band are candidates, and a candidate is a
+    near duplicate if the estimated similarity is at least `threshold`.
+
+    Args:
+        path (Path): SQLite database file (shared between the runs).
+        threshold (float, optional): Minimal estimated Jaccard similarity of
+            near duplicates.
+        nperm (int, optional): Length of the MinHash signatures.
+        nbands (int, optional): Number of LSH bands (must divide `nperm`).
+        seed (int, optional): Seed of the hash functions (must be the same
+            for all the runs sharing `path`).
+    """
+
+    def __init__(self, path, threshold=0.8, nperm=64, nbands=16, seed=0):
+        if nperm % nbands != 0:
+            raise ValueError(f'nbands ({nbands}) must divide nperm '
+                             f'({nperm}).')
+        self._path = Path(path)
+        self._threshold = threshold
+        self._nbands = nbands
+        self._rows = nperm // nbands
+
+        rng = np.random.default_rng(seed)
+        self._a = rng.integers(1, _PRIME, nperm, dtype=np.uint64)
+        self._b = rng.integers(1, _PRIME, nperm, dtype=np.uint64)
+
+        self._path.parent.mkdir(parents=True, exist_ok=True)
+        with closing(self._connect()) as con, con:
+            con.executescript(_SCHEMA)
+
+    def lookup(self, sentences):
+        """Returns the stored scores of the exact and of the near duplicates
+        of some sentences.
+
+        Args:
+            sentences (iterable of str): Sentences.
+
+        Returns:
+            tuple of dict: `(exact, near)`, each of them maps a sentence to
+                its `(polarity, subjectivity)`.
+        """
+        sentences = list(dict.fromkeys(sentences))
+        keys = {sent: _get_key(sent) for sent in sentences}
+
+        with closing(self._connect()) as con:
+            stored = self._select_sentences(con, list(keys.values()))
+            exact = {sent: stored[key][:2] for sent, key in keys.items()
+                     if key in stored}
+
+            # Candidates of the remaining sentences sharing a band
+            rest = [sent for sent in sentences if sent not in exact]
+            signatures = {sent: self._get_signature(sent) for sent in rest}
+            candidates = self._select_candidates(con, signatures)
+            ckeys = {key for keys_ in candidates.values() for key in keys_}
+            stored = self._select_sentences(con, list(ckeys))
+
+        near = {}
+        for sent, sig in signatures.items():
+            best, score = self._threshold, None
+            for key in candidates.get(sent, ()):
+                other = np.frombuffer(stored[key][2], dtype=np.uint32)
+                similarity = np.mean(sig == other)
+                if similarity >= best:
+                    best, score = similarity, stored[key][:2]
+            if score is not None:
+                near[sent] = score
+        return exact, near
+
+    def add(self, scores):
+        """Stores the scores of some sentences.
+
+        Args:
+            scores (dict): Maps a sentence to its `(polarity, subjectivity)`.
+
+        Returns:
+            None
+        """
+        rows, buckets = [], []
+        for sent, (pol, subj) in scores.items():
+            key = _get_key(sent)
+            sig = self._get_signature(sent)
+            rows.append((key, pol, subj, sig.tobytes()))
+            buckets.extend((band, bucket, key)
+                           for band, bucket in enumerate(self._get_bands(sig)))
+
+        with closing(self._connect()) as con, con:
+            con.executemany('INSERT OR REPLACE INTO sentences VALUES '
+                            '(?, ?, ?, ?)', rows)
+            con.executemany('INSERT OR IGNORE INTO buckets VALUES (?, ?, ?)',
+                            buckets)
+
+    def _get_signature(self, sentence):
+        """Returns the MinHash signature of a sentence (uint32 array)."""
+        words = sentence.split()
+        shingles = {' '.join(words[i:i + 2])
+                    for i in range(max(len(words) - 1, 1))}
+        x = np.fromiter((_hash32(sh) for sh in shingles), dtype=np.uint64,
+                        count=len(shingles))
+        hashes = _mod_prime(_mul_mod_prime(self._a[:, None], x[None, :]) +
+                            self._b[:, None])
+        return hashes.min(axis=1).astype(np.uint32)
+
+    def _get_bands(self, signature):
+        """Returns the bucket of each band of a signature."""
+        bands = signature.reshape(self._nbands, self._rows)
+        return [int.from_bytes(hashlib.blake2b(band.tobytes(),
+                                               digest_size=8).digest(),
+                               'little', signed=True)
+                for band in bands]
+
+    def _select_sentences(self, con, keys):
+        """Returns polarity, subjectivity, and signature of stored keys."""
+        stored = {}
+        for lo in range(0, len(keys), _MAX_PARAMS):
+            chunk = keys[lo:lo + _MAX_PARAMS]
+            query = f'SELECT key, polarity, subjectivity, signature FROM ' \
+                    f'sentences WHERE key IN ({",".join("?" * len(chunk))})'
+            for key, pol, subj, sig in con.execute(query, chunk):
+                stored[key] = (pol, subj, sig)
+        return stored
+
+    def _select_candidates(self, con, signatures):
+        """Returns the stored keys sharing a band with each signature."""
+        lookup = defaultdict(list)
+        for sent, sig in signatures.items():
+            for band, bucket in enumerate(self._get_bands(sig)):
+                lookup[(band, bucket)].append(sent)
+
+        candidates = defaultdict(set)
+        for band in range(self._nbands):
+            buckets = [bucket for (b, bucket) in lookup if b == band]
+            for lo in range(0, len(buckets), _MAX_PARAMS):
+                chunk = buckets[lo:lo + _MAX_PARAMS]
+                query = f'SELECT bucket, key FROM buckets WHERE band = ? ' \
+                        f'AND bucket IN ({",".join("?" * len(chunk))})'
+                for bucket, key in con.execute(query, [band] + chunk):
+                    for sent in lookup[(band, bucket)]:
+                        candidates[sent].add(key)
+        return candidates
+
+    def _connect(self):
+        return sqlite3.connect(self._path, timeout=_TIMEOUT)
+
+
+def _get_key(sentence):
+    """Returns the key of a sentence (exact duplicates share the key)."""
+    return hashlib.blake2b(sentence.encode('utf-8'),
+                           digest_size=16).hexdigest()
+
+
+def _hash32(text):
+    """Returns a 32 bit hash of a string."""
+    return int.from_bytes(hashlib.blake2b(text.encode('utf-8'),
+                                          digest_size=4).digest(), 'little')
+
+
+def _mod_prime(x):
+    """Reduces uint64 values modulo the Mersenne prime `_PRIME`."""
+    x = (x & _PRIME) + (x >> np.uint64(61))
+    return np.where(x >= _PRIME, x - _PRIME, x)
+
+
+def _mul_mod_prime(a, x):
+    """Returns `a * x % _PRIME` for `a < _PRIME` and 32 bit values `x`
+    without overflowing uint64.
+
+    `a` is split into `a_hi * 2**30 + a_lo` such that both partial products
+    fit into 64 bits, and the multiplication by `2**30` modulo the Mersenne
+    prime is a rotation of the 61 bits.
+    """
+    low = np.uint64(_LOW_BITS)
+    a_hi, a_lo = a >> low, a & np.uint64((1 << _LOW_BITS) - 1)
+    hi = _mod_prime(a_hi * x)
+    hi = ((hi << low) & _PRIME) | (hi >> np.uint64(61 - _LOW_BITS))
+    return _mod_prime(hi + _mod_prime(a_lo * x))
@@ -0,0 +1,177 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Defines a fast rule-based German sentence splitter (alternative to the
+nltk punkt tokenizer).
+"""
+
+# -------------------------------------------------------------------------
+#   Authors: Christoph Jaeggli
+#   Institute: (None)
+#
+#   MIT License
+#   Copyright (c) 2020 Christoph Jaeggli
+#
+#   This program is distributed in the hope that it will be useful, but
+#   WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+
+
+# Standard library
+import re
+# Third party requirements
+# Local imports
+
+# Constants
+_BOUNDARY = re.compile(r'[.!?]+["\'»«“”)\]]*\s+')
+_ORDINAL = re.compile(r'\d+\.')
+
+
+class GermanSentenceSplitter:
+    """Defines a rule-based German sentence splitter.
+
+    A sentence boundary is a sequence of '.', '!', or '?' followed by white
+    space. A period is not considered as a boundary if
+        - the preceding token is a known abbreviation (e.g. 'bzw.', 'z.B.'),
+        - the preceding token is a single letter or an ordinal number
+          (e.g. '1. Januar'),
+        - the following word starts with a lower case letter.
+    """
+
+    def __init__(self, abbreviations=None):
+        abbrev = set(_german_abbreviations())
+        if abbreviations is not None:
+            abbrev.update(a.lower().rstrip('.') for a in abbreviations)
+        self._abbreviations = abbrev
+
+    def split(self, text):
+        """Splits a text and returns the list of sentences."""
+        sentences, rest = self._split(text)
+        if rest:
+            sentences.append(rest)
+        return sentences
+
+    def split_pages(self, pages):
+        """Splits a stream of pages and yields the sentences one by one.
+
+        Sentences that continue on the next page are joined.
+
+        Args:
+            pages (iterable of str): Texts of the pages.
+
+        Yields:
+            str: Sentence.
+        """
+        rest = ''
+        for page in pages:
+            text = f'{rest}\n{page}' if rest else page
+            sentences, rest = self._split(text)
+            yield from sentences
+        if rest:
+            yield rest
+
+    def _split(self, text):
+        """Returns the complete sentences and the unterminated rest."""
+        sentences = []
+        start = 0
+        for match in _BOUNDARY.finditer(text):
+            end = match.end()
+            if end < len(text) and text[end].islower():
+                continue
+            if self._is_abbreviation(text, start, match.start()):
+                continue
+
+            sentence = text[start:end].strip()
+            if sentence:
+                sentences.append(sentence)
+            start = end
+
+        return sentences, text[start:].strip()
+
+    def _is_abbreviation(self, text, start, stop):
+        """Checks if the token ending at `stop` is an abbreviation."""
+        if text[stop] != '.':
+            return False
+
+        # Find the beginning of the token before the period
+        ws = max(text.rfind(' ', start, stop), text.rfind('\n', start, stop))
+        token = text[ws + 1:stop].lstrip('(["„«»')
+        if len(token) == 1 and token.isalpha():
+            return True
+        if _ORDINAL.fullmatch(f'{token}.') is not None:
+            return True
+
+        return token.lower() in self._abbreviations
+
+
+def _german_abbreviations():
+    """Returns a list of common German abbreviations (lower case, without the
+    final period).
+    """
+
+    list_ = [
+        # - A -
+        'abs', 'abschn', 'abt', 'allg', 'anm', 'art', 'aufl',
+
+        # - B -
+        'bd', 'bspw', 'bzgl', 'bzw',
+
+        # - C -
+        'ca', 'co',
+
+        # - D -
+        'd.h', 'dgl', 'dr', 'dt',
+
+        # - E -
+        'evtl', 'exkl',
+
+        # - F -
+        'ff', 'fr',
+
+        # - G -
+        'gem', 'ggf', 'ggü',
+
+        # - I -
+        'i.d.r', 'i.e.s', 'i.s.v', 'i.v.m', 'inkl', 'insb',
+
+        # - J -
+        'jh', 'jr',
+
+        # - K -
+        'kap',
+
+        # - M -
+        'max', 'mind', 'min', 'mio', 'mrd', 'mst',
+
+        # - N -
+        'nr',
+
+        # - P -
+        'prof',
+
+        # - R -
+        'rd',
+
+        # - S -
+        's.o', 's.u', 'sog', 'st', 'str',
+
+        # - T -
+        'tsd',
+
+        # - U -
+        'u.a', 'u.ä', 'usw', 'u.u',
+
+        # - V -
+        'v.a', 'vgl', 'vj', 'vs',
+
+        # - Z -
+        'z.b', 'z.t', 'ziff', 'zzgl',
+
+    ]
+
+    return list_
+
+
+if __name__ == '__main__':
+    print('\n')
+    print('The total number of abbreviations in the list is')
+    print(f'    --> {len(_german_abbreviations())} <--')
@@ -0,0 +1,206 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Defines a columnar store of the scored sentences of the reports (one Arrow
+IPC file per report) that is read by memory mapping.
+"""
+
+# -------------------------------------------------------------------------
+#   Authors: Christoph Jaeggli
+#   Institute: (None)
+#
+#   MIT License
+#   Copyright (c) 2020 Christoph Jaeggli
+#
+#   This program is distributed in the hope that it will be useful, but
+#   WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+
+
+# Standard library
+from pathlib import Path
+import json
+import os
+import re
+# Third party requirements
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+# Local imports
+
+# Constants
+_SUFFIX = '.arrow'
+_BITS = 64
+_COL_MASK = 'Patterns_'
+_META_PATTERNS = b'patterns'
+
+
+class SentenceStore:
+    """Reads the sentence files of a folder (c.f. `write_sentences`).
+
+    The files are memory mapped, hence the columns are not copied into
+    memory, and only the rows that pass the filters are materialized.
+
+    Args:
+        path (Path): Folder of the .arrow files.
+    """
+
+    def __init__(self, path):
+        self._path = Path(path)
+
+    def get_files(self, companies=None, years=None):
+        """Returns the files of some companies and years (by file name,
+        without opening them).
+        """
+        files = []
+        for file in sorted(self._path.glob(f'*{_SUFFIX}')):
+            company, _, year = file.stem.rpartition('_')
+            if companies is not None and company not in companies:
+                continue
+            if years is not None and (not year.isdigit() or
+                                      int(year) not in years):
+                continue
+            files.append(file)
+        return files
+
+    def read(self, patterns=None, companies=None, years=None, scored=False,
+             columns=None):
+        """Returns the sentences matching all the filters.
+
+        Args:
+            patterns (list of str, optional): Keep the sentences matching any
+                of the patterns. Patterns that have been stored are looked up
+                in the bitmasks, others are matched against the sentences.
+            companies (list of str, optional): Companies.
+            years (list of int, optional): Years.
+            scored (bool, optional): Keep only the scored sentences.
+            columns (list of str, optional): Columns to return, default is
+                all of them except the bitmasks.
+
+        Returns:
+            pyarrow.Table: Columns 'Document', 'Year', 'Page', 'Sentence',
+                'Polarity', and 'Subjectivity'.
+        """
+        tables = [self.read_file(file, patterns, scored, columns)
+                  for file in self.get_files(companies, years)]
+        if not tables:
+            return _get_schema().empty_table().select(
+                columns or _get_columns())
+        return pa.concat_tables(tables)
+
+    def read_file(self, file, patterns=None, scored=False, columns=None):
+        """Returns the sentences of one file matching the filters (c.f.
+        `read`).
+        """
+        # The columns reference the mapped file (no copy)
+        source = pa.memory_map(str(file), 'r')
+        table = pa.ipc.open_file(source).read_all()
+
+        mask = None
+        if patterns is not None:
+            stored = get_patterns(table.schema)
+            for pat in patterns:
+                hit = _get_hits(table, stored, str(pat))
+                mask = hit if mask is None else pc.or_(mask, hit)
+        if scored:
+            hit = pc.is_valid(table['Polarity'])
+            mask = hit if mask is None else pc.and_(mask, hit)
+
+        table = table.select(columns or _get_columns())
+        return table if mask is None else table.filter(mask)
+
+
+def get_patterns(schema):
+    """Returns the patterns of the bitmasks of a sentence file."""
+    return json.loads(schema.metadata[_META_PATTERNS])
+
+
+def get_sentence_file(path, filename):
+    """Returns the sentence file of a report."""
+    return Path(path, filename).with_suffix(_SUFFIX)
+
+
+def write_sentences(file, document, year, sentences, pages, patterns,
+                    scores):
+    """Writes the sentences of a report as an Arrow IPC file.
+
+    Each sentence has a bit per pattern (bit `i % 64` of the column
+    'Patterns_<i // 64>') that is set if it matches the pattern. The patterns
+    are stored in the metadata of the schema.
+
+    Args:
+        file (Path): Output file (.arrow).
+        document (str): Name of the report.
+        year (int): Year of the report.
+        sentences (list of str): Sentences.
+        pages (list of int): Page of each sentence.
+        patterns (list of str): Patterns.
+        scores (dict): `(polarity, subjectivity)` of the scored sentences.
+
+    Returns:
+        None
+    """
+    patterns = [str(pat) for pat in patterns]
+    nsent = len(sentences)
+
+    masks = np.zeros((max(1, -(-len(patterns) // _BITS)), nsent),
+                     dtype=np.uint64)
+    for ipat, pat in enumerate(patterns):
+        regex = re.compile(pat)
+        hits = np.fromiter((regex.search(sent) is not None
+                            for sent in sentences), dtype=bool, count=nsent)
+        masks[ipat // _BITS, hits] |= np.uint64(1) << np.uint64(ipat % _BITS)
+
+    polarity = [scores[sent][0] if sent in scores else None
+                for sent in sentences]
+    subjectivity = [scores[sent][1] if sent in scores else None
+                    for sent in sentences]
+
+    columns = {
+        'Document':     pa.DictionaryArray.from_arrays(
+            pa.array(np.zeros(nsent, dtype=np.int32)), pa.array([document])),
+        'Year':         pa.array(np.full(nsent, year, dtype=np.int16)),
+        'Page':         pa.array(np.asarray(pages, dtype=np.int32)),
+        'Sentence':     pa.array(sentences, type=pa.large_string()),
+        'Polarity':     pa.array(polarity, type=pa.float32()),
+        'Subjectivity': pa.array(subjectivity, type=pa.float32()),
+    }
+    for iword, mask in enumerate(masks):
+        columns[f'{_COL_MASK}{iword}'] = pa.array(mask)
+    metadata = {_META_PATTERNS: json.dumps(patterns).encode('utf-8')}
+    table = pa.table(columns).replace_schema_metadata(metadata)
+
+    # Write to a temporary file first such that readers never map a partial
+    # file
+    file = Path(file)
+    file.parent.mkdir(parents=True, exist_ok=True)
+    tmp = file.with_name(f'.{file.name}.{os.getpid()}.tmp')
+    with pa.OSFile(str(tmp), 'wb') as sink:
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+    os.replace(tmp, file)
+
+
+def _get_hits(table, stored, pattern):
+    """Returns a boolean array of the sentences matching a pattern."""
+    if pattern in stored:
+        ipat = stored.index(pattern)
+        bit = pa.scalar(1 << (ipat % _BITS), type=pa.uint64())
+        column = table[f'{_COL_MASK}{ipat // _BITS}']
+        return pc.not_equal(pc.bit_wise_and(column, bit), 0)
+    return pc.match_substring_regex(table['Sentence'], pattern)
+
+
+def _get_columns():
+    return ['Document', 'Year', 'Page', 'Sentence', 'Polarity',
+            'Subjectivity']
+
+
+def _get_schema():
+    return pa.schema([
+        ('Document', pa.dictionary(pa.int32(), pa.string())),
+        ('Year', pa.int16()),
+        ('Page', pa.int32()),
+        ('Sentence', pa.large_string()),
+        ('Polarity', pa.float32()),
+        ('Subjectivity', pa.float32()),
+    ])
@@ -0,0 +1,74 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Defines a cheap check of the quality of the text extracted from a pdf page
+(empty pages, replacement characters, and garbled glyphs).
+"""
+
+# -------------------------------------------------------------------------
+#   Authors: Christoph Jaeggli
+#   Institute: (None)
+#
+#   MIT License
+#   Copyright (c) 2020 Christoph Jaeggli
+#
+#   This program is distributed in the hope that it will be useful, but
+#   WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+
+
+# Standard library
+# Third party requirements
+# Local imports
+
+# Constants
+_REPLACEMENT = '\ufffd'          # U+FFFD REPLACEMENT CHARACTER
+
+
+class TextQuality:
+    """Classifies the extracted text of a page as good or poor.
+
+    The text of a page is good if
+        - it has at least `min_chars` non-whitespace characters,
+        - at most `max_replacement` of them are replacement characters
+          (glyphs the backend could not map), and
+        - at least `min_alnum` of them are letters or digits (a wrongly
+          decoded font yields mostly symbols and punctuation, whereas tables
+          consist of digits).
+
+    Args:
+        min_chars (int, optional): Minimal number of characters.
+        max_replacement (float, optional): Maximal share of replacement
+            characters.
+        min_alnum (float, optional): Minimal share of letters and digits.
+    """
+
+    def __init__(self, min_chars=20, max_replacement=0.01, min_alnum=0.5):
+        self.min_chars = min_chars
+        self.max_replacement = max_replacement
+        self.min_alnum = min_alnum
+
+    def score(self, text):
+        """Returns the number of non-whitespace characters of a page, the
+        share of replacement characters, and the share of letters and digits.
+        """
+        chars = ''.join(text.split())
+        if not chars:
+            return 0, 0., 0.
+        nrepl = chars.count(_REPLACEMENT)
+        nalnum = sum(ch.isalnum() for ch in chars)
+        return len(chars), nrepl / len(chars), nalnum / len(chars)
+
+    def is_good(self, text):
+        """Checks if the text of a page is good."""
+        return self._check(*self.score(text))
+
+    def rank(self, text):
+        """Returns a key that orders two extractions of the same page (good
+        before poor, then by the number of letters and digits).
+        """
+        nchars, repl, alnum = self.score(text)
+        return self._check(nchars, repl, alnum), round(nchars * (alnum - repl))
+
+    def _check(self, nchars, repl, alnum):
+        return nchars >= self.min_chars and repl <= self.max_replacement \
+            and alnum >= self.min_alnum
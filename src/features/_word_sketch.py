@@ -0,0 +1,196 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Defines an approximate word counter of fixed size (Count-Min sketch plus
+Space-Saving heavy hitters) that can be merged across workers.
+"""
+
+# -------------------------------------------------------------------------
+#   Authors: Christoph Jaeggli
+#   Institute: (None)
+#
+#   MIT License
+#   Copyright (c) 2020 Christoph Jaeggli
+#
+#   This program is distributed in the hope that it will be useful, but
+#   WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+
+
+# Standard library
+from collections import Counter
+from itertools import islice
+import hashlib
+import math
+import re
+# Third party requirements
+import numpy as np
+# Local imports
+
+# Constants
+_BATCH_SIZE = 100000
+
+
+class WordSketch:
+    """Counts words approximately in a fixed amount of memory.
+
+    A Count-Min sketch of `depth x width` counters estimates the count of any
+    word. The estimate is never too small and, with probability `1 - delta`,
+    at most `epsilon * N` too large (N is the number of counted words). The
+    `ntop` most frequent words are tracked by Space-Saving: each tracked word
+    has a count that is never too small and an error such that
+    `count - error` is never too large. The counts of the words matching the
+    `patterns` are summed exactly.
+
+    Two sketches with the same parameters can be merged (c.f. `merge`), e.g.
+    to combine the sketches of several workers.
+
+    Args:
+        epsilon (float, optional): Relative error bound of the estimates.
+        delta (float, optional): Probability of exceeding the error bound.
+        ntop (int, optional): Number of tracked heavy hitters.
+        patterns (list of str, optional): Regex patterns whose word counts
+            are summed.
+        seed (int, optional): Seed of the hash functions.
+    """
+
+    def __init__(self, epsilon=1e-4, delta=1e-3, ntop=1000, patterns=(),
+                 seed=0):
+        self.epsilon = epsilon
+        self.delta = delta
+        self.ntop = ntop
+        self.patterns = [str(pat) for pat in patterns]
+        self.seed = seed
+        self.width = math.ceil(math.e / epsilon)
+        self.depth = math.ceil(math.log(1 / delta))
+        self.nwords = 0
+
+        self._table = np.zeros((self.depth, self.width), dtype=np.int64)
+        self._heavy = {}            # word -> [count, error]
+        self._floor = 0             # upper bound of the untracked counts
+        self._sums = dict.fromkeys(self.patterns, 0)
+        self._regexes = [re.compile(pat) for pat in self.patterns]
+        self._salt = seed.to_bytes(8, 'little', signed=True)
+
+    @property
+    def nbytes(self):
+        """Approximate memory of the sketch in bytes (bounded by the
+        parameters, independent of the number of counted words).
+        """
+        heavy = sum(len(word) + 2 * 8 for word in self._heavy)
+        return self._table.nbytes + heavy
+
+    def update(self, words):
+        """Counts some words.
+
+        Args:
+            words (iterable of str): Words (e.g. the tokens of a text).
+
+        Returns:
+            None
+        """
+        words = iter(words)
+        while True:
+            batch = Counter(islice(words, _BATCH_SIZE))
+            if not batch:
+                return
+            self._add(batch)
+
+    def merge(self, other):
+        """Adds the counts of another sketch with the same parameters.
+
+        Args:
+            other (WordSketch): Sketch.
+
+        Returns:
+            WordSketch: The sketch itself.
+        """
+        params = ('width', 'depth', 'ntop', 'patterns', 'seed')
+        if any(getattr(self, key) != getattr(other, key) for key in params):
+            raise ValueError('Only sketches with the same parameters can be '
+                             'merged.')
+        self._table += other._table
+        self.nwords += other.nwords
+        for pat in self.patterns:
+            self._sums[pat] += other._sums[pat]
+        self._merge_heavy(other._heavy, other._floor)
+        return self
+
+    def estimate(self, word):
+        """Returns the estimated count of a word and its error bound, i.e.
+        the true count is in `[count - error, count]` (with probability
+        `1 - delta` if the word is not a tracked heavy hitter).
+        """
+        rows = np.arange(self.depth)
+        count = int(self._table[rows, self._get_columns([word])[:, 0]].min())
+        if word in self._heavy:
+            hcount, herror = self._heavy[word]
+            count = min(count, hcount)
+            return count, count - max(hcount - herror, 0)
+        return count, min(count, self._get_bound())
+
+    def most_common(self, n=None):
+        """Returns the `n` most frequent words (all tracked words if None).
+
+        Returns:
+            list of tuple: `(word, count, error)` in descending order of the
+                counts (c.f. `estimate`).
+        """
+        top = sorted(self._heavy, key=lambda w: self._heavy[w][0],
+                     reverse=True)
+        return [(word, *self.estimate(word)) for word in top[:n]]
+
+    def pattern_sum(self, pattern):
+        """Returns the (exact) number of words matching a pattern given at
+        construction.
+        """
+        if str(pattern) not in self._sums:
+            raise ValueError(f"Pattern r'{pattern}' is not tracked by the "
+                             f"sketch.")
+        return self._sums[str(pattern)]
+
+    def _add(self, batch):
+        """Adds the exact counts of a batch of words."""
+        words = list(batch)
+        counts = np.fromiter(batch.values(), dtype=np.int64, count=len(words))
+        columns = self._get_columns(words)
+        for row in range(self.depth):
+            np.add.at(self._table[row], columns[row], counts)
+        self.nwords += int(counts.sum())
+
+        for pat, regex in zip(self.patterns, self._regexes):
+            self._sums[pat] += sum(cnt for word, cnt in batch.items()
+                                   if regex.search(word) is not None)
+
+        self._merge_heavy({word: [cnt, 0] for word, cnt in batch.items()}, 0)
+
+    def _merge_heavy(self, heavy, floor):
+        """Merges Space-Saving summaries and keeps the `ntop` largest counts
+        (an untracked word of a summary counts as its floor).
+        """
+        merged = {}
+        for word in self._heavy.keys() | heavy.keys():
+            c1, e1 = self._heavy.get(word, (self._floor, self._floor))
+            c2, e2 = heavy.get(word, (floor, floor))
+            merged[word] = [c1 + c2, e1 + e2]
+
+        self._floor += floor
+        if len(merged) > self.ntop:
+            top = sorted(merged, key=lambda w: merged[w][0], reverse=True)
+            self._floor = max(self._floor, merged[top[self.ntop]][0])
+            merged = {word: merged[word] for word in top[:self.ntop]}
+        self._heavy = merged
+
+    def _get_bound(self):
+        """Returns the error bound of the Count-Min estimates."""
+        return math.ceil(self.epsilon * self.nwords)
+
+    def _get_columns(self, words):
+        """Returns the column of each word in each row, shape (depth, n)."""
+        digests = [hashlib.blake2b(word.encode('utf-8'), digest_size=8,
+                                   salt=self._salt).digest() for word in words]
+        hashes = np.frombuffer(b''.join(digests), dtype=np.uint64)
+        h1 = hashes & np.uint64(0xffffffff)
+        h2 = (hashes >> np.uint64(32)) | np.uint64(1)
+        rows = np.arange(self.depth, dtype=np.uint64)[:, None]
+        return ((h1[None, :] + rows * h2[None, :]) %
+                np.uint64(self.width)).astype(np.int64)
@@ -0,0 +1,103 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Builds hashed text features for each report (optional feature stage).
+
+The sentences of each pdf file (c.f. `utl.get_sentences_from_pdf`) are
+mapped by the hashing trick to a sparse vector of `TEXT_HASH_NFEATURES`
+buckets (c.f. `_hashed_text.HashedTextVectorizer`). Nothing is fitted, hence
+the memory is bounded by the number of buckets and the batch size, no matter
+how many reports there are. The vectors are written as `.npz` files to
+`data/interim/hashed` and joined with the other columns by
+`utl.load_data(..., hashed=True)`.
+"""
+
+# -------------------------------------------------------------------------
+#   Author(s): Christoph Jaeggli
+#   Institute: (None)
+#
+#   MIT License
+#   Copyright (c) 2020 Christoph Jaeggli
+#
+#   This program is distributed in the hope that it will be useful, but
+#   WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+
+# Standard library
+from pathlib import Path
+import argparse
+# Third party requirements
+import scipy.sparse as sp
+# Local imports
+from src._paths import PATH_DATA_RAW, PATH_DATA_HASHED
+from src._settings import TEXT_HASH_NFEATURES, TEXT_HASH_BATCH
+from src.data.make_dataset import get_raw_file_pairs
+from src.features._hashed_text import HashedTextVectorizer
+import src.utils as utl
+
+
+def build_hashed_features(pairs, nfeatures=TEXT_HASH_NFEATURES,
+                          batch_size=TEXT_HASH_BATCH, force=False):
+    """Writes the hashed text features of the reports that are not up to
+    date.
+
+    Args:
+        pairs (list of tuple): Pairs of .pdf and .json files (c.f.
+            `get_raw_file_pairs`).
+        nfeatures (int, optional): Number of hash buckets.
+        batch_size (int, optional): Number of sentences vectorized at once.
+        force (bool, optional): Rebuild also the features that are up to
+            date.
+
+    Returns:
+        list of str: File names for which the features have been built.
+    """
+    vectorizer = HashedTextVectorizer(nfeatures, batch_size=batch_size)
+    Path(PATH_DATA_HASHED).mkdir(parents=True, exist_ok=True)
+
+    built = []
+    for pdf_file, _ in pairs:
+        filename = pdf_file.stem
+        file = utl.get_hashed_file(filename)
+        if not force and _is_up_to_date(file, pdf_file, nfeatures):
+            continue
+
+        print(f'Hash text of {filename}...', end='')
+        sentences = utl.get_sentences_from_pdf(PATH_DATA_RAW, filename)
+        sp.save_npz(file, vectorizer.transform(sentences))
+        built.append(filename)
+        print('done')
+
+    return built
+
+
+def _is_up_to_date(file, pdf_file, nfeatures):
+    """Checks if the features are newer than the pdf and have the requested
+    number of buckets.
+    """
+    try:
+        if file.stat().st_mtime < pdf_file.stat().st_mtime:
+            return False
+    except FileNotFoundError:
+        return False
+    return sp.load_npz(file).shape[1] == nfeatures
+
+
+def _parse_args():
+    """Parses the command line arguments."""
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--nfeatures', type=int, default=TEXT_HASH_NFEATURES,
+                        help='number of hash buckets')
+    parser.add_argument('--batch', type=int, default=TEXT_HASH_BATCH,
+                        help='number of sentences vectorized at once')
+    parser.add_argument('--force', action='store_true',
+                        help='rebuild also the features that are up to date')
+    return parser.parse_args()
+
+
+if __name__ == '__main__':
+    args = _parse_args()
+
+    pairs = get_raw_file_pairs(PATH_DATA_RAW)
+    built = build_hashed_features(pairs, nfeatures=args.nfeatures,
+                                  batch_size=args.batch, force=args.force)
+    print(f'Built hashed features of {len(built)} reports')
@@ -0,0 +1,290 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Long-running local NLP service that keeps the nltk/spaCy/TextBlobDE models
+warm, plus a thin client for the scripts.
+
+Start the service by::
+
+    python -m src.nlp_service [--nprocs N]
+
+It listens on `NLP_SERVICE_HOST:NLP_SERVICE_PORT` (localhost HTTP) and
+processes concurrent requests by a pool of worker processes, each of them
+importing the NLP models once. A job is posted as json to `/job`:
+
+    {"job": "sentences",   "args": {"path": str, "filename": str}}
+    {"job": "mood",        "args": {"path": str, "filename": str,
+                                    "patterns": list of str}}
+    {"job": "corpus_mood", "args": {"path": str, "pattern": str,
+                                    "filenames": list of str (optional)}}
+
+The client functions (`get_sentences`, `compute_file_mood`, ...) use the
+service if it is running and fall back to the local computation otherwise.
+Note that this module does not import `src.utils` at module level such that
+a client does not pay the model load when the service is running.
+"""
+
+# -------------------------------------------------------------------------
+#   Author(s): Christoph Jaeggli
+#   Institute: (None)
+#
+#   MIT License
+#   Copyright (c) 2020 Christoph Jaeggli
+#
+#   This program is distributed in the hope that it will be useful, but
+#   WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+
+# Standard library
+from concurrent.futures import ProcessPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+import argparse
+import json
+import os
+import urllib.error
+import urllib.request
+# Third party requirements
+# Local imports
+from src._settings import NLP_SERVICE_HOST, NLP_SERVICE_PORT
+
+# Constants
+_PING_TIMEOUT = 0.5
+_JOB_TIMEOUT = None
+
+
+# Public functions (client)
+def compute_corpus_mood(path, pattern, filenames=None):
+    """Computes the summary mood of a pattern for each pdf file in a folder.
+
+    Args:
+        path (Path): Path to the .pdf files.
+        pattern (str): Regex pattern.
+        filenames (list of str, optional): File names, default is all the
+            .pdf files in `path`.
+
+    Returns:
+        dict: Summary mood (c.f. `utl.compute_pat_mood`) per file name.
+    """
+    args = {'path': str(path), 'pattern': pattern, 'filenames': filenames}
+    return _submit_or_run('corpus_mood', args)
+
+
+def compute_file_mood(path, filename, patterns):
+    """Computes the summary mood of several patterns for a pdf file.
+
+    Args:
+        path (Path): Path to the .pdf file.
+        filename (str): File name.
+        patterns (list of str): Regex patterns.
+
+    Returns:
+        dict: Summary mood (c.f. `utl.compute_pat_mood`) per pattern.
+    """
+    args = {'path': str(path), 'filename': filename,
+            'patterns': list(patterns)}
+    return _submit_or_run('mood', args)
+
+
+def get_sentences(path, filename):
+    """Returns the normalized sentences of a pdf file (c.f.
+    `utl.get_sentences_from_pdf`).
+
+    Args:
+        path (Path): Path to the .pdf file.
+        filename (str): File name.
+
+    Returns:
+        list of str: List of sentences.
+    """
+    args = {'path': str(path), 'filename': filename}
+    return _submit_or_run('sentences', args)
+
+
+def is_running(host=NLP_SERVICE_HOST, port=NLP_SERVICE_PORT):
+    """Checks whether the service is running.
+
+    Returns:
+        bool: True if the service answers.
+    """
+    try:
+        with urllib.request.urlopen(f'http://{host}:{port}/ping',
+                                    timeout=_PING_TIMEOUT) as resp:
+            return resp.status == 200
+    except (urllib.error.URLError, OSError):
+        return False
+
+
+def submit(job, args, host=NLP_SERVICE_HOST, port=NLP_SERVICE_PORT):
+    """Submits a job to the running service and returns its result.
+
+    Args:
+        job (str): Name of the job (c.f. module docstring).
+        args (dict): Job arguments.
+
+    Returns:
+        object: Result of the job.
+
+    Raises:
+        ConnectionError: If the service is not reachable.
+        RuntimeError: If the job failed on the service side.
+    """
+    body = json.dumps({'job': job, 'args': args}).encode('utf-8')
+    request = urllib.request.Request(
+        f'http://{host}:{port}/job', data=body,
+        headers={'Content-Type': 'application/json'})
+    try:
+        with urllib.request.urlopen(request, timeout=_JOB_TIMEOUT) as resp:
+            answer = json.loads(resp.read().decode('utf-8'))
+    except urllib.error.HTTPError as err:
+        answer = json.loads(err.read().decode('utf-8'))
+        raise RuntimeError(f"Job '{job}' failed: {answer['error']}") from err
+    except (urllib.error.URLError, OSError) as err:
+        raise ConnectionError(f'NLP service at {host}:{port} is not '
+                              f'reachable.') from err
+
+    return answer['result']
+
+
+# Public functions (service)
+def serve(host=NLP_SERVICE_HOST, port=NLP_SERVICE_PORT, nprocs=None):
+    """Runs the service until it is interrupted.
+
+    Args:
+        host (str, optional): Host name.
+        port (int, optional): Port.
+        nprocs (int, optional): Number of worker processes.
+
+    Returns:
+        None
+    """
+    nworkers = nprocs or os.cpu_count() or 1
+    with ProcessPoolExecutor(max_workers=nworkers,
+                             initializer=_init_worker) as executor:
+        # Start all the workers now such that the models are warm
+        for _ in executor.map(_ping_worker, range(nworkers)):
+            pass
+
+        handler = type('_BoundHandler', (_Handler,), {'executor': executor})
+        server = ThreadingHTTPServer((host, port), handler)
+        print(f'NLP service with {nworkers} workers listening on '
+              f'{host}:{port}')
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+
+
+# Private functions
+def _submit_or_run(job, args):
+    """Runs the job on the service if it is running, locally otherwise."""
+    if is_running():
+        try:
+            return submit(job, args)
+        except ConnectionError:
+            pass
+    return _run_job(job, args)
+
+
+def _init_worker():
+    """Loads the NLP models in a worker process."""
+    import src.utils as utl
+    utl.normalize_text('Die Kunden sind zufrieden.')
+
+
+def _ping_worker(_):
+    """Dummy task to start a worker process."""
+    return True
+
+
+def _run_job(job, args):
+    """Runs a job (in the current process)."""
+    try:
+        func = _JOBS[job]
+    except KeyError:
+        raise ValueError(f"Unknown job '{job}'.")
+    return func(**args)
+
+
+def _job_sentences(path, filename):
+    """Job 'sentences'."""
+    import src.utils as utl
+    return utl.get_sentences_from_pdf(Path(path), filename)
+
+
+def _job_mood(path, filename, patterns):
+    """Job 'mood'."""
+    import src.utils as utl
+    sentences = utl.get_sentences_from_pdf(Path(path), filename)
+    return {pat: utl.compute_pat_mood(pat, sentences, summary=True)
+            for pat in patterns}
+
+
+def _job_corpus_mood(path, pattern, filenames=None):
+    """Job 'corpus_mood'."""
+    import src.utils as utl
+    if filenames is None:
+        filenames = sorted(f.stem for f in Path(path).glob('*.pdf'))
+
+    moods = {}
+    for filename in filenames:
+        sentences = utl.get_sentences_from_pdf(Path(path), filename)
+        moods[filename] = utl.compute_pat_mood(pattern, sentences,
+                                               summary=True)
+    return moods
+
+
+_JOBS = {
+    'sentences':    _job_sentences,
+    'mood':         _job_mood,
+    'corpus_mood':  _job_corpus_mood,
+}
+
+
+class _Handler(BaseHTTPRequestHandler):
+    """Request handler that forwards the jobs to the process pool."""
+
+    executor = None
+
+    def do_GET(self):
+        if self.path == '/ping':
+            self._answer(200, {'result': 'pong'})
+        else:
+            self._answer(404, {'error': f'Unknown path {self.path}'})
+
+    def do_POST(self):
+        if self.path != '/job':
+            self._answer(404, {'error': f'Unknown path {self.path}'})
+            return
+
+        length = int(self.headers.get('Content-Length', 0))
+        try:
+            request = json.loads(self.rfile.read(length).decode('utf-8'))
+            future = self.executor.submit(_run_job, request['job'],
+                                          request.get('args', {}))
+            self._answer(200, {'result': future.result()})
+        except Exception as err:
+            self._answer(500, {'error': f'{err.__class__.__name__}: {err}'})
+
+    def log_message(self, format, *args):
+        pass
+
+    def _answer(self, status, content):
+        body = json.dumps(content).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--host', default=NLP_SERVICE_HOST)
+    parser.add_argument('--port', type=int, default=NLP_SERVICE_PORT)
+    parser.add_argument('--nprocs', type=int, default=None,
+                        help='number of worker processes')
+    args = parser.parse_args()
+
+    serve(args.host, args.port, args.nprocs)
@@ -0,0 +1,320 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Built-in profiling of the scripts in `src/data` and `src/visualization`.
+
+A script is profiled by its option `--profile [deterministic|sampling]` or by
+the environment variable `JFF_PROFILE` (same values, `1` for deterministic)::
+
+    python -m src.data.make_dataset --profile
+    JFF_PROFILE=sampling python -m src.visualization.print_clf_performance
+
+The time is attributed to the stages the script marks by `stage(name)`, the
+rest goes to the stage 'main'. For each stage it writes to `reports/profiles`
+
+    <script>-<stage>.pstats       cProfile statistics (deterministic only),
+    <script>-<stage>.collapsed    collapsed stacks for flame graphs,
+
+and prints the hot functions together with the time spent inside TextBlobDE,
+spaCy, and fitz. The stacks are sampled every `PROFILE_INTERVAL` seconds in
+both modes. Only the main thread of the main process is profiled, e.g. use
+the sequential mode of `make_dataset.py` rather than `--pipeline`.
+"""
+
+# -------------------------------------------------------------------------
+#   Author(s): Christoph Jaeggli
+#   Institute: (None)
+#
+#   MIT License
+#   Copyright (c) 2020 Christoph Jaeggli
+#
+#   This program is distributed in the hope that it will be useful, but
+#   WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+
+# Standard library
+from collections import Counter
+from contextlib import contextmanager, nullcontext
+from pathlib import Path
+import cProfile
+import os
+import pstats
+import sys
+import threading
+import time
+# Third party requirements
+# Local imports
+from src._paths import PATH_REP_PROF
+from src._settings import PROFILE_ENV, PROFILE_INTERVAL, PROFILE_PACKAGES
+
+# Constants
+_MODES = ['deterministic', 'sampling']
+_MAIN_STAGE = 'main'
+_NTOP = 15
+_SPACE_INDENT = 4
+
+# Active profiler of the process (c.f. `profile`)
+_ACTIVE = None
+
+
+class Profiler:
+    """Profiles the stages of a script.
+
+    Args:
+        name (str): Name of the script (prefix of the written files).
+        mode (str {'deterministic', 'sampling'}, optional): Profiling mode.
+        interval (float, optional): Sampling interval in seconds.
+        path (Path, optional): Output folder.
+    """
+
+    def __init__(self, name, mode='deterministic', interval=PROFILE_INTERVAL,
+                 path=PATH_REP_PROF):
+        if mode not in _MODES:
+            raise ValueError(f"Unknown profiling mode '{mode}'.")
+        self.name = name
+        self.mode = mode
+        self._interval = interval
+        self._path = Path(path)
+        self._profiles = {}
+        self._samples = {}
+        self._elapsed = Counter()
+        self._stack = []
+        self._ident = threading.get_ident()
+        self._stop = threading.Event()
+        self._sampler = threading.Thread(target=self._sample, daemon=True)
+
+    def __enter__(self):
+        self._sampler.start()
+        self._push(_MAIN_STAGE)
+        return self
+
+    def __exit__(self, *exc):
+        self._pop()
+        self._stop.set()
+        self._sampler.join()
+        self.dump()
+        return False
+
+    @contextmanager
+    def stage(self, name):
+        """Attributes the time spent in the body of a with statement to the
+        stage `name`.
+        """
+        self._push(name)
+        try:
+            yield
+        finally:
+            self._pop()
+
+    def dump(self, ntop=_NTOP):
+        """Writes the profiles and prints the hot functions of each stage.
+
+        Args:
+            ntop (int, optional): Number of hot functions to print.
+
+        Returns:
+            list of Path: Written files.
+        """
+        self._path.mkdir(parents=True, exist_ok=True)
+
+        files = []
+        print(f'\nProfile of {self.name} ({self.mode}) in {self._path}')
+        for stage in self._elapsed:
+            prefix = Path(self._path, f'{self.name}-{stage}')
+            samples = self._samples.get(stage, Counter())
+            files.append(_write_collapsed(prefix, samples))
+
+            print(f'\n{" "*_SPACE_INDENT}Stage {stage} '
+                  f'({self._elapsed[stage]:.2f}s)')
+            if self.mode == 'deterministic':
+                stats = pstats.Stats(self._profiles[stage])
+                file = prefix.with_suffix('.pstats')
+                stats.dump_stats(file)
+                files.append(file)
+                _print_stats(stats, ntop)
+            else:
+                _print_samples(samples, self._interval, ntop)
+
+        return files
+
+    def _push(self, stage):
+        """Switches to a (nested) stage."""
+        now = time.perf_counter()
+        if self._stack:
+            self._suspend(self._stack[-1][0], now)
+        self._stack.append([stage, now])
+        self._resume(stage)
+
+    def _pop(self):
+        """Leaves the current stage and resumes the enclosing one."""
+        now = time.perf_counter()
+        stage, _ = self._stack[-1]
+        self._suspend(stage, now)
+        self._stack.pop()
+        if self._stack:
+            self._stack[-1][1] = now
+            self._resume(self._stack[-1][0])
+
+    def _resume(self, stage):
+        if self.mode == 'deterministic':
+            self._profiles.setdefault(stage, cProfile.Profile()).enable()
+
+    def _suspend(self, stage, now):
+        if self.mode == 'deterministic':
+            self._profiles[stage].disable()
+        self._elapsed[stage] += now - self._stack[-1][1]
+
+    def _sample(self):
+        """Samples the stack of the profiled thread (runs in a thread)."""
+        while not self._stop.wait(self._interval):
+            frame = sys._current_frames().get(self._ident)
+            if frame is None or not self._stack:
+                continue
+            stage = self._stack[-1][0]
+            counts = self._samples.setdefault(stage, Counter())
+            counts[_get_stack(frame)] += 1
+
+
+def add_profile_argument(parser):
+    """Adds the option `--profile` to an argument parser."""
+    parser.add_argument('--profile', nargs='?', const=_MODES[0],
+                        default=None, choices=_MODES,
+                        help=f'profile the script and write the results to '
+                             f'reports/profiles (also by the environment '
+                             f'variable {PROFILE_ENV})')
+
+
+def get_profile_mode(mode=None):
+    """Returns the profiling mode of the option `--profile` or, if it is not
+    given, of the environment variable `PROFILE_ENV` (None if disabled).
+    """
+    if mode is not None:
+        return mode
+
+    value = os.environ.get(PROFILE_ENV, '').strip().lower()
+    if value in ('', '0', 'false', 'no'):
+        return None
+    if value in ('1', 'true', 'yes'):
+        return _MODES[0]
+    if value not in _MODES:
+        raise ValueError(f"Unknown profiling mode '{value}' in "
+                         f"{PROFILE_ENV}, use one of {_MODES}.")
+    return value
+
+
+def profile(name, mode=None):
+    """Returns a context manager that profiles its body if profiling is
+    enabled (c.f. `get_profile_mode`).
+
+    Args:
+        name (str): Name of the script.
+        mode (str, optional): Value of the option `--profile`.
+
+    Returns:
+        Profiler or nullcontext
+    """
+    global _ACTIVE
+
+    mode = get_profile_mode(mode)
+    if mode is None:
+        return nullcontext()
+    _ACTIVE = Profiler(name, mode)
+    return _ACTIVE
+
+
+def stage(name):
+    """Returns a context manager that attributes the time of its body to the
+    stage `name` of the active profiler (no-op if none is active).
+    """
+    if _ACTIVE is None or not _ACTIVE._stack:
+        return nullcontext()
+    return _ACTIVE.stage(name)
+
+
+# Private functions
+def _get_label(code):
+    """Returns the label of a function in the stacks and tables."""
+    return f'{code.co_name} ({code.co_filename}:{code.co_firstlineno})'
+
+
+def _get_stack(frame):
+    """Returns the collapsed stack (root first, separated by ';')."""
+    labels = []
+    while frame is not None:
+        labels.append(_get_label(frame.f_code))
+        frame = frame.f_back
+    return ';'.join(reversed(labels))
+
+
+def _get_package(filename):
+    """Returns the name of the watched package a file belongs to (c.f.
+    `PROFILE_PACKAGES`), None if there is none.
+    """
+    parts = Path(filename).parts
+    for name, modules in PROFILE_PACKAGES.items():
+        if any(mod in parts or Path(filename).stem == mod for mod in modules):
+            return name
+    return None
+
+
+def _print_stats(stats, ntop):
+    """Prints the hot functions of deterministic statistics by self time."""
+    rows = sorted(stats.stats.items(), key=lambda x: x[1][2], reverse=True)
+
+    indent = ' ' * 2 * _SPACE_INDENT
+    print(f'{indent}{"SELF [s]":>10}{"CUM [s]":>10}{"CALLS":>10}  FUNCTION')
+    for (file, line, func), (_, ncalls, tt, ct, _) in rows[:ntop]:
+        print(f'{indent}{tt:10.3f}{ct:10.3f}{ncalls:10d}  '
+              f'{func} ({file}:{line})')
+
+    _print_packages(_get_package_times(stats))
+
+
+def _get_package_times(stats):
+    """Returns the inclusive time spent inside each watched package, i.e.
+    the cumulative time of the calls that enter the package from outside
+    (c.f. the caller graph of `pstats`). As for the sampled stacks, the time
+    of C functions called by the package counts as well.
+    """
+    inside = Counter()
+    for (file, _, _), (_, _, _, _, callers) in stats.stats.items():
+        package = _get_package(file)
+        if package is None:
+            continue
+        for (cfile, _, _), (_, _, _, ct) in callers.items():
+            if _get_package(cfile) != package:
+                inside[package] += ct
+    return inside
+
+
+def _print_samples(samples, interval, ntop):
+    """Prints the hot functions of sampled stacks by self time."""
+    own = Counter()
+    inside = Counter()
+    for stack, count in samples.items():
+        labels = stack.split(';')
+        own[labels[-1]] += count
+        files = [lbl.rsplit(' (', 1)[-1].rsplit(':', 1)[0] for lbl in labels]
+        for package in {_get_package(file) for file in files} - {None}:
+            inside[package] += count * interval
+
+    indent = ' ' * 2 * _SPACE_INDENT
+    print(f'{indent}{"SELF [s]":>10}{"SAMPLES":>10}  FUNCTION')
+    for label, count in own.most_common(ntop):
+        print(f'{indent}{count * interval:10.3f}{count:10d}  {label}')
+    _print_packages(inside)
+
+
+def _print_packages(inside):
+    """Prints the time spent inside the watched packages."""
+    indent = ' ' * 2 * _SPACE_INDENT
+    for name in PROFILE_PACKAGES:
+        print(f'{indent}inside {name:12}{inside[name]:10.3f}s')
+
+
+def _write_collapsed(prefix, samples):
+    """Writes collapsed stacks (`stack count` per line)."""
+    file = prefix.with_suffix('.collapsed')
+    with open(file, 'w') as cfile:
+        for stack, count in sorted(samples.items()):
+            cfile.write(f'{stack} {count}\n')
+    return file
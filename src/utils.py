@@ -17,7 +17,9 @@
 # Standard library
 import re
 from pathlib import Path
+import hashlib
 import json
+import time
 # Third party requirements
 import PyPDF2
 import fitz
@@ -26,35 +28,69 @@ from textblob_de import TextBlobDE
 import spacy
 import pandas as pd
 import numpy as np
-from sklearn import preprocessing
+import scipy.sparse as sp
 # Local imports
-from src._settings import DF_COL_YEAR, DF_COL_PROFIT, DF_COL_NWORDS,\
-    DF_COL_COUNT, DF_COL_POL
-from src._settings import PROFIT_NORMALIZATION
+from src._paths import PATH_DATA_HASHED
+from src._settings import DF_COL_COMPANY, DF_COL_YEAR, DF_COL_PROFIT,\
+    DF_COL_NWORDS, DF_COL_COUNT, DF_COL_POL, DF_COL_HASH
+from src._settings import PROFIT_NORMALIZATION, SEED
+from src._settings import MOOD_NSAMPLES
+from src.features._mood_summary import MoodSummary
+from src._settings import SENTENCE_SPLITTER, SENTENCE_ABBREVIATIONS
+from src.features._sentence_splitter import GermanSentenceSplitter
+from src._settings import PAGE_MIN_ALPHA, PAGE_MIN_WORDS, PAGE_MAX_CELLS
+from src.features._page_filter import PageFilter, get_layout
+from src._settings import PDF_BACKEND, PDF_MIN_CHARS, PDF_MAX_REPLACEMENT,\
+    PDF_MIN_ALNUM, PDF_MAX_POOR
+from src.features._text_quality import TextQuality
+
+# Constants
+_PAGE_SEP = '\n'
+_PDF_BACKENDS = ['fitz', 'PyPDF2']      # Fastest first (c.f. `read_pdf`)
+_GERMAN_SPLITTER = GermanSentenceSplitter(SENTENCE_ABBREVIATIONS)
 
 
 # Public functions
-def compute_pat_mood(pattern, sentences):
+def compute_pat_mood(pattern, sentences, summary=False, scores=None):
     """Computes the polarity and the subjectivity of each sentence containing
     the given pattern.
 
     Args:
         pattern (str): Regex pattern.
-        sentences (list of str): List of sentences
+        sentences (list of str): List of sentences (any iterable of str if
+            `summary` is True).
+        summary (bool, optional): Keep only running statistics and a fixed
+            number of example sentences instead of all the matches.
+        scores (dict, optional): Known `(polarity, subjectivity)` per
+            sentence (c.f. `compute_sentence_scores`), the other sentences
+            are scored by TextBlobDE.
 
     Returns:
         dict: Dict with fields 'sentences', 'polarity' and 'subjectivity' that
             contains the sentence, a polarity, and a subjectivity measure for
-            each sentence containing the given pattern.
+            each sentence containing the given pattern. If `summary` is True,
+            the dict has the fields 'Count', 'Polarity' and 'Subjectivity'
+            (each with 'Mean', 'Var', 'Min', 'Max'), and 'Examples'.
     """
     pat = re.compile(pattern)
+    if scores is None:
+        scores = {}
+
+    if summary:
+        stats = MoodSummary(nsamples=MOOD_NSAMPLES, seed=SEED)
+        for sent in sentences:
+            if re.search(pat, sent) is not None:
+                pol, subj = scores.get(sent) or _score_sentence(sent)
+                stats.update(sent, pol, subj)
+        return stats.to_dict()
+
     index, polarity, subjectivity = [], [], []
     for i, sent in enumerate(sentences):
         if re.search(pat, sent) is not None:
-            blob = TextBlobDE(sent)
+            pol, subj = scores.get(sent) or _score_sentence(sent)
             index.append(i)
-            polarity.append(blob.sentiment.polarity)
-            subjectivity.append(blob.sentiment.subjectivity)
+            polarity.append(pol)
+            subjectivity.append(subj)
 
     mood = dict([
         ('Sentences', [sentences[j] for j in index]),
@@ -64,6 +100,78 @@ def compute_pat_mood(pattern, sentences):
     return mood
 
 
+def compute_sentence_scores(sentences, dedup=None):
+    """Computes the polarity and the subjectivity of some sentences, reusing
+    the scores of exact and near duplicates stored in `dedup`.
+
+    Args:
+        sentences (iterable of str): Sentences.
+        dedup (SentenceDeduplicator, optional): Store of scored sentences,
+            it is updated with the new sentences.
+
+    Returns:
+        tuple: `(scores, stats)` where `scores` maps each sentence to its
+            `(polarity, subjectivity)` and `stats` counts the 'Exact', the
+            'Near', and the 'New' sentences.
+    """
+    sentences = list(dict.fromkeys(sentences))
+    exact, near = dedup.lookup(sentences) if dedup is not None else ({}, {})
+
+    new = {sent: _score_sentence(sent) for sent in sentences
+           if sent not in exact and sent not in near}
+    if dedup is not None:
+        dedup.add({**near, **new})
+
+    stats = {'Exact': len(exact), 'Near': len(near), 'New': len(new)}
+    return {**exact, **near, **new}, stats
+
+
+def filter_pages(document, page_filter=None):
+    """Removes the pages with little prose (tables, financial statements,
+    etc.) from a document (c.f. `read_pdf`).
+
+    Notes
+        The layout hints are used if the document has been read with
+        `layout=True`. The numbers of the removed pages are stored in
+        `document['metadata']['skipped_pages']` and the original numbers of
+        the kept pages in `document['metadata']['page_numbers']`.
+
+    Args:
+        document (dict): Document as returned by `read_pdf`.
+        page_filter (PageFilter, optional): Page classifier, default uses the
+            thresholds `PAGE_MIN_ALPHA`, `PAGE_MIN_WORDS`, and
+            `PAGE_MAX_CELLS` from the settings.
+
+    Returns:
+        dict: Document with the prose pages only.
+    """
+    if page_filter is None:
+        page_filter = PageFilter(PAGE_MIN_ALPHA, PAGE_MIN_WORDS,
+                                 PAGE_MAX_CELLS)
+    layout = document.get('page_layout')
+
+    pages, kept, skipped = [], [], []
+    for num, page in enumerate(iter_pages(document)):
+        hint = None if layout is None else layout[num]
+        if page_filter.is_prose(page, hint):
+            pages.append(page)
+            kept.append(num)
+        else:
+            skipped.append(num)
+
+    metadata = document['metadata']
+    filtered = _make_document(metadata['name'], pages, metadata['backend'],
+                              None if layout is None else layout[kept])
+    filtered['metadata']['npages'] = metadata['npages']
+    filtered['metadata']['extraction'] = metadata['extraction']
+    if 'page_backends' in metadata:
+        filtered['metadata']['page_backends'] = \
+            [metadata['page_backends'][num] for num in kept]
+    filtered['metadata']['skipped_pages'] = skipped
+    filtered['metadata']['page_numbers'] = kept
+    return filtered
+
+
 def get_dataframe_column_names(patterns):
     """Gets the column names for pattern in the dataframe.
 
@@ -80,27 +188,128 @@ def get_dataframe_column_names(patterns):
     return columns
 
 
-def get_sentences_from_pdf(path, filename):
+def get_extraction_speed(document):
+    """Returns the pages per second of each package that has been run to
+    read a document (c.f. `read_pdf`).
+    """
+    return {backend: stats['pages'] / stats['seconds']
+            if stats['seconds'] > 0 else float('inf')
+            for backend, stats in document['metadata']['extraction'].items()}
+
+
+def get_fingerprint(*items):
+    """Computes a fingerprint of some json serializable items (e.g. plotted
+    series and styling settings).
+
+    Args:
+        *items: Items to fingerprint, numpy types are converted to python
+            scalars.
+
+    Returns:
+        str: Hex digest of the items.
+    """
+    content = json.dumps(items, sort_keys=True, default=_to_builtin)
+    return hashlib.sha256(content.encode('utf-8')).hexdigest()
+
+
+def get_hashed_file(filename):
+    """Returns the file of the hashed text features of a report (c.f.
+    `src/features/build_hashed_features.py`).
+    """
+    return Path(PATH_DATA_HASHED, filename).with_suffix('.npz')
+
+
+def get_hashed_matrix(df):
+    """Returns the hashed text features of a data frame (c.f. `load_data`
+    with `hashed=True`) as a sparse matrix.
+
+    Args:
+        df (DataFrame): Data frame with sparse columns `DF_COL_HASH*`.
+
+    Returns:
+        csr_matrix: One row per row of `df`, None if `df` has no hashed
+            text features.
+    """
+    columns = [col for col in df.columns if col.startswith(DF_COL_HASH)]
+    if not columns:
+        return None
+    return df[columns].sparse.to_coo().tocsr()
+
+
+def get_sentences_from_pdf(path, filename, splitter=None):
     """Reads a pdf file and returns the list of sentences.
 
     Args:
         path (Path): Path to the .pdf file.
         filename (str): File name.
+        splitter (str {'punkt', 'german'}, optional): Sentence splitter,
+            default is `SENTENCE_SPLITTER` from the settings.
 
     Returns:
         list of str: List of sentences.
     """
     # Read the PDF
     report = read_pdf(path, filename)
-    text = report['text']
 
+    return get_sentences_from_document(report, splitter=splitter)
+
+
+def get_sentences_from_document(document, splitter=None, pages=False):
+    """Returns the list of normalized sentences of a document (c.f.
+    `read_pdf`).
+
+    Args:
+        document (dict): Document as returned by `read_pdf`.
+        splitter (str {'punkt', 'german'}, optional): Sentence splitter,
+            default is `SENTENCE_SPLITTER` from the settings.
+        pages (bool, optional): Return the page of each sentence as well
+            (c.f. `get_sentence_pages`).
+
+    Returns:
+        list of str: List of sentences (and list of int if `pages`).
+    """
     # Split into Normalized Sentences
-    sentences = nltk.tokenize.sent_tokenize(text)
-    sentences = [normalize_text(sent) for sent in sentences]
+    raw = split_sentences(document, splitter=splitter)
+    sentences = [normalize_text(sent) for sent in raw]
 
+    if pages:
+        return sentences, get_sentence_pages(document, raw).tolist()
     return sentences
 
 
+def get_sentence_pages(document, sentences):
+    """Returns the page on which each (raw) sentence of a document starts.
+
+    Notes
+        The sentences are located in the text in the order of the splitter
+        (c.f. `split_sentences`). A sentence that is not found verbatim gets
+        the page of the previous one. The pages are numbered as in the pdf,
+        also if pages have been removed (c.f. `filter_pages`).
+
+    Args:
+        document (dict): Document as returned by `read_pdf`.
+        sentences (list of str): Raw sentences of the document.
+
+    Returns:
+        ndarray: Page number (int32) of each sentence.
+    """
+    text = document['text']
+    ends = document['page_offsets'][:, 1]
+    numbers = np.asarray(document['metadata'].get(
+        'page_numbers', np.arange(len(ends))), dtype=np.int32)
+
+    pages = np.zeros(len(sentences), dtype=np.int32)
+    pos, page = 0, 0
+    for i, sent in enumerate(sentences):
+        start = text.find(sent, pos)
+        if start >= 0:
+            page = min(int(np.searchsorted(ends, start, side='right')),
+                       len(ends) - 1)
+            pos = start + len(sent)
+        pages[i] = numbers[page] if len(numbers) else 0
+    return pages
+
+
 def get_shifted_columns(df, nmax):
     """Shifts all the columns up to nmax locations.
 
@@ -121,6 +330,10 @@ def get_shifted_columns(df, nmax):
             2     12     2.2     11      2.1     10      2.0
             3     13     2.3     12      2.2     11      2.1
 
+        If the index of the data frame has a level `DF_COL_COMPANY` (c.f.
+        `load_data`), the columns are shifted within each company such that
+        the rows of different companies are never mixed.
+
     Args:
         df (DataFrame): Data
         nshift (int): Maximal number of shifts.
@@ -128,27 +341,121 @@ def get_shifted_columns(df, nmax):
     Returns:
         DataFrame: Data with the shifted columns
     """
-    columns = df.columns
-    for i in range(nmax):
-        k = i+1
-        for col in columns:
-            col_new = f'{col}-{k}'
-            shifted = pd.DataFrame(
-                data=np.array(df[col].iloc[:-k]),
-                index=df.index[k:],
-                columns=[col_new],
-            )
-            df = pd.concat([df, shifted], axis=1, ignore_index=False)
-
-    return df
-
-
-def load_data(files, patterns, normalized=False):
+    if DF_COL_COMPANY in (df.index.names or []):
+        shifter = df.groupby(level=DF_COL_COMPANY, sort=False)
+    else:
+        shifter = df
+
+    shifted = [shifter.shift(k).add_suffix(f'-{k}') for k in range(1, nmax+1)]
+    return pd.concat([df] + shifted, axis=1)
+
+
+def get_mood_statistics(mood):
+    """Returns count and mean values of a mood (c.f. `compute_pat_mood`),
+    regardless of whether it is a full or a summary mood.
+
+    Args:
+        mood (dict): Mood of a pattern.
+
+    Returns:
+        tuple: Count, mean polarity, and mean subjectivity (the means are NaN
+            if there is no matching sentence).
+    """
+    if 'Count' in mood:
+        count = mood['Count']
+        pol = mood['Polarity']['Mean']
+        subj = mood['Subjectivity']['Mean']
+        pol = np.nan if pol is None else pol
+        subj = np.nan if subj is None else subj
+    else:
+        count = len(mood['Sentences'])
+        pol = np.mean(mood['Polarity']) if count > 0 else np.nan
+        subj = np.mean(mood['Subjectivity']) if count > 0 else np.nan
+
+    return count, pol, subj
+
+
+def get_page(document, num):
+    """Returns the text of a single page of a document (c.f. `read_pdf`).
+
+    Args:
+        document (dict): PDF text plus additional information.
+        num (int): Page index (starting from 0).
+
+    Returns:
+        str: Text of the page.
+    """
+    start, end = document['page_offsets'][num]
+    return document['text'][start:end]
+
+
+def get_years(df):
+    """Returns the years of the rows of a data frame (c.f. `load_data`).
+
+    Args:
+        df (DataFrame): Data
+
+    Returns:
+        list of int: Years.
+    """
+    return [int(y) for y in df.index.get_level_values(DF_COL_YEAR)]
+
+
+def is_fig_up_to_date(path, filename, fingerprint, format=None):
+    """Checks whether a figure has already been saved in each of the formats
+    with the given fingerprint (c.f. `save_fig`).
+
+    Args:
+        path (Path): Path to the figure.
+        filename (str): File name.
+        fingerprint (str): Fingerprint of the figure content.
+        format (str or list of str, optional): The file format(s), default is
+            'svg'.
+
+    Returns:
+        bool: True if all the files exist and match the fingerprint.
+    """
+    for fmt in _get_fig_formats(format):
+        if not Path(path, filename).with_suffix(f'.{fmt}').is_file():
+            return False
+        try:
+            with open(_get_fig_fingerprint_file(path, filename, fmt),
+                      'r') as ffile:
+                saved = ffile.read().strip()
+        except FileNotFoundError:
+            return False
+        if saved != fingerprint:
+            return False
+
+    return True
+
+
+def iter_pages(document, first=0, last=None):
+    """Iterates over a range of pages of a document (c.f. `read_pdf`).
+
+    Args:
+        document (dict): PDF text plus additional information.
+        first (int, optional): Index of the first page (starting from 0).
+        last (int, optional): Index after the last page, default is the
+            number of pages.
+
+    Yields:
+        str: Text of the page.
+    """
+    text = document['text']
+    for start, end in document['page_offsets'][first:last]:
+        yield text[start:end]
+
+
+def load_data(files, patterns, normalized=False, hashed=False,
+              financials=None):
     """Reads a set of .json files and generates a dataframe.
 
-    The output DataFrame has the columns as defined in the `_settings.py` file
-    (DF_COL_*), for example:
-        - 'Year':           Year of the data row
+    The output DataFrame is a panel indexed by the (company, year) pairs
+    (index levels `DF_COL_COMPANY` and `DF_COL_YEAR`) and sorted by company
+    and year. The company is the file name without the year, e.g.
+    'MainCompany' for 'MainCompany_2009'. It has the columns as defined in
+    the `_settings.py` file (DF_COL_*), for example:
         - 'Profit':         Time series of profit
         - 'Count_00':    Time series of count for pattern 0
         - 'Polarity_00':    Time series of polarity for pattern 0
@@ -156,46 +463,85 @@ def load_data(files, patterns, normalized=False):
         - 'Count_n':     Time series of count for pattern n
         - 'Polarity_n':     Time series of polarity for pattern n
 
+    Notes:
+        The columns are preallocated with compact types and filled in place:
+        the company is categorical, the year int16, the profit float64, the
+        counts int32 (float32 if normalized), and the polarities float32.
+
+        With `hashed=True` the hashed text features of each report (c.f.
+        `src/features/build_hashed_features.py`) are joined as sparse
+        float32 columns 'Hash_0000', 'Hash_0001', ... (c.f.
+        `get_hashed_matrix`).
+
+        With `financials` (c.f. `_financials.FinancialsLoader.load`) the
+        profit is joined from the bulk loaded financial metadata by company
+        and year instead of being taken from the processed files.
+
         Args:
             files (iterator of Path objects): .json file names.
             patterns (list of str): Patterns to consider.
             normalized (bool): Normalize data sets for columns `pat_i`
+            hashed (bool, optional): Join the hashed text features.
+            financials (DataFrame, optional): Financial metadata indexed by
+                company and year.
 
         Returns:
             DataFrame: Time series.
         """
-    data = []
-    columns = [DF_COL_YEAR, DF_COL_PROFIT]
-    columns.extend(get_dataframe_column_names(patterns))
-
-    for file in files:
+    files = list(files)
+    nfiles = len(files)
+    col_names = get_dataframe_column_names(patterns)
+
+    # Preallocate typed columns
+    companies = np.empty(nfiles, dtype=object)
+    years = np.empty(nfiles, dtype=np.int16)
+    profits = np.empty(nfiles, dtype=np.float64)
+    counts = np.empty((nfiles, len(patterns)), dtype=np.int32)
+    polarities = np.empty((nfiles, len(patterns)), dtype=np.float32)
+
+    for i, file in enumerate(files):
         # Load content of data file
         with open(str(file), 'r') as jfile:
             content = json.load(jfile)
 
-        # Read year and profit
-        year = int(content['Metadata']['Year'])
-        profit = content['Data']['Profit'] / PROFIT_NORMALIZATION
+        # Read company, year and profit
+        filename = content['Metadata'].get('Filename', Path(file).stem)
+        companies[i] = Path(filename).stem.rsplit('_', 1)[0]
+        years[i] = int(content['Metadata']['Year'])
+        profits[i] = content['Data']['Profit'] / PROFIT_NORMALIZATION
         # nwords = content['Data'][DF_COL_NWORDS]
-        new_row = [year, profit]
 
         # Compute polarities for all patterns
-        for pat in patterns:
+        for ipat, pat in enumerate(patterns):
             mood = content['Data']['Mood'][pat]
-            count = len(mood['Sentences'])
-            new_row.append(count)
-
-            mean_polarity = sum(mood['Polarity']) / len(mood['Polarity'])
-            new_row.append(mean_polarity)
+            count, mean_polarity, _ = get_mood_statistics(mood)
+            counts[i, ipat] = count
+            polarities[i, ipat] = mean_polarity
 
-        # Append new row
-        data.append(new_row)
-    data = np.array(data)
+    if financials is not None:
+        keys = pd.MultiIndex.from_arrays([companies, years.astype(int)])
+        profits = financials[DF_COL_PROFIT].reindex(keys).to_numpy(
+            dtype=np.float64) / PROFIT_NORMALIZATION
 
     if normalized:
-        data[:, 2:] = preprocessing.normalize(data[:, 2:], norm='l1', axis=0)
+        counts = _normalize_l1(counts.astype(np.float32))
+        polarities = _normalize_l1(polarities)
+
+    # Assemble the columns in the order of `get_dataframe_column_names`
+    columns = {DF_COL_PROFIT: profits}
+    for ipat in range(len(patterns)):
+        columns[col_names[2*ipat]] = counts[:, ipat]
+        columns[col_names[2*ipat + 1]] = polarities[:, ipat]
 
-    return pd.DataFrame(data=data, columns=columns)
+    index = pd.MultiIndex.from_arrays(
+        [pd.Categorical(companies), years],
+        names=[DF_COL_COMPANY, DF_COL_YEAR])
+    df = pd.DataFrame(columns, index=index, copy=False)
+
+    if hashed:
+        df = pd.concat([df, _load_hashed(files, index)], axis=1)
+
+    return df.sort_index()
 
 
 def normalize_text(text, stemmer=None):
@@ -240,58 +586,129 @@ def normalize_text(text, stemmer=None):
     return ' '.join(words)
 
 
-def read_pdf(path, filename, package=None):
+def read_pdf(path, filename, package=None, layout=False, quality=None):
     """Reads a pdf file.
 
     Notes
-        The pages can be regained by::
-
-            pat = document['metadata']['page_sep']
-            text = document['text']
-            pages = re.split(pat, text)
+        The text does not contain any page markers, the pages are separated
+        by a new line and `document['page_offsets']` is an integer array of
+        shape (npages, 2) with the start and the end offset of each page in
+        the text. The pages can be regained by::
+
+            page = get_page(document, num)
+            pages = iter_pages(document)
+
+        With `layout=True` and the 'fitz' package `document['page_layout']`
+        is an array of shape (npages, 2) with the number of text blocks and
+        the share of table-cell blocks of each page (c.f. `filter_pages`).
+
+        The package 'auto' reads the pdf with the fastest package first and
+        checks the text of each page (c.f. `TextQuality`). If more than
+        `PDF_MAX_POOR` of the pages are poor the whole document is read again
+        by the next package and the better of both is kept, otherwise only
+        the poor pages are read again and replaced if the next package does
+        better. `document['metadata']['backend']` is the package that has
+        been used (e.g. 'fitz+PyPDF2' if pages were replaced) and
+        `document['metadata']['page_backends']` the package of each page.
+
+        `document['metadata']['extraction']` holds for each package that has
+        been run the number of extracted pages and the elapsed seconds (c.f.
+        `get_extraction_speed`).
 
     Args:
         path (Path): Path to the .pdf file.
         filename (str): File name.
-        package (str {'PyPDF2', 'fitz'}, optional): Package to use, default is
-            'fitz'
+        package (str {'PyPDF2', 'fitz', 'auto'}, optional): Package to use,
+            default is `PDF_BACKEND` from the settings.
+        layout (bool, optional): Add the layout hints of the pages (only
+            available for 'fitz').
+        quality (TextQuality, optional): Page check of 'auto', default uses
+            the thresholds `PDF_MIN_CHARS`, `PDF_MAX_REPLACEMENT`, and
+            `PDF_MIN_ALNUM` from the settings.
 
     Returns:
         dict: PDF text plus additional information.
     """
+    if package is None:
+        package = PDF_BACKEND
 
     if package == 'PyPDF2':
-        _read = _read_pdf_pypdf2
-    elif package == 'fitz' or package is None:
-        _read = _read_pdf_fitz
+        doc = _read_pdf_pypdf2(path, filename)
+    elif package == 'fitz':
+        doc = _read_pdf_fitz(path, filename, layout=layout)
+    elif package == 'auto':
+        doc = _read_pdf_auto(path, filename, layout=layout, quality=quality)
     else:
         raise ValueError(f"Unknown PDF package '{package}'.")
 
-    doc = _read(path, filename)
     return doc
 
 
-def save_fig(path, filename, plt_, format=None):
+def save_fig(path, filename, plt_, format=None, fingerprint=None):
     """Saves the figure.
     
     Args:
         path (Path): Path to the .pdf file.
         filename (str): File name.
-        plt_ (matplitlib.pyplot module): Plot object.
-        format (str, optional): The file format, e.g. 'png', 'pdf', 'svg'.
+        plt_ (matplitlib.pyplot module or Figure): Plot object.
+        format (str or list of str, optional): The file format, e.g. 'png',
+            'pdf', 'svg'. If a list is given, the figure is written once for
+            each of the formats.
+        fingerprint (str, optional): Fingerprint of the figure content that
+            is stored next to each of the files (c.f. `is_fig_up_to_date`).
 
     Returns:
         None
     """
-    if format is None:
-        format = 'svg'
-    suffix = f'.{format}'
+    for fmt in _get_fig_formats(format):
+        file = Path(path, filename).with_suffix(f'.{fmt}')
+        plt_.savefig(file, format=fmt)
+        if fingerprint is not None:
+            with open(_get_fig_fingerprint_file(path, filename, fmt),
+                      'w') as ffile:
+                ffile.write(fingerprint)
 
-    file = Path(path, filename).with_suffix(suffix)
-    plt_.savefig(file, format=format)
+
+def split_sentences(document, splitter=None):
+    """Splits the text of a document (c.f. `read_pdf`) into sentences.
+
+    Args:
+        document (dict): PDF text plus additional information.
+        splitter (str {'punkt', 'german'}, optional): Sentence splitter,
+            default is `SENTENCE_SPLITTER` from the settings. The 'german'
+            splitter is rule-based, handles German abbreviations and works
+            on the stream of pages.
+
+    Returns:
+        list of str: List of (raw) sentences.
+    """
+    if splitter is None:
+        splitter = SENTENCE_SPLITTER
+
+    text = document['text']
+    if splitter == 'punkt':
+        return nltk.tokenize.sent_tokenize(text)
+    elif splitter == 'german':
+        return list(_GERMAN_SPLITTER.split_pages(iter_pages(document)))
+    else:
+        raise ValueError(f"Unknown sentence splitter '{splitter}'.")
 
 
 # Private functions
+def _get_fig_fingerprint_file(path, filename, fmt):
+    """Returns the file storing the fingerprint of a figure file."""
+    return Path(path, f'.{filename}.{fmt}.fingerprint')
+
+
+def _get_fig_formats(format):
+    """Returns the list of figure formats, default is 'svg'."""
+    if format is None:
+        return ['svg']
+    if isinstance(format, str):
+        return [format]
+    return list(format)
+
+
 def _german_stop_words():
     """Returns a set of german stop words that are statistically not important
     in the nlp.
@@ -322,52 +739,177 @@ def _german_stop_words():
     return [sw for sw in stop_words if sw not in keep_words]
 
 
-def _read_pdf_pypdf2(path, filename):
-    """Reads the pdf by using the `PyPDF2` package."""
-    file = Path(path, filename).with_suffix('.pdf')
-    with open(file, 'rb') as pfile:
-        # Generate pdf reader object
-        reader = PyPDF2.PdfFileReader(pfile)
-        npages = reader.numPages
+def _make_document(file, pages, backend, layout=None, elapsed=0.):
+    """Generates the report object from the texts of all the pages."""
+    text = _PAGE_SEP.join(pages)
 
-        # Concatenate text
-        text = ''
-        for num in range(npages):
-            page = reader.getPage(num)
-            text += f'<PageNum{num+1:03}>{page.extractText()}'
+    # Start and end offset of each page in the text
+    lengths = np.fromiter((len(page) for page in pages), dtype=np.int64,
+                          count=len(pages))
+    ends = np.cumsum(lengths + len(_PAGE_SEP)) - len(_PAGE_SEP)
+    offsets = np.column_stack([ends - lengths, ends])
 
-    # Generate report object with metadata
     document = {
         'metadata': {
             'type':         'PDF',
             'name':         str(file),
-            'npages':       npages,
-            'page_sep':     r'<PageNum[0-9]{3}>'
+            'npages':       len(pages),
+            'backend':      backend,
+            'extraction':   {backend: {'pages':     len(pages),
+                                       'seconds':   elapsed}},
         },
-        'text':     text,
+        'text':             text,
+        'page_offsets':     offsets,
     }
+    if layout is not None:
+        document['page_layout'] = np.asarray(layout, dtype=np.float64)
 
-    return dict(document)
+    return document
 
 
-def _read_pdf_fitz(path, filename):
-    """Reads the pdf by using the `fitz` package."""
-    file = Path(path, filename).with_suffix('.pdf')
-    doc = fitz.open(file)
+def _load_hashed(files, index):
+    """Reads the hashed text features of the reports as sparse columns."""
+    rows = [sp.load_npz(get_hashed_file(Path(file).stem)) for file in files]
+    nfeatures = {row.shape[1] for row in rows}
+    if len(nfeatures) > 1:
+        raise ValueError(f'The hashed text features have different sizes '
+                         f'{sorted(nfeatures)}, please rebuild them.')
 
-    text = ''
-    for num, page in enumerate(doc):
-        text += f'<PageNum{num + 1:03}>{page.getText()}'
+    matrix = sp.vstack(rows, format='csr') if rows else \
+        sp.csr_matrix((0, 0), dtype=np.float32)
+    columns = [f'{DF_COL_HASH}{j:04d}' for j in range(matrix.shape[1])]
+    return pd.DataFrame.sparse.from_spmatrix(matrix, index=index,
+                                             columns=columns)
 
-    # Generate report object with metadata
-    document = {
-        'metadata': {
-            'type':         'PDF',
-            'name':         str(file),
-            'npages':       doc.pageCount,
-            'page_sep':     r'<PageNum[0-9]{3}>'
-        },
-        'text':     text,
+
+def _normalize_l1(data):
+    """Normalizes each column of a 2d array by its l1 norm (in place)."""
+    norm = np.nansum(np.abs(data), axis=0)
+    norm[norm == 0] = 1
+    data /= norm
+    return data
+
+
+def _rank_pages(quality, pages):
+    """Returns the number of good pages and the total rank of the text."""
+    ranks = [quality.rank(page) for page in pages]
+    return sum(good for good, _ in ranks), sum(val for _, val in ranks)
+
+
+def _read_pdf_auto(path, filename, layout=False, quality=None):
+    """Reads the pdf by the fastest package and falls back to the next ones
+    for the poor pages or the whole document (c.f. `read_pdf`).
+    """
+    if quality is None:
+        quality = TextQuality(PDF_MIN_CHARS, PDF_MAX_REPLACEMENT,
+                              PDF_MIN_ALNUM)
+    readers = {
+        'fitz':     lambda nums: _read_pdf_fitz(path, filename, layout, nums),
+        'PyPDF2':   lambda nums: _read_pdf_pypdf2(path, filename, nums),
     }
 
-    return dict(document)
+    doc, pages, owners, error, extraction = None, None, None, None, {}
+    for backend in _PDF_BACKENDS:
+        if doc is None:
+            poor, whole = None, True
+        else:
+            poor = [num for num, page in enumerate(pages)
+                    if not quality.is_good(page)]
+            if not poor:
+                break
+            whole = len(poor) > PDF_MAX_POOR * len(pages)
+
+        tic = time.perf_counter()
+        try:
+            new = readers[backend](None if whole else poor)
+        except Exception as err:
+            # Recorded such that failing packages show up in the statistics
+            error = err
+            extraction[backend] = {'pages':     0,
+                                   'seconds':   time.perf_counter() - tic,
+                                   'error':     repr(err)}
+            continue
+        extraction.update(new['metadata']['extraction'])
+        new_pages = list(iter_pages(new))
+
+        if doc is None:
+            doc, pages = new, new_pages
+            owners = [backend] * len(pages)
+        elif whole:
+            # Keep the document with more good pages (and more text)
+            if _rank_pages(quality, new_pages) > _rank_pages(quality, pages):
+                doc, pages = new, new_pages
+                owners = [backend] * len(pages)
+        else:
+            for num, page in zip(poor, new_pages):
+                if quality.rank(page) > quality.rank(pages[num]):
+                    pages[num] = page
+                    owners[num] = backend
+
+    if doc is None:
+        raise error
+
+    used = [backend for backend in _PDF_BACKENDS if backend in owners]
+    new = _make_document(doc['metadata']['name'], pages, '+'.join(used),
+                         doc.get('page_layout'))
+    new['metadata']['extraction'] = extraction
+    new['metadata']['page_backends'] = owners
+    return new
+
+
+def _read_pdf_pypdf2(path, filename, nums=None):
+    """Reads the pdf (or the pages `nums` of it) by using the `PyPDF2`
+    package.
+    """
+    file = Path(path, filename).with_suffix('.pdf')
+    tic = time.perf_counter()
+    with open(file, 'rb') as pfile:
+        # Generate pdf reader object
+        reader = PyPDF2.PdfReader(pfile)
+
+        # Extract text of each page
+        if nums is None:
+            nums = range(len(reader.pages))
+        pages = [reader.pages[num].extract_text() for num in nums]
+
+    return _make_document(file, pages, 'PyPDF2',
+                          elapsed=time.perf_counter() - tic)
+
+
+def _read_pdf_fitz(path, filename, layout=False, nums=None):
+    """Reads the pdf (or the pages `nums` of it) by using the `fitz`
+    package.
+    """
+    file = Path(path, filename).with_suffix('.pdf')
+    tic = time.perf_counter()
+    with fitz.open(file) as doc:
+        if nums is None:
+            nums = range(len(doc))
+
+        # Extract text (and layout hints) of each page
+        pages = [doc[num].get_text() for num in nums]
+        hints = None
+        if layout:
+            hints = np.array([get_layout(doc[num].get_text('blocks'))
+                              for num in nums],
+                             dtype=np.float64).reshape(-1, 2)
+
+    return _make_document(file, pages, 'fitz', hints,
+                          elapsed=time.perf_counter() - tic)
+
+
+def _score_sentence(sentence):
+    """Returns polarity and subjectivity of a sentence by TextBlobDE."""
+    sentiment = TextBlobDE(sentence).sentiment
+    return sentiment.polarity, sentiment.subjectivity
+
+
+def _to_builtin(obj):
+    """Converts numpy objects into json serializable python objects."""
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    if isinstance(obj, np.generic):
+        return obj.item()
+    if isinstance(obj, (pd.Series, pd.Index)):
+        return obj.tolist()
+    return str(obj)
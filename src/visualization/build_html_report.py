@@ -0,0 +1,319 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Builds a single, self-contained HTML report from the cached outputs.
+
+The page is rendered from the template `reports/templates/report.html`
+(placeholders `$title`, `$sections`, `$generated`, and `$fingerprint`) and
+written to `reports/html/report.html`. Its sections are built from
+
+    overview        reports/data/features.csv           (companies, years)
+    patterns        reports/data/features.csv           (one row per pattern)
+    classifiers     reports/data/clf_performance.csv    (if it exists)
+    figure-<name>   reports/figures/<name>.svg          (one per figure)
+
+i.e. from the cached feature table and figures (c.f. `src/dag.py`), no pdf
+or processed data set is read. The patterns are embedded as pre-aggregated
+yearly counts and polarities (a row and a sparkline per pattern) instead of
+the sentences, and the figures as data URIs.
+
+Each section is cached in `reports/html/.fragments` together with the
+fingerprint of its input files, such that only the sections whose inputs
+changed are built again (all of them with `--force`).
+"""
+
+# -------------------------------------------------------------------------
+#   Author(s): Christoph Jaeggli
+#   Institute: (None)
+#
+#   MIT License
+#   Copyright (c) 2020 Christoph Jaeggli
+#
+#   This program is distributed in the hope that it will be useful, but
+#   WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+
+# Standard library
+from functools import partial
+from pathlib import Path
+from string import Template
+import argparse
+import base64
+import hashlib
+import html
+import re
+import time
+# Third party requirements
+import numpy as np
+import pandas as pd
+# Local imports
+from src._paths import PATH_REP_DAT, PATH_REP_FIG, PATH_REP_HTML,\
+    PATH_REP_TEMPL
+from src._settings import PATTERNS_OF_INTEREST, DF_COL_COMPANY, DF_COL_YEAR,\
+    DF_COL_PROFIT, DF_COL_COUNT, DF_COL_POL, PROFIT_UNIT
+import src.profiling as prof
+import src.utils as utl
+
+# Constants
+_TITLE = 'Mood of the Annual Reports'
+_TEMPLATE = 'report.html'
+_REPORT = 'report.html'
+_FRAGMENTS = '.fragments'
+_FEATURES = Path(PATH_REP_DAT, 'features.csv')
+_CLF_PERFORMANCE = Path(PATH_REP_DAT, 'clf_performance.csv')
+_RE_FINGERPRINT = re.compile(r'<!-- fingerprint: (\w+) -->|'
+                             r'<meta name="fingerprint" content="(\w+)">')
+_NDIGITS = 3
+_SPARK_SIZE = (120, 24)
+_INDENT = '  '
+
+
+def build_report(path=PATH_REP_HTML, templates=PATH_REP_TEMPL, force=False):
+    """Builds the sections whose inputs changed and renders the page.
+
+    Args:
+        path (Path, optional): Output folder.
+        templates (Path, optional): Folder of the page template.
+        force (bool, optional): Build all the sections.
+
+    Returns:
+        list of str: Names of the built sections.
+    """
+    if not _FEATURES.is_file():
+        raise FileNotFoundError(f'{_FEATURES} does not exist, build it by '
+                                f'`python -m src.dag` first.')
+    Path(path, _FRAGMENTS).mkdir(parents=True, exist_ok=True)
+
+    fragments, fingerprints, built = [], [], []
+    for name, inputs, render in _get_sections():
+        fingerprint = utl.get_fingerprint(
+            name, [_hash_file(file) for file in inputs], PATTERNS_OF_INTEREST)
+        fragment = None if force else _load_fragment(path, name, fingerprint)
+        if fragment is None:
+            fragment = render()
+            _save_fragment(path, name, fingerprint, fragment)
+            built.append(name)
+        fragments.append(fragment)
+        fingerprints.append(fingerprint)
+
+    # Render the page if a section or the template changed
+    template = Path(templates, _TEMPLATE)
+    fingerprint = utl.get_fingerprint(fingerprints, _hash_file(template))
+    report = Path(path, _REPORT)
+    if built or _read_fingerprint(report) != fingerprint:
+        with open(template, 'r', encoding='utf-8') as tfile:
+            page = Template(tfile.read()).substitute(
+                title=html.escape(_TITLE),
+                sections='\n'.join(fragments),
+                generated=time.strftime('%Y-%m-%d %H:%M'),
+                fingerprint=fingerprint)
+        with open(report, 'w', encoding='utf-8') as rfile:
+            rfile.write(page)
+
+    return built
+
+
+def aggregate_patterns(df, patterns):
+    """Aggregates the counts and the polarities of each pattern by year.
+
+    Args:
+        df (DataFrame): Feature table (c.f. `utl.load_data`).
+        patterns (list of str): Patterns of the columns.
+
+    Returns:
+        list of dict: Per pattern its 'Pattern', the 'Years', the total
+            'Count' and the count weighted mean 'Polarity' per year, and the
+            overall 'Total' and 'Mean'.
+    """
+    years = df.index.get_level_values(DF_COL_YEAR)
+    result = []
+    for ipat, pat in enumerate(patterns):
+        count = df[f'{DF_COL_COUNT}{ipat:02.0f}'].to_numpy(dtype=np.float64)
+        pol = df[f'{DF_COL_POL}{ipat:02.0f}'].to_numpy(dtype=np.float64)
+        yearly = pd.DataFrame({'Count': count, 'Weighted': count * pol},
+                              index=years).groupby(level=0).sum()
+        total = yearly['Count'].sum()
+        result.append({
+            'Pattern':  pat,
+            'Years':    yearly.index.tolist(),
+            'Count':    yearly['Count'].round(_NDIGITS).tolist(),
+            'Polarity': _safe_div(yearly['Weighted'], yearly['Count']),
+            'Total':    round(float(total), _NDIGITS),
+            'Mean':     round(float(yearly['Weighted'].sum() / total),
+                              _NDIGITS) if total else 0.,
+        })
+    return result
+
+
+# Private functions
+def _get_sections():
+    """Returns the sections as `(name, input files, render function)`."""
+    sections = [
+        ('overview', [_FEATURES], _render_overview),
+        ('patterns', [_FEATURES], _render_patterns),
+    ]
+    if _CLF_PERFORMANCE.is_file():
+        sections.append(('classifiers', [_CLF_PERFORMANCE],
+                         _render_classifiers))
+    for file in sorted(Path(PATH_REP_FIG).glob('*.svg')):
+        sections.append((f'figure-{file.stem}', [file],
+                         partial(_render_figure, file)))
+    return sections
+
+
+def _read_features():
+    """Reads the cached feature table."""
+    return pd.read_csv(_FEATURES, index_col=[0, 1])
+
+
+def _render_overview():
+    """Section 'overview': reports and last profit of each company."""
+    df = _read_features()
+    rows = []
+    for company, group in df.groupby(level=DF_COL_COMPANY, sort=True):
+        years = group.index.get_level_values(DF_COL_YEAR)
+        rows.append([company, len(group), f'{years.min()}-{years.max()}',
+                     f'{group[DF_COL_PROFIT].iloc[-1]:.1f}'])
+    header = ['Company', 'Reports', 'Years', f'Profit [{PROFIT_UNIT}]']
+    return _render_section('overview', 'Overview',
+                           _render_table(header, rows))
+
+
+def _render_patterns():
+    """Section 'patterns': yearly count and polarity of each pattern."""
+    df = _read_features()
+    npat = sum(col.startswith(DF_COL_COUNT) for col in df.columns)
+    patterns = list(PATTERNS_OF_INTEREST[:npat])
+    patterns += [f'{DF_COL_COUNT}{ipat:02.0f}'
+                 for ipat in range(len(patterns), npat)]
+
+    rows = []
+    for agg in aggregate_patterns(df, patterns):
+        rows.append([f'<code>{html.escape(agg["Pattern"])}</code>',
+                     f'{agg["Total"]:g}', _render_sparkline(agg['Count']),
+                     f'{agg["Mean"]:.3f}', _render_sparkline(agg['Polarity'])])
+    header = ['Pattern', 'Count', 'Count by year', 'Polarity',
+              'Polarity by year']
+    return _render_section('patterns', 'Patterns',
+                           _render_table(header, rows, escape=False))
+
+
+def _render_classifiers():
+    """Section 'classifiers': cross validated performance."""
+    df = pd.read_csv(_CLF_PERFORMANCE)
+    rows = [[row[0]] + [f'{val:.3f}' for val in row[1:]]
+            for row in df.itertuples(index=False)]
+    return _render_section('classifiers', 'Classifiers',
+                           _render_table(list(df.columns), rows))
+
+
+def _render_figure(file):
+    """Section 'figure-<name>': a figure embedded as data URI."""
+    with open(file, 'rb') as ffile:
+        data = base64.b64encode(ffile.read()).decode('ascii')
+    name = html.escape(file.stem)
+    body = f'{_INDENT * 2}<figure><img alt="{name}" ' \
+           f'src="data:image/svg+xml;base64,{data}">' \
+           f'<figcaption>{name}</figcaption></figure>'
+    return _render_section(f'figure-{file.stem}', file.stem, body)
+
+
+def _render_section(name, title, body):
+    """Wraps the body of a section."""
+    return f'{_INDENT}<section id="{html.escape(name)}">\n' \
+           f'{_INDENT * 2}<h2>{html.escape(title)}</h2>\n' \
+           f'{body}\n' \
+           f'{_INDENT}</section>'
+
+
+def _render_table(header, rows, escape=True):
+    """Renders a table (the cells are escaped unless `escape` is False)."""
+    esc = html.escape if escape else str
+    lines = [f'{_INDENT * 2}<table>',
+             f'{_INDENT * 3}<tr>' +
+             ''.join(f'<th>{html.escape(str(col))}</th>' for col in header) +
+             '</tr>']
+    for row in rows:
+        lines.append(f'{_INDENT * 3}<tr>' +
+                     ''.join(f'<td>{esc(str(val))}</td>' for val in row) +
+                     '</tr>')
+    lines.append(f'{_INDENT * 2}</table>')
+    return '\n'.join(lines)
+
+
+def _render_sparkline(values):
+    """Renders a series as a small inline svg polyline."""
+    width, height = _SPARK_SIZE
+    values = np.asarray(values, dtype=np.float64)
+    if values.size == 0:
+        return ''
+    lo, hi = values.min(), values.max()
+    ys = np.full(values.size, height / 2) if hi == lo else \
+        height - 1 - (values - lo) / (hi - lo) * (height - 2)
+    xs = np.linspace(1, width - 1, values.size) if values.size > 1 else \
+        np.array([width / 2])
+    points = ' '.join(f'{x:.1f},{y:.1f}' for x, y in zip(xs, ys))
+    return f'<svg class="spark" width="{width}" height="{height}">' \
+           f'<polyline points="{points}"/></svg>'
+
+
+def _safe_div(num, den):
+    """Divides two series and returns a rounded list (0 where den is 0)."""
+    num, den = np.asarray(num, np.float64), np.asarray(den, np.float64)
+    out = np.divide(num, den, out=np.zeros_like(num), where=den != 0)
+    return out.round(_NDIGITS).tolist()
+
+
+def _hash_file(file):
+    """Returns the sha256 of a file."""
+    with open(file, 'rb') as bfile:
+        return hashlib.sha256(bfile.read()).hexdigest()
+
+
+def _get_fragment_file(path, name):
+    """Returns the cache file of a section."""
+    return Path(path, _FRAGMENTS, name).with_suffix('.html')
+
+
+def _load_fragment(path, name, fingerprint):
+    """Returns the cached section if its fingerprint matches, else None."""
+    file = _get_fragment_file(path, name)
+    if _read_fingerprint(file) != fingerprint:
+        return None
+    with open(file, 'r', encoding='utf-8') as ffile:
+        return ffile.read().split('\n', 1)[1]
+
+
+def _save_fragment(path, name, fingerprint, fragment):
+    """Caches a section (the first line holds the fingerprint)."""
+    with open(_get_fragment_file(path, name), 'w', encoding='utf-8') as ffile:
+        ffile.write(f'<!-- fingerprint: {fingerprint} -->\n{fragment}')
+
+
+def _read_fingerprint(file):
+    """Returns the fingerprint of a page or a fragment (None if missing)."""
+    try:
+        with open(file, 'r', encoding='utf-8') as ffile:
+            head = ffile.read(4096)
+    except FileNotFoundError:
+        return None
+    match = _RE_FINGERPRINT.search(head)
+    return (match.group(1) or match.group(2)) if match else None
+
+
+def _parse_args():
+    """Parses the command line arguments."""
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--force', action='store_true',
+                        help='build all the sections')
+    prof.add_profile_argument(parser)
+    return parser.parse_args()
+
+
+if __name__ == '__main__':
+    args = _parse_args()
+
+    with prof.profile('build_html_report', args.profile):
+        with prof.stage('render'):
+            sections = build_report(force=args.force)
+    print(f'Built {len(sections)} sections of '
+          f'{Path(PATH_REP_HTML, _REPORT)}')
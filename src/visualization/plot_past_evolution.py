@@ -1,7 +1,14 @@
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
 """Plots the yearly evolution of the polarity and the count of each pattern
-as well as the evolution of the profit.
+as well as the evolution of the profit (one line per company).
+
+With the option `--batch` the figures are rendered headless (Agg backend) by
+a pool of worker processes, each figure is written in all requested formats
+and closed right after saving.
+
+Figures whose series and styling did not change since the last run are not
+rendered again unless the option `--force` is given.
 """
 
 # -------------------------------------------------------------------------
@@ -16,65 +23,196 @@ as well as the evolution of the profit.
 #   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
 
 # Standard library
-from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
+import argparse
 # Third party requirements
 import matplotlib.pyplot as plt
 import numpy as np
 # Local imports
-from src._paths import PATH_DATA_PROCESSED, PATH_REP_FIG
-from src._settings import PATTERNS_OF_INTEREST, DF_COL_COUNT, DF_COL_POL
+from src._paths import PATH_REP_FIG
+from src.data._catalog import get_processed_files
+from src._settings import PATTERNS_OF_INTEREST, DF_COL_COMPANY, DF_COL_PROFIT
 from src._settings import CLR_CHART_12, FONTSIZE, MARKERSIZE, LINEWIDTH
+import src.profiling as prof
 import src.utils as utl
 
+# Constants
+_ROTATION = 90
+_FIGSIZE = (7, 4)
+_FORMATS = ['svg']
 
-if __name__ == '__main__':
 
-    # Load data sets
-    files = Path(PATH_DATA_PROCESSED).glob("*.json")
-    df = utl.load_data(files, PATTERNS_OF_INTEREST, normalized=False)
+def plot_series(series, filename, formats=None, close=True, force=False):
+    """Plots the evolution of a quantity, one line per company, and saves the
+    figure.
+
+    Args:
+        series (dict): Years and values (lists) of each company (c.f.
+            `get_company_series`).
+        filename (str): File name of the figure (without suffix).
+        formats (list of str, optional): File formats, default is 'svg'.
+        close (bool, optional): Close the figure after saving.
+        force (bool, optional): Render even if the saved figure is up to date.
+
+    Returns:
+        bool: True if the figure has been rendered.
+    """
+    fingerprint = utl.get_fingerprint(series, _get_style())
+    if not force and utl.is_fig_up_to_date(PATH_REP_FIG, filename,
+                                           fingerprint, format=formats):
+        return False
+
+    # Common year axis of all the companies
+    years = sorted({year for yrs, _ in series.values() for year in yrs})
+    xpos = {year: i for i, year in enumerate(years)}
+
+    fig, ax = plt.subplots(1, 1, figsize=_FIGSIZE)
+    for i, (company, (yrs, values)) in enumerate(series.items()):
+        color = CLR_CHART_12 if len(series) == 1 else f'C{i}'
+        xticks = [xpos[year] for year in yrs]
+        ax.plot(xticks, values, color=color, linewidth=LINEWIDTH,
+                label=company)
+        ax.plot(xticks, values, color=color, marker='o',
+                markersize=MARKERSIZE, markeredgecolor='#ffffff')
+    ax.set_xticks(np.arange(len(years)))
+    ax.set_xticklabels([f'{y:4.0f}' for y in years], rotation=_ROTATION)
+    if len(series) > 1:
+        ax.legend()
+    fig.tight_layout()
+    utl.save_fig(PATH_REP_FIG, filename, fig, format=formats,
+                 fingerprint=fingerprint)
+
+    if close:
+        plt.close(fig)
+
+    return True
+
 
-    # Get year xticks
-    xticklabel = [f'{y:4.0f}' for y in df['Year']]
-    xticks = np.arange(len(xticklabel))
+def plot_past_evolution(df, patterns, formats=None, batch=False, nprocs=None,
+                        force=False):
+    """Plots the count and polarity of each pattern as well as the profit.
+
+    Args:
+        df (DataFrame): DataFrame (c.f. `utl.load_data`)
+        patterns (list of str): Patterns to consider.
+        formats (list of str, optional): File formats, default is 'svg'.
+        batch (bool, optional): Render headless by parallel worker processes
+            (c.f. `render_batch`), otherwise the figures stay open.
+        nprocs (int, optional): Number of worker processes in batch mode.
+        force (bool, optional): Render even if the saved figures are up to
+            date.
+
+    Returns:
+        int: Number of rendered figures.
+    """
+    cols = utl.get_dataframe_column_names(patterns)
+    cols.append(DF_COL_PROFIT)
+
+    if batch:
+        return render_batch(df, cols, formats=formats, nprocs=nprocs,
+                            force=force)
 
     # Print
-    rotation = 90
     plt.rcParams.update({'font.size': FONTSIZE})
-    for ipat, pat in enumerate(PATTERNS_OF_INTEREST):
-        # Plot Counts
-        col = f'{DF_COL_COUNT}{ipat:02.0f}'
-        _, ax = plt.subplots(1, 1, figsize=(7, 4))
-        ax.plot(xticks, df[col], color=CLR_CHART_12, linewidth=LINEWIDTH)
-        ax.plot(xticks, df[col], color=CLR_CHART_12, marker='o',
-                markersize=MARKERSIZE, markeredgecolor='#ffffff')
-        ax.set_xticks(xticks)
-        ax.set_xticklabels(xticklabel, rotation=rotation)
-        # ax.set_title(f'Count of {pat}')
-        plt.tight_layout()
-        utl.save_fig(PATH_REP_FIG, col, plt)
-
-        # Plot Polarity
-        col = f'{DF_COL_POL}{ipat:02.0f}'
-        _, ax = plt.subplots(1, 1, figsize=(7, 4))
-        ax.plot(xticks, df[col], color=CLR_CHART_12, linewidth=LINEWIDTH)
-        ax.plot(xticks, df[col], color=CLR_CHART_12, marker='o',
-                markersize=MARKERSIZE, markeredgecolor='#ffffff')
-        ax.set_xticks(xticks)
-        ax.set_xticklabels(xticklabel, rotation=rotation)
-        # ax.set_title(f'Polarity of {pat}')
-        plt.tight_layout()
-        utl.save_fig(PATH_REP_FIG, col, plt)
-
-    # Plot Profit
-    col = 'Profit'
-    _, ax = plt.subplots(1, 1, figsize=(7, 4))
-    ax.plot(xticks, df[col], color=CLR_CHART_12, linewidth=LINEWIDTH)
-    ax.plot(xticks, df[col], color=CLR_CHART_12, marker='o',
-            markersize=MARKERSIZE, markeredgecolor='#ffffff')
-    ax.set_xticks(xticks)
-    ax.set_xticklabels(xticklabel, rotation=rotation)
-    # ax.set_title(col)
-    plt.tight_layout()
-    utl.save_fig(PATH_REP_FIG, col, plt)
-
-    plt.show()
+    nrendered = 0
+    for col in cols:
+        nrendered += plot_series(get_company_series(df, col), col,
+                                 formats=formats, close=False, force=force)
+
+    return nrendered
+
+
+def render_batch(df, columns, formats=None, nprocs=None, force=False):
+    """Renders the figures of the given columns headless and in parallel.
+
+    Args:
+        df (DataFrame): DataFrame (c.f. `utl.load_data`)
+        columns (list of str): Columns to plot, one figure per column.
+        formats (list of str, optional): File formats, default is 'svg'.
+        nprocs (int, optional): Number of worker processes.
+        force (bool, optional): Render even if the saved figures are up to
+            date.
+
+    Returns:
+        int: Number of rendered figures.
+    """
+    jobs = [(get_company_series(df, col), col, formats, True, force)
+            for col in columns]
+
+    with ProcessPoolExecutor(max_workers=nprocs,
+                             initializer=_init_headless) as executor:
+        nrendered = sum(executor.map(_plot_job, jobs))
+
+    return nrendered
+
+
+def get_company_series(df, column):
+    """Returns the years and the values of a column for each company.
+
+    Args:
+        df (DataFrame): DataFrame (c.f. `utl.load_data`)
+        column (str): Column.
+
+    Returns:
+        dict: `(years, values)` (lists) of each company.
+    """
+    return {str(company): (utl.get_years(group), group[column].tolist())
+            for company, group in df.groupby(level=DF_COL_COMPANY,
+                                             sort=True)}
+
+
+# Private functions
+def _get_style():
+    """Returns the styling settings that affect the figures."""
+    return {
+        'rotation':     _ROTATION,
+        'figsize':      _FIGSIZE,
+        'color':        CLR_CHART_12,
+        'fontsize':     FONTSIZE,
+        'linewidth':    LINEWIDTH,
+        'markersize':   MARKERSIZE,
+    }
+
+
+def _init_headless():
+    """Prepares a worker process for rendering without display."""
+    plt.switch_backend('Agg')
+    plt.rcParams.update({'font.size': FONTSIZE})
+
+
+def _plot_job(job):
+    """Unpacks a job for the process pool."""
+    return plot_series(*job)
+
+
+def _parse_args():
+    """Parses the command line arguments."""
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--batch', action='store_true',
+                        help='render headless by parallel worker processes')
+    parser.add_argument('--formats', nargs='+', default=_FORMATS,
+                        help='file formats of the figures, e.g. svg png pdf')
+    parser.add_argument('--nprocs', type=int, default=None,
+                        help='number of worker processes in batch mode')
+    parser.add_argument('--force', action='store_true',
+                        help='render also the figures that are up to date')
+    prof.add_profile_argument(parser)
+    return parser.parse_args()
+
+
+if __name__ == '__main__':
+    args = _parse_args()
+
+    with prof.profile('plot_past_evolution', args.profile):
+        # Load data sets
+        with prof.stage('load'):
+            files = get_processed_files()
+            df = utl.load_data(files, PATTERNS_OF_INTEREST, normalized=False)
+
+        with prof.stage('plot'):
+            nrend = plot_past_evolution(
+                df, PATTERNS_OF_INTEREST, formats=args.formats,
+                batch=args.batch, nprocs=args.nprocs, force=args.force)
+    print(f'Rendered {nrend} figures')
+    if not args.batch:
+        plt.show()
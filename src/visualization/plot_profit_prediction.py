@@ -1,6 +1,14 @@
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
-"""Generates and plots the prediction of next years profit.
+"""Generates and plots the prediction of next years profit of each company
+(one line per company, use `--company` to plot a single one).
+
+The prediction interval is estimated by `--nboot` bootstrap refits of the
+classifier (c.f. `predict_profit_distribution`), use `--nboot 0` to plot the
+point estimate only.
+
+The figure is only rendered again if the plotted values or the styling
+changed since the last run, or if the option `--force` is given.
 """
 
 # -------------------------------------------------------------------------
@@ -15,62 +23,189 @@
 #   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
 
 # Standard library
-from pathlib import Path
+import argparse
 # Third party requirements
 import matplotlib.pyplot as plt
 import numpy as np
 from sklearn.linear_model import SGDRegressor
 from sklearn.ensemble import BaggingRegressor, RandomForestRegressor
 # Local imports
-from src._paths import PATH_DATA_PROCESSED, PATH_REP_FIG
+from src._paths import PATH_REP_FIG
+from src.data._catalog import get_processed_files
 from src._settings import PATTERNS_OF_INTEREST, SEED, PROFIT_UNIT
+from src._settings import DF_COL_COMPANY, DF_COL_PROFIT
 from src._settings import CLR_CHART_02, CLR_CHART_12, FONTSIZE,\
     MARKERSIZE, LINEWIDTH
+import src.profiling as prof
 import src.utils as utl
-from src.visualization.print_clf_performance import predict_next_years_profit
+from src.visualization.print_clf_performance import _NBOOT, _QUANTILES,\
+    predict_next_years_profits, predict_profit_distributions,\
+    get_prediction_quantiles
 
 # Constants
 _NPAST = 3
+_FIGNAME = 'Prediction'
 
-if __name__ == '__main__':
+
+def plot_prediction(past, profits_new, intervals=None, force=False):
+    """Plots the past profit of each company together with the predicted one
+    of the year after its last report.
+
+    Args:
+        past (dict): Years and past profits (lists) of each company.
+        profits_new (dict): Predicted profit of each company.
+        intervals (dict, optional): Lower and upper bound of the prediction
+            interval of each company.
+        force (bool, optional): Render even if the saved figure is up to date.
+
+    Returns:
+        bool: True if the figure has been rendered.
+    """
+    style = [CLR_CHART_02, CLR_CHART_12, FONTSIZE, MARKERSIZE, LINEWIDTH]
+    fingerprint = utl.get_fingerprint(past, profits_new, intervals, style)
+    if not force and utl.is_fig_up_to_date(PATH_REP_FIG, _FIGNAME,
+                                           fingerprint):
+        return False
+
+    # Common year axis of all the companies including the predicted years
+    years = sorted({year for yrs, _ in past.values() for year in yrs} |
+                   {yrs[-1] + 1 for yrs, _ in past.values()})
+    xpos = {year: i for i, year in enumerate(years)}
+
+    plt.rcParams.update({'font.size': FONTSIZE})
+    _, ax = plt.subplots(1, 1, figsize=(7, 4))
+
+    for i, (company, (yrs, profit_old)) in enumerate(past.items()):
+        clr_old, clr_new = (CLR_CHART_12, CLR_CHART_02) if len(past) == 1 \
+            else (f'C{i}', f'C{i}')
+        profit_new = profits_new[company]
+        xticks = [xpos[year] for year in yrs]
+        xnew = xpos[yrs[-1] + 1]
+
+        if intervals is not None:
+            lower, upper = intervals[company]
+            ax.fill_between([xticks[-1], xnew], [profit_old[-1], lower],
+                            [profit_old[-1], upper], color=clr_new,
+                            alpha=0.25, linewidth=0)
+            ax.errorbar(xnew, profit_new,
+                        yerr=[[profit_new - lower], [upper - profit_new]],
+                        color=clr_new, linewidth=LINEWIDTH / 2,
+                        capsize=MARKERSIZE / 2)
+
+        ax.plot([xticks[-1], xnew], [profit_old[-1], profit_new],
+                color=clr_new, linewidth=LINEWIDTH,
+                linestyle='-' if len(past) == 1 else '--')
+        ax.plot(xnew, profit_new, color=clr_new,
+                marker='o', markersize=MARKERSIZE, markeredgecolor='#ffffff')
+
+        ax.plot(xticks, profit_old, color=clr_old, linewidth=LINEWIDTH,
+                label=company)
+        ax.plot(xticks, profit_old, color=clr_old,
+                marker='o', markersize=MARKERSIZE, markeredgecolor='#ffffff')
+
+    ax.set_xticks(np.arange(len(years)))
+    ax.set_xticklabels([f'{y:4.0f}' for y in years], rotation=90)
+    if len(past) > 1:
+        ax.legend()
+
+    plt.tight_layout()
+    utl.save_fig(PATH_REP_FIG, _FIGNAME, plt, fingerprint=fingerprint)
+
+    return True
+
+
+def predict_and_plot(df, clf=None, npast=_NPAST, nboot=_NBOOT, force=False,
+                     company=None):
+    """Predicts next years profit of each company and plots it together
+    with the past profit.
+
+    Args:
+        df (DataFrame): Normalized DataFrame (c.f. `utl.load_data`)
+        clf (sklearn.Classifier, optional): Classifier for the prediction,
+            default is a `BaggingRegressor`. If the classifier is already
+            fitted (i.e. has an attribute `n_features_in_`) it is used as is.
+        npast (int): Number of past years to consider
+        nboot (int, optional): Number of bootstrap refits for the prediction
+            interval, 0 for no interval.
+        force (bool, optional): Render even if the saved figure is up to date.
+        company (str, optional): Plot only this company, default is all of
+            them (the classifier is trained on all of them anyway).
+
+    Returns:
+        bool: True if the figure has been rendered.
+    """
+    if clf is None:
+        clf = BaggingRegressor()
 
     # Fix random state
     np.random.seed(SEED)
 
-    # Load data
-    files = Path(PATH_DATA_PROCESSED).glob("*.json")
-    df = utl.load_data(files, PATTERNS_OF_INTEREST, normalized=True)
+    # Predict new values
+    refit = not hasattr(clf, 'n_features_in_')
+    profits = predict_next_years_profits(df, clf, npast, refit=refit)
+    profits_new = {str(comp): profit for comp, profit in profits.items()
+                   if company is None or str(comp) == company}
+    if not profits_new:
+        raise ValueError(f"Unknown company '{company}'.")
+
+    # Prediction intervals
+    intervals = None
+    if nboot > 0:
+        preds = predict_profit_distributions(df, clf, npast, nboot=nboot)
+        preds.columns = preds.columns.astype(str)
+        intervals = {}
+        for comp in profits_new:
+            quant = get_prediction_quantiles(preds[comp].to_numpy())
+            intervals[comp] = (quant[_QUANTILES[0]], quant[_QUANTILES[-1]])
 
-    # Predict new value
-    clf = BaggingRegressor()
-    profit_new = predict_next_years_profit(df, clf, _NPAST)
     print('')
-    print(f'Beliefing the classifier "{clf.__class__.__name__}"\n'
-          f'the profit will be {profit_new:.1f} [{PROFIT_UNIT}]')
+    print(f'Beliefing the classifier "{clf.__class__.__name__}" the profit '
+          f'will be [{PROFIT_UNIT}]')
+    for comp, profit_new in profits_new.items():
+        note = '' if intervals is None else \
+            f' with a {_QUANTILES[-1] - _QUANTILES[0]:.0%} interval of ' \
+            f'[{intervals[comp][0]:.1f}, {intervals[comp][1]:.1f}]'
+        print(f'    {comp}: {profit_new:.1f}{note}')
+    if intervals is not None:
+        print(f'({nboot} refits)')
 
-    # Get year xticks
-    xticklabel = [f'{y:4.0f}' for y in df['Year']]
-    xticklabel.append(f'{int(xticklabel[-1])+1:4.0f}')
-    xticks = np.arange(len(xticklabel))
+    # Past profit of each company
+    past = {}
+    for comp, group in df.groupby(level=DF_COL_COMPANY, sort=True):
+        if str(comp) in profits_new:
+            past[str(comp)] = (utl.get_years(group),
+                               group[DF_COL_PROFIT].tolist())
 
     # Plot figure
-    rotation = 90
-    profit_old = [p for p in df['Profit']]
-    plt.rcParams.update({'font.size': FONTSIZE})
-    _, ax = plt.subplots(1, 1, figsize=(7, 4))
+    rendered = plot_prediction(past, profits_new, intervals=intervals,
+                               force=force)
+    if not rendered:
+        print(f'Figure "{_FIGNAME}" is up to date')
 
-    ax.plot(xticks[-2:], [profit_old[-1], profit_new],
-            color=CLR_CHART_02, linewidth=LINEWIDTH)
-    ax.plot(xticks[-1], profit_new, color=CLR_CHART_02,
-            marker='o', markersize=MARKERSIZE, markeredgecolor='#ffffff')
+    return rendered
 
-    ax.plot(xticks[:-1], profit_old, color=CLR_CHART_12, linewidth=LINEWIDTH)
-    ax.plot(xticks[:-1], profit_old, color=CLR_CHART_12,
-            marker='o', markersize=MARKERSIZE, markeredgecolor='#ffffff')
 
-    ax.set_xticks(xticks)
-    ax.set_xticklabels(xticklabel, rotation=90)
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--force', action='store_true',
+                        help='render the figure even if it is up to date')
+    parser.add_argument('--nboot', type=int, default=_NBOOT,
+                        help='number of bootstrap refits, 0 for no interval')
+    parser.add_argument('--company', default=None,
+                        help='plot only this company')
+    prof.add_profile_argument(parser)
+    args = parser.parse_args()
 
-    plt.tight_layout()
-    utl.save_fig(PATH_REP_FIG, 'Prediction', plt)
-    plt.show()
+    with prof.profile('plot_profit_prediction', args.profile):
+        # Load data
+        with prof.stage('load'):
+            files = get_processed_files()
+            df = utl.load_data(files, PATTERNS_OF_INTEREST, normalized=True)
+
+        # Predict and plot
+        with prof.stage('predict'):
+            rendered = predict_and_plot(df, BaggingRegressor(), _NPAST,
+                                        nboot=args.nboot, force=args.force,
+                                        company=args.company)
+    if rendered:
+        plt.show()
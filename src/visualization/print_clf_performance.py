@@ -15,9 +15,14 @@
 #   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
 
 # Standard library
-from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
+import argparse
+import copy
+import os
 # Third party requirements
 import numpy as np
+import pandas as pd
+from sklearn.base import clone
 from sklearn.model_selection import KFold
 from sklearn.metrics import mean_squared_error, r2_score
 from sklearn.linear_model import LinearRegression, Ridge, Lasso
@@ -28,13 +33,19 @@ from sklearn.tree import DecisionTreeRegressor
 from sklearn.ensemble import BaggingRegressor, RandomForestRegressor
 from sklearn.neural_network import MLPRegressor
 # Local imports
-from src._paths import PATH_DATA_PROCESSED
+from src.data._catalog import get_processed_files
 from src._settings import PATTERNS_OF_INTEREST, SEED, PROFIT_UNIT
+from src._settings import DF_COL_COMPANY, DF_COL_PROFIT
+from src.features._lag_features import LagFeatures
+import src.profiling as prof
 import src.utils as utl
 
 # Constants
 _NPAST = 3
+_NPAST_SWEEP = range(1, 11)
 _NKFOLD = 5
+_NBOOT = 1000
+_QUANTILES = (0.05, 0.5, 0.95)
 _CLF = [
     LinearRegression(),
     Ridge(),
@@ -51,58 +62,216 @@ _CLF = [
 ]
 
 
-def _get_supervised_set(df, npast):
-    """Returns the part of the data for which the answer is known."""
-    # Generate shifted parameters
-    nmax = npast-1         # the removed "1" shift is treated below
+def _get_lag_features(df, npast):
+    """Returns the lag features of the pattern columns for up to `npast`
+    past years.
+    """
     columns = utl.get_dataframe_column_names(PATTERNS_OF_INTEREST)
-    X = df[columns]
-    X = utl.get_shifted_columns(X, nmax).values
-    y = df['Profit'].values
+    return LagFeatures(df, columns, DF_COL_PROFIT, npast,
+                       text=utl.get_hashed_matrix(df))
 
-    # Reduce to non-NaN values and shift the values one instance
-    X = X[nmax:-1, :]
-    y = y[nmax+1:]
 
-    return X, y
+def _get_supervised_set(df, npast, lags=None):
+    """Returns the part of the data for which the answer is known (all the
+    companies at once).
+    """
+    if lags is None:
+        lags = _get_lag_features(df, npast)
+    return lags.supervised_set(npast)
 
 
-def _get_unsupervised_set(df, npast):
-    """Returns the part of the data for which the answer is unknown."""
-    # Generate shifted parameters
-    nmax = npast-1         # the removed "1" shift is treated below
-    columns = utl.get_dataframe_column_names(PATTERNS_OF_INTEREST)
-    X = df[columns]
-    X = utl.get_shifted_columns(X, nmax).values
+def _get_unsupervised_set(df, npast, lags=None):
+    """Returns the part of the data for which the answer is unknown, i.e.
+    the last instance of each company, together with the companies.
+    """
+    if lags is None:
+        lags = _get_lag_features(df, npast)
+    index = pd.Index(lags.entities, name=DF_COL_COMPANY)
+    return lags.unsupervised_set(npast), index
 
-    # Return last instance for which the answer is not known
-    return X[-1, :].reshape(1, -1)
 
+def _refit_chunk(chunk):
+    """Refits a classifier on several resampled sets and returns the
+    predictions (runs in a worker process).
+    """
+    clf, X, y, X_pred, samples, seeds = chunk
+    has_random_state = 'random_state' in clf.get_params()
 
-def predict_next_years_profit(df, clf, npast):
-    """Predicts the profit of next year based on the reports of this year.
+    preds = np.empty((len(samples), len(X_pred)))
+    for i, (ind, seed) in enumerate(zip(samples, seeds)):
+        if has_random_state:
+            clf.set_params(random_state=int(seed))
+        clf.fit(X[ind], y[ind])
+        preds[i] = clf.predict(X_pred)
+    return preds
+
+
+def predict_next_years_profits(df, clf, npast, refit=True, lags=None):
+    """Predicts the profit of next year for each company in the panel by a
+    single classifier trained on all the companies.
 
     Args:
         df (DataFrame): DataFrame (c.f. `utl.load_data`)
         clf (sklearn.Classifier): Classifier for the prediction
         npast (int): Number of past years to consider
+        refit (bool, optional): Fit the classifier, if False `clf` must
+            already be fitted on the supervised set of `df`.
+        lags (LagFeatures, optional): Lag features of `df` for at least
+            `npast` years, built if omitted.
 
     Returns:
-        int: Profit of next year.
+        Series: Profit of next year per company.
     """
+    if lags is None:
+        lags = _get_lag_features(df, npast)
 
     # Get datasets
-    X_train, y_train = _get_supervised_set(df, npast)
-    X_pred = _get_unsupervised_set(df, npast)
+    X_pred, companies = _get_unsupervised_set(df, npast, lags)
 
     # Train and Predict
-    clf.fit(X_train, y_train)
+    if refit:
+        X_train, y_train = _get_supervised_set(df, npast, lags)
+        clf.fit(X_train, y_train)
     y_pred = clf.predict(X_pred)
 
-    return y_pred[0]
+    return pd.Series(y_pred, index=companies, name=DF_COL_PROFIT)
+
+
+def predict_next_years_profit(df, clf, npast, refit=True, company=None,
+                              lags=None):
+    """Predicts the profit of next year based on the reports of this year.
+
+    Args:
+        df (DataFrame): DataFrame (c.f. `utl.load_data`)
+        clf (sklearn.Classifier): Classifier for the prediction
+        npast (int): Number of past years to consider
+        refit (bool, optional): Fit the classifier, if False `clf` must
+            already be fitted on the supervised set of `df`.
+        company (str, optional): Company, can be omitted if `df` contains a
+            single company.
+        lags (LagFeatures, optional): Lag features of `df` for at least
+            `npast` years, built if omitted.
+
+    Returns:
+        int: Profit of next year.
+    """
+    profits = predict_next_years_profits(df, clf, npast, refit=refit,
+                                         lags=lags)
 
+    if company is None:
+        if len(profits) > 1:
+            raise ValueError(f'The data contains {len(profits)} companies, '
+                             f'please specify one of them.')
+        return profits.iloc[0]
+    return profits[company]
+
+
+def predict_profit_distributions(df, clf, npast, nboot=_NBOOT,
+                                 method='bootstrap', nprocs=None, seed=SEED):
+    """Predicts next years profit of each company by refitting the
+    classifier on resampled supervised sets.
+
+    The refits run in parallel processes. Each refit gets its own seed
+    derived from `seed` (used for the resampling and as `random_state` of
+    the classifier if it has one), hence the result does not depend on the
+    number of processes.
+
+    Args:
+        df (DataFrame): DataFrame (c.f. `utl.load_data`)
+        clf (sklearn.Classifier): Classifier for the prediction (not altered,
+            the refits use clones)
+        npast (int): Number of past years to consider
+        nboot (int, optional): Number of bootstrap refits (ignored for the
+            jackknife that uses one refit per training instance).
+        method (str {'bootstrap', 'jackknife'}, optional): Resampling method.
+        nprocs (int, optional): Number of worker processes.
+        seed (int, optional): Seed of the random refits.
+
+    Returns:
+        DataFrame: Predictions of next years profit, one row per refit and
+            one column per company.
+    """
+    lags = _get_lag_features(df, npast)
+    X, y = _get_supervised_set(df, npast, lags)
+    X_pred, companies = _get_unsupervised_set(df, npast, lags)
+
+    # Index sets of the refits
+    nsamples = len(y)
+    if nsamples < 2:
+        raise ValueError(f'The resampling needs at least 2 supervised '
+                         f'samples, got {nsamples} (too few years per '
+                         f'company for npast={npast}).')
+    if method == 'bootstrap':
+        seeds = np.random.SeedSequence(seed).generate_state(nboot)
+        samples = [np.random.default_rng(s).integers(0, nsamples, nsamples)
+                   for s in seeds]
+    elif method == 'jackknife':
+        seeds = np.random.SeedSequence(seed).generate_state(nsamples)
+        samples = [np.delete(np.arange(nsamples), i) for i in range(nsamples)]
+    else:
+        raise ValueError(f"Unknown resampling method '{method}'.")
+
+    # Split the refits into chunks for the worker processes
+    nprocs = nprocs or os.cpu_count() or 1
+    nchunks = min(len(samples), 4 * nprocs)
+    bounds = np.linspace(0, len(samples), nchunks + 1).astype(int)
+    chunks = [(clone(clf), X, y, X_pred, samples[lo:hi], seeds[lo:hi])
+              for lo, hi in zip(bounds[:-1], bounds[1:])]
+
+    with ProcessPoolExecutor(max_workers=nprocs) as executor:
+        preds = list(executor.map(_refit_chunk, chunks))
+
+    return pd.DataFrame(np.concatenate(preds), columns=companies)
+
+
+def predict_profit_distribution(df, clf, npast, nboot=_NBOOT,
+                                method='bootstrap', company=None, nprocs=None,
+                                seed=SEED):
+    """Predicts next years profit of a company by refitting the classifier
+    on resampled supervised sets (c.f. `predict_profit_distributions`).
+
+    Args:
+        df (DataFrame): DataFrame (c.f. `utl.load_data`)
+        clf (sklearn.Classifier): Classifier for the prediction (not altered,
+            the refits use clones)
+        npast (int): Number of past years to consider
+        nboot (int, optional): Number of bootstrap refits (ignored for the
+            jackknife that uses one refit per training instance).
+        method (str {'bootstrap', 'jackknife'}, optional): Resampling method.
+        company (str, optional): Company, can be omitted if `df` contains a
+            single company.
+        nprocs (int, optional): Number of worker processes.
+        seed (int, optional): Seed of the random refits.
+
+    Returns:
+        ndarray: Predictions of next years profit, one per refit.
+    """
+    preds = predict_profit_distributions(df, clf, npast, nboot=nboot,
+                                         method=method, nprocs=nprocs,
+                                         seed=seed)
+    if company is None:
+        if preds.shape[1] > 1:
+            raise ValueError(f'The data contains {preds.shape[1]} '
+                             f'companies, please specify one of them.')
+        return preds.iloc[:, 0].to_numpy()
+    return preds[company].to_numpy()
+
+
+def get_prediction_quantiles(preds, quantiles=_QUANTILES):
+    """Returns quantiles of a prediction distribution.
+
+    Args:
+        preds (ndarray): Predictions (c.f. `predict_profit_distribution`).
+        quantiles (tuple of float, optional): Quantiles in [0, 1].
 
-def measure_clf_score(df, clf, npast, nkfold=10):
+    Returns:
+        dict: Value for each quantile.
+    """
+    values = np.quantile(preds, quantiles)
+    return {q: float(v) for q, v in zip(quantiles, values)}
+
+
+def measure_clf_score(df, clf, npast, nkfold=10, lags=None):
     """Measures the accuracy of a classifier by cross validation.
 
     Args:
@@ -110,6 +279,8 @@ def measure_clf_score(df, clf, npast, nkfold=10):
         clf (sklearn.Classifier): Classifier for the prediction
         npast (int): Number of past years to consider
         nkfold (int): Number of folds for cross validation.
+        lags (LagFeatures, optional): Lag features of `df` for at least
+            `npast` years, built if omitted.
 
     Returns:
         float: Profit of next year.
@@ -118,7 +289,7 @@ def measure_clf_score(df, clf, npast, nkfold=10):
     kfold = KFold(n_splits=nkfold)
 
     # Get data
-    X, y = _get_supervised_set(df, npast)
+    X, y = _get_supervised_set(df, npast, lags)
 
     # Iteratively fit and test all k folds
     y_test_all = []
@@ -144,28 +315,43 @@ def measure_clf_score(df, clf, npast, nkfold=10):
     return rmse, r2
 
 
-if __name__ == '__main__':
-    space_indent = 4
-    space_clf = 30
-    space_profit = 6
+def evaluate_classifiers(df, clfs, npast=_NPAST, nkfold=_NKFOLD,
+                         fitted=None, lags=None):
+    """Predicts next years profit and measures the cross validation
+    performance for a list of classifiers.
 
-    # Load data
-    files = Path(PATH_DATA_PROCESSED).glob("*.json")
-    df = utl.load_data(files, PATTERNS_OF_INTEREST, normalized=True)
+    Args:
+        df (DataFrame): DataFrame (c.f. `utl.load_data`)
+        clfs (list of sklearn.Classifier): Classifiers to evaluate.
+        npast (int): Number of past years to consider
+        nkfold (int): Number of folds for cross validation.
+        fitted (dict, optional): If given, a copy of each classifier fitted
+            on the whole supervised set is stored under the key
+            `(name, npast)`.
+        lags (LagFeatures, optional): Lag features of `df` for at least
+            `npast` years, built if omitted.
 
-    # Get prediction for next year for each classifier
+    Returns:
+        list of tuple: `(name, profit, rmse, r2)` for each classifier, where
+            `profit` is averaged over the companies if `df` contains several
+            of them.
+    """
+    if lags is None:
+        lags = _get_lag_features(df, npast)
     results = []
-    for clf in _CLF:
+    for clf in clfs:
         # Fix random state
         np.random.seed(SEED)
 
         # Compute cross validation performance
         name = clf.__class__.__name__
         print(f'{name}...', end='')
-        profit = predict_next_years_profit(df, clf, _NPAST)
-        rmse, r2 = measure_clf_score(df, clf, _NPAST, _NKFOLD)
+        profit = predict_next_years_profits(df, clf, npast, lags=lags).mean()
+        if fitted is not None:
+            fitted[(name, npast)] = copy.deepcopy(clf)
+        rmse, r2 = measure_clf_score(df, clf, npast, nkfold, lags=lags)
         res = (
-            clf.__class__.__name__,
+            name,
             profit,
             rmse,
             r2,
@@ -173,15 +359,30 @@ if __name__ == '__main__':
         results.append(res)
         print('done')
 
+    return results
+
+
+def print_results(results, sort_index=2, reverse=False):
+    """Prints the performances of the classifiers.
+
+    Args:
+        results (list of tuple): Results of `evaluate_classifiers`.
+        sort_index (int, optional): Use
+            - 0 and `reverse=False`  for alphabetical names
+            - 1 and `reverse=True`  for highest profit first
+            - 2 and `reverse=False` for lowest RMSE first
+            - 3 and `reverse=True` for highest  R2 score first
+        reverse (bool, optional): Reverse the order.
+
+    Returns:
+        None
+    """
+    space_indent = 4
+    space_clf = 30
+    space_profit = 6
+
     # Order performances
-    # Use sort_index =
-    #   - 0 and `reverse=False`  for alphabetical names
-    #   - 1 and `reverse=True`  for highest profit first
-    #   - 2 and `reverse=False` for lowest RMSE first
-    #   - 3 and `reverse=True` for highest  R2 score first
-    sort_index = 2
-    reverse = False
-    results.sort(key=lambda x: x[sort_index], reverse=reverse)
+    results = sorted(results, key=lambda x: x[sort_index], reverse=reverse)
 
     # Print performances
     print(f'\nNext years profit prediction in [{PROFIT_UNIT}] is:')
@@ -192,4 +393,95 @@ if __name__ == '__main__':
         print(f'{" "*space_indent}(RMSE = {rmse:6.1f}, R2 = {r2:6.3f})')
 
 
+def sweep_npast(df, clfs, npasts=_NPAST_SWEEP, nkfold=_NKFOLD):
+    """Evaluates a list of classifiers for several numbers of past years.
+
+    The lag features are built once for the largest number of past years,
+    the smaller ones use views of them.
 
+    Args:
+        df (DataFrame): DataFrame (c.f. `utl.load_data`)
+        clfs (list of sklearn.Classifier): Classifiers to evaluate.
+        npasts (iterable of int, optional): Numbers of past years.
+        nkfold (int): Number of folds for cross validation.
+
+    Returns:
+        dict: Results of `evaluate_classifiers` for each number of past
+            years.
+    """
+    npasts = sorted(npasts)
+    lags = _get_lag_features(df, npasts[-1])
+    sweep = {}
+    for npast in npasts:
+        print(f'npast = {npast}')
+        _, y = lags.supervised_set(npast)
+        if len(y) < nkfold:
+            print(f'    only {len(y)} training instances, skipped')
+            continue
+        sweep[npast] = evaluate_classifiers(df, clfs, npast, nkfold,
+                                            lags=lags)
+    return sweep
+
+
+def print_sweep_results(sweep):
+    """Prints the cross validation RMSE of the classifiers for each number
+    of past years.
+
+    Args:
+        sweep (dict): Results of `sweep_npast`.
+
+    Returns:
+        None
+    """
+    space_indent = 4
+    space_clf = 30
+    space_rmse = 8
+
+    npasts = sorted(sweep)
+    names = [res[0] for res in sweep[npasts[0]]] if npasts else []
+
+    print(f'\nCross validation RMSE in [{PROFIT_UNIT}] per number of past '
+          f'years:')
+    print(f'{" "*space_indent}{"":{space_clf}}', end='')
+    print(''.join(f'{npast:{space_rmse}d}' for npast in npasts))
+    for i, nm in enumerate(names):
+        print(f'{" "*space_indent}{nm:{space_clf}}', end='')
+        print(''.join(f'{sweep[npast][i][2]:{space_rmse}.1f}'
+                      for npast in npasts))
+
+
+def _parse_args():
+    """Parses the command line arguments."""
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--hashed', action='store_true',
+                        help='train also on the hashed text features (c.f. '
+                             'src/features/build_hashed_features.py)')
+    parser.add_argument('--sweep', action='store_true',
+                        help=f'evaluate the classifiers for npast in '
+                             f'{_NPAST_SWEEP.start}..{_NPAST_SWEEP.stop-1}')
+    prof.add_profile_argument(parser)
+    return parser.parse_args()
+
+
+if __name__ == '__main__':
+    args = _parse_args()
+
+    with prof.profile('print_clf_performance', args.profile):
+        # Load data
+        with prof.stage('load'):
+            files = get_processed_files()
+            df = utl.load_data(files, PATTERNS_OF_INTEREST, normalized=True,
+                               hashed=args.hashed)
+
+        if args.sweep:
+            # Evaluate each classifier for several numbers of past years
+            with prof.stage('evaluate'):
+                sweep = sweep_npast(df, _CLF, _NPAST_SWEEP, _NKFOLD)
+            print_sweep_results(sweep)
+        else:
+            # Get prediction for next year for each classifier
+            with prof.stage('evaluate'):
+                results = evaluate_classifiers(df, _CLF, _NPAST, _NKFOLD)
+
+            # Print performances
+            print_results(results)
@@ -0,0 +1,117 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Prints the memory footprint of the DataFrame built by `utl.load_data`
+per 1,000 documents.
+
+The documents are synthetic processed data sets (summary moods) written to a
+temporary folder, such that the benchmark does not depend on the corpus. The
+footprint is compared with a plain float64 layout (one float64 column per
+entry, year included, and an object column for the company) as it was used
+before the columns got compact types.
+"""
+
+# -------------------------------------------------------------------------
+#   Author(s): Christoph Jaeggli
+#   Institute: (None)
+#
+#   MIT License
+#   Copyright (c) 2020 Christoph Jaeggli
+#
+#   This program is distributed in the hope that it will be useful, but
+#   WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+
+# Standard library
+from pathlib import Path
+import argparse
+import json
+import random
+import tempfile
+# Third party requirements
+import numpy as np
+import pandas as pd
+# Local imports
+from src._settings import PATTERNS_OF_INTEREST, SEED
+import src.profiling as prof
+import src.utils as utl
+
+# Constants
+_NDOCS = 1000
+_NCOMPANIES = 50
+_NPATTERNS = 100
+_FIRST_YEAR = 2000
+
+
+def _write_documents(path, ndocs, patterns):
+    """Writes synthetic processed data sets."""
+    rng = random.Random(SEED)
+    nyears = max(ndocs // _NCOMPANIES, 1)
+    files = []
+    for idoc in range(ndocs):
+        company = f'Company{idoc // nyears:03d}'
+        year = _FIRST_YEAR + idoc % nyears
+        filename = f'{company}_{year}'
+        mood = {}
+        for pat in patterns:
+            pol = rng.uniform(-1, 1)
+            mood[pat] = {
+                'Count': rng.randrange(1, 200),
+                'Polarity': {'Mean': pol, 'Var': 0., 'Min': pol, 'Max': pol},
+                'Subjectivity': {'Mean': 0., 'Var': 0., 'Min': 0., 'Max': 0.},
+                'Examples': [],
+            }
+        content = {
+            'Metadata': {'Filename': filename, 'Year': year},
+            'Data': {'Profit': rng.randrange(int(1e8)), 'Mood': mood},
+        }
+        file = Path(path, filename).with_suffix('.json')
+        with open(file, 'w') as dfile:
+            json.dump(content, dfile)
+        files.append(file)
+    return files
+
+
+def _float64_footprint(df):
+    """Footprint of the same data as a float64 array plus an object column
+    for the company.
+    """
+    ncols = df.shape[1] + 1     # year included
+    plain = pd.DataFrame(np.zeros((len(df), ncols), dtype=np.float64))
+    plain['Company'] = df.index.get_level_values(0).astype(str).astype(object)
+    return plain.memory_usage(deep=True).sum()
+
+
+def _parse_args():
+    """Parses the command line arguments."""
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    prof.add_profile_argument(parser)
+    return parser.parse_args()
+
+
+if __name__ == '__main__':
+    args = _parse_args()
+
+    patterns = list(PATTERNS_OF_INTEREST)
+    patterns += [f'synthetic_pattern_{i}' for i in range(_NPATTERNS)]
+
+    with prof.profile('print_load_data_memory', args.profile):
+        with tempfile.TemporaryDirectory() as tmp:
+            with prof.stage('write'):
+                files = _write_documents(tmp, _NDOCS, patterns)
+            with prof.stage('load'):
+                df = utl.load_data(files, patterns)
+
+    usage = df.memory_usage(deep=True, index=True)
+    compact = usage.sum()
+    plain = _float64_footprint(df)
+    scale = 1000 / _NDOCS
+
+    print('')
+    print(f'{_NDOCS} documents, {len(patterns)} patterns, '
+          f'{df[utl.get_dataframe_column_names(patterns)].shape[1]} '
+          f'feature columns')
+    dtypes = df.dtypes.astype(str).value_counts()
+    print(f'    dtypes:  {", ".join(f"{n} {t}" for t, n in dtypes.items())}')
+    print(f'    compact: {compact * scale / 1024:10.1f} KiB / 1000 documents')
+    print(f'    float64: {plain * scale / 1024:10.1f} KiB / 1000 documents')
+    print(f'    ratio:   {compact / plain:10.3f}')
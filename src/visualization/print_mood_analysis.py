@@ -1,6 +1,10 @@
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
-"""Reads a pdf file and plots the word counts of the most occurring ones.
+"""Reads a pdf file and prints the mean polarity and subjectivity of the
+patterns of interest.
+
+The NLP work is done by the local NLP service if it is running (c.f.
+`src/nlp_service.py`), otherwise the models are loaded in this process.
 """
 
 # -------------------------------------------------------------------------
@@ -15,11 +19,13 @@
 #   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
 
 # Standard library
+import argparse
 # Third party requirements
 # Local imports
 from src._paths import PATH_DATA_RAW
 from src._settings import PATTERNS_OF_INTEREST
-import src.utils as utl
+import src.nlp_service as nlp
+import src.profiling as prof
 
 # Constants
 _FILENAME = 'MainCompany_2009'
@@ -29,32 +35,41 @@ _FILENAME = 'MainCompany_2009'
 # _FILENAME = 'SideCompany_Y_2019'
 
 
-def _print_pol_and_subj(pat, sentences, indent=4, dec=3):
+def _print_pol_and_subj(pat, mood, indent=4, dec=3):
     """Prints the mean polarity and mean subjectivity of a pattern per
     sentence.
     """
-    # Compute polarity and subjectivity
-    mood = utl.compute_pat_mood(pat, sentences)
-
     # Print statistics for the given pattern
     print(f'{" " * indent}{pat}')
-    pol = sum(mood['Polarity']) / len(mood['Polarity'])
-    subj = sum(mood['Subjectivity']) / len(mood['Subjectivity'])
+    pol = mood['Polarity']['Mean']
+    subj = mood['Subjectivity']['Mean']
+    pol = float('nan') if pol is None else pol
+    subj = float('nan') if subj is None else subj
     print(f'{" "*indent*2}Polarity     = {pol:{dec+2}.{dec}f}')
     print(f'{" "*indent*2}Subjectivity = {subj:{dec+2}.{dec}f}')
 
 
-if __name__ == '__main__':
+def _parse_args():
+    """Parses the command line arguments."""
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    prof.add_profile_argument(parser)
+    return parser.parse_args()
 
-    # Get sentences from the file
-    sentences = utl.get_sentences_from_pdf(PATH_DATA_RAW, _FILENAME)
 
-    # Print the Title
-    print('')
-    print(f'File {_FILENAME}')
-    print('')
+if __name__ == '__main__':
+    args = _parse_args()
+
+    with prof.profile('print_mood_analysis', args.profile):
+        # Compute polarity and subjectivity of all patterns
+        with prof.stage('mood'):
+            moods = nlp.compute_file_mood(PATH_DATA_RAW, _FILENAME,
+                                          PATTERNS_OF_INTEREST)
 
-    # Print Mean Polarity and Subjectivity
-    for pat in PATTERNS_OF_INTEREST:
-        _print_pol_and_subj(pat, sentences)
+        # Print the Title
+        print('')
+        print(f'File {_FILENAME}')
+        print('')
 
+        # Print Mean Polarity and Subjectivity
+        for pat in PATTERNS_OF_INTEREST:
+            _print_pol_and_subj(pat, moods[pat])
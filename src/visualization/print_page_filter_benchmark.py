@@ -0,0 +1,122 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Compares the extraction with and without the page filter (c.f.
+`utl.filter_pages`) on the same pdf files.
+
+For each file it prints
+    - the number of skipped pages,
+    - the time to read, split, and normalize the sentences and to match the
+      `PATTERNS_OF_INTEREST` (best of `_NREPEAT` runs),
+    - the number of matching sentences per pattern, which should not change
+      (a difference means that a skipped page contained matching sentences,
+      e.g. a table with a row 'Forderungen gegenüber Kunden').
+"""
+
+# -------------------------------------------------------------------------
+#   Author(s): Christoph Jaeggli
+#   Institute: (None)
+#
+#   MIT License
+#   Copyright (c) 2020 Christoph Jaeggli
+#
+#   This program is distributed in the hope that it will be useful, but
+#   WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+
+# Standard library
+import argparse
+import re
+import time
+# Third party requirements
+# Local imports
+from src._paths import PATH_DATA_RAW
+from src._settings import PATTERNS_OF_INTEREST
+import src.profiling as prof
+import src.utils as utl
+
+# Constants
+_FILENAMES = [
+    'MainCompany_2009',
+    'MainCompany_2019',
+    # 'SideCompany_A_2019',
+    # 'SideCompany_B_2019',
+    # 'SideCompany_Y_2019',
+]
+_MODES = ['all', 'filtered']
+_NREPEAT = 3
+
+# Print space settings
+_SPACE_INDENT = 4
+_SPACE_NAME = 34
+_SPACE_VAL = 12
+
+
+def _extract(filename, filtered):
+    """Reads a pdf file and returns the document, the normalized sentences,
+    and the number of matching sentences per pattern.
+    """
+    document = utl.read_pdf(PATH_DATA_RAW, filename, layout=filtered)
+    if filtered:
+        document = utl.filter_pages(document)
+    sentences = utl.get_sentences_from_document(document)
+    counts = [sum(1 for sent in sentences if re.search(pat, sent))
+              for pat in PATTERNS_OF_INTEREST]
+    return document, counts
+
+
+def _benchmark(filename, filtered):
+    """Extracts a file several times and returns the document, the counts,
+    and the best time.
+    """
+    best = float('inf')
+    for _ in range(_NREPEAT):
+        tic = time.perf_counter()
+        document, counts = _extract(filename, filtered)
+        best = min(best, time.perf_counter() - tic)
+    return document, counts, best
+
+
+def _print_row(name, values, fmt):
+    """Prints a row of the result table."""
+    print(f'{" " * _SPACE_INDENT}{name:{_SPACE_NAME}}', end='')
+    for val in values:
+        print(f'{val:>{_SPACE_VAL}{fmt}}', end='')
+    print('')
+
+
+def _parse_args():
+    """Parses the command line arguments."""
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    prof.add_profile_argument(parser)
+    return parser.parse_args()
+
+
+if __name__ == '__main__':
+    args = _parse_args()
+
+    with prof.profile('print_page_filter_benchmark', args.profile):
+        for filename in _FILENAMES:
+            results = {}
+            for mode in _MODES:
+                with prof.stage(mode):
+                    results[mode] = _benchmark(filename, mode == 'filtered')
+
+            document = results['filtered'][0]
+            npages = document['metadata']['npages']
+            skipped = document['metadata']['skipped_pages']
+
+            # Print the Title
+            print('')
+            print(f'File {filename} ({npages} pages)')
+            print('')
+            _print_row('', _MODES, 's')
+            _print_row('pages', [npages, npages - len(skipped)], 'd')
+            times = [results[mode][2] for mode in _MODES]
+            _print_row('time [s]', times, '.3f')
+            for ip, pat in enumerate(PATTERNS_OF_INTEREST):
+                _print_row(pat, [results[mode][1][ip] for mode in _MODES],
+                           'd')
+            print(f'{" " * _SPACE_INDENT}{"speedup":{_SPACE_NAME}}'
+                  f'{times[0] / times[1]:>{2 * _SPACE_VAL}.2f}')
+            print(f'{" " * _SPACE_INDENT}{"skipped":{_SPACE_NAME}}'
+                  f'{", ".join(str(num + 1) for num in skipped)}')
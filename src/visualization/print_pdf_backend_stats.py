@@ -0,0 +1,117 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Prints the pdf extraction statistics of the processed data sets (c.f.
+'Extraction' in `make_dataset.py`).
+
+It prints
+    - per package the number of documents and pages it has read, its pages
+      per second over the whole corpus, and the number of documents it failed
+      on,
+    - per used backend (e.g. 'fitz' or 'fitz+PyPDF2' for documents with
+      replaced pages) the number of documents,
+    - the documents that have not been read by the fastest package alone,
+such that the thresholds `PDF_MIN_CHARS`, `PDF_MAX_REPLACEMENT`,
+`PDF_MIN_ALNUM`, and `PDF_MAX_POOR` of `PDF_BACKEND = 'auto'` can be tuned.
+"""
+
+# -------------------------------------------------------------------------
+#   Author(s): Christoph Jaeggli
+#   Institute: (None)
+#
+#   MIT License
+#   Copyright (c) 2020 Christoph Jaeggli
+#
+#   This program is distributed in the hope that it will be useful, but
+#   WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+
+# Standard library
+from collections import Counter, defaultdict
+from pathlib import Path
+import argparse
+import json
+# Third party requirements
+# Local imports
+from src.data._catalog import get_processed_files
+import src.profiling as prof
+
+# Constants
+_COLUMNS = ['documents', 'pages', 'pages/s', 'failed']
+
+# Print space settings
+_SPACE_INDENT = 4
+_SPACE_NAME = 24
+_SPACE_VAL = 12
+
+
+def _get_extractions(files):
+    """Returns the extraction statistics of the processed data sets that
+    have them.
+    """
+    extractions = {}
+    for file in files:
+        with open(str(file), 'r') as jfile:
+            metadata = json.load(jfile)['Metadata']
+        if 'Extraction' in metadata:
+            extractions[Path(file).stem] = metadata['Extraction']
+    return extractions
+
+
+def _get_package_stats(extractions):
+    """Returns the documents, pages, seconds, and failures per package."""
+    stats = defaultdict(lambda: {'documents': 0, 'pages': 0, 'seconds': 0.,
+                                 'failed': 0})
+    for extraction in extractions.values():
+        for backend, pstats in extraction['Packages'].items():
+            stats[backend]['documents'] += 1
+            stats[backend]['pages'] += pstats['Pages']
+            stats[backend]['seconds'] += pstats['Seconds']
+            stats[backend]['failed'] += 'Error' in pstats
+    return stats
+
+
+def _print_row(name, values, fmt):
+    """Prints a row of the result table."""
+    print(f'{" " * _SPACE_INDENT}{name:{_SPACE_NAME}}', end='')
+    for val, vfmt in zip(values, fmt):
+        print(f'{val:>{_SPACE_VAL}{vfmt}}', end='')
+    print('')
+
+
+def _parse_args():
+    """Parses the command line arguments."""
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--company', default=None,
+                        help='only the data sets of this company')
+    prof.add_profile_argument(parser)
+    return parser.parse_args()
+
+
+if __name__ == '__main__':
+    args = _parse_args()
+
+    with prof.profile('print_pdf_backend_stats', args.profile):
+        with prof.stage('load'):
+            extractions = _get_extractions(get_processed_files(args.company))
+
+        print('')
+        print(f'Extraction of {len(extractions)} data sets')
+        print('')
+        _print_row('package', _COLUMNS, ['s'] * len(_COLUMNS))
+        for backend, stats in _get_package_stats(extractions).items():
+            speed = stats['pages'] / stats['seconds'] \
+                if stats['seconds'] > 0 else float('nan')
+            _print_row(backend, [stats['documents'], stats['pages'], speed,
+                                 stats['failed']], ['d', 'd', '.1f', 'd'])
+
+        print('')
+        used = Counter(ext['Backend'] for ext in extractions.values())
+        _print_row('backend', ['documents'], ['s'])
+        for backend, count in used.most_common():
+            _print_row(backend, [count], ['d'])
+
+        fallbacks = [name for name, ext in extractions.items()
+                     if len(ext['Packages']) > 1]
+        print('')
+        print(f'{" " * _SPACE_INDENT}{"fallback":{_SPACE_NAME}}'
+              f'{", ".join(fallbacks) if fallbacks else "-"}')
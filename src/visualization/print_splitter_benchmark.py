@@ -0,0 +1,133 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Compares the throughput and the split quality of the sentence splitters
+('punkt' and 'german') on the same pdf files.
+
+As there is no gold standard, the quality is measured by
+    - the share of short fragments (less than `_MIN_WORDS` normalized words)
+      which are mostly produced by wrong splits after abbreviations,
+    - the share of sentences that end with a known abbreviation,
+    - the share of sentences that are identical for both splitters.
+"""
+
+# -------------------------------------------------------------------------
+#   Author(s): Christoph Jaeggli
+#   Institute: (None)
+#
+#   MIT License
+#   Copyright (c) 2020 Christoph Jaeggli
+#
+#   This program is distributed in the hope that it will be useful, but
+#   WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+
+# Standard library
+import argparse
+import time
+# Third party requirements
+# Local imports
+from src._paths import PATH_DATA_RAW
+from src.features._sentence_splitter import _german_abbreviations
+import src.profiling as prof
+import src.utils as utl
+
+# Constants
+_FILENAMES = [
+    'MainCompany_2009',
+    'MainCompany_2019',
+    # 'SideCompany_A_2019',
+    # 'SideCompany_B_2019',
+    # 'SideCompany_Y_2019',
+]
+_SPLITTERS = ['punkt', 'german']
+_MIN_WORDS = 3
+_NREPEAT = 3
+
+# Print space settings
+_SPACE_INDENT = 4
+_SPACE_NAME = 10
+_SPACE_VAL = 12
+
+
+def _benchmark_splitter(document, splitter):
+    """Splits a document several times and returns the sentences together
+    with the best time.
+    """
+    best = float('inf')
+    for _ in range(_NREPEAT):
+        tic = time.perf_counter()
+        sentences = utl.split_sentences(document, splitter=splitter)
+        best = min(best, time.perf_counter() - tic)
+    return sentences, best
+
+
+def _get_quality(sentences):
+    """Returns the share of short fragments and of sentences ending with an
+    abbreviation.
+    """
+    abbrev = set(_german_abbreviations())
+    nshort, nabbrev = 0, 0
+    for sent in sentences:
+        if len(utl.normalize_text(sent).split()) < _MIN_WORDS:
+            nshort += 1
+        last = sent.rstrip().rstrip('.').split()
+        if sent.rstrip().endswith('.') and last and last[-1].lower() in abbrev:
+            nabbrev += 1
+
+    nsent = max(len(sentences), 1)
+    return nshort / nsent, nabbrev / nsent
+
+
+def _print_row(name, values, fmt):
+    """Prints a row of the result table."""
+    print(f'{" " * _SPACE_INDENT}{name:{_SPACE_NAME}}', end='')
+    for val in values:
+        print(f'{val:>{_SPACE_VAL}{fmt}}', end='')
+    print('')
+
+
+def _parse_args():
+    """Parses the command line arguments."""
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    prof.add_profile_argument(parser)
+    return parser.parse_args()
+
+
+if __name__ == '__main__':
+    args = _parse_args()
+
+    with prof.profile('print_splitter_benchmark', args.profile):
+        for filename in _FILENAMES:
+            with prof.stage('read'):
+                document = utl.read_pdf(PATH_DATA_RAW, filename)
+            nchars = len(document['text'])
+
+            results = {}
+            for splitter in _SPLITTERS:
+                with prof.stage(splitter):
+                    sentences, elapsed = _benchmark_splitter(document,
+                                                             splitter)
+                short, abbrev = _get_quality(sentences)
+                results[splitter] = {
+                    'sentences':    sentences,
+                    'nsent':        len(sentences),
+                    'mchars/s':     nchars / elapsed / 1e6,
+                    'short':        short,
+                    'abbrev':       abbrev,
+                }
+
+            # Print the Title
+            print('')
+            print(f'File {filename} ({nchars} characters)')
+            print('')
+            _print_row('', _SPLITTERS, 's')
+            for key, fmt in [('nsent', 'd'), ('mchars/s', '.3f'),
+                             ('short', '.3f'), ('abbrev', '.3f')]:
+                _print_row(key, [results[s][key] for s in _SPLITTERS], fmt)
+
+            # Share of common sentences
+            common = set(results['punkt']['sentences'])
+            common &= set(results['german']['sentences'])
+            nmax = max(results[s]['nsent'] for s in _SPLITTERS)
+            print(f'{" " * _SPACE_INDENT}{"common":{_SPACE_NAME}}'
+                  f'{len(common) / max(nmax, 1):>{_SPACE_VAL}.3f}')
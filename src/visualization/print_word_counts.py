@@ -1,6 +1,13 @@
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
 """Reads a pdf file and plots the word counts of the most occurring ones.
+
+With the option `--approx` the words of all the files are counted together
+by a sketch of fixed size (c.f. `_word_sketch.WordSketch`) instead of an
+exact counter per file. The counts of the most occurring words are printed
+together with their error bound, the sums of the patterns are exact. With
+`--nprocs N` the files are counted by N worker processes whose sketches are
+merged.
 """
 
 # -------------------------------------------------------------------------
@@ -16,11 +23,17 @@
 
 # Standard library
 from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial, reduce
+import argparse
 import re
 # Third party requirements
 # Local imports
 from src._paths import PATH_DATA_RAW
-from src._settings import PATTERNS_OF_INTEREST
+from src._settings import PATTERNS_OF_INTEREST, WORD_SKETCH_EPSILON,\
+    WORD_SKETCH_DELTA, WORD_SKETCH_NTOP
+from src.features._word_sketch import WordSketch
+import src.profiling as prof
 import src.utils as utl
 
 # Constants
@@ -58,6 +71,7 @@ _SPACE_INDENT = 4
 _SPACE_WORDS = 50
 _SPACE_COUNT = 15
 _SPACE_COUNTWORD = 15
+_SPACE_ERROR = 15
 
 
 def _get_word_count_from_pdf(path, filename, stemmer=None):
@@ -73,6 +87,48 @@ def _get_word_count_from_pdf(path, filename, stemmer=None):
         list of tuple: Return a count in the form (word, count) in descending
             order.
     """
+    # Count the appearances of each (normalized) word
+    tokens = _get_tokens_from_pdf(path, filename, stemmer=stemmer)
+    counter = Counter(tokens).most_common()
+
+    return counter
+
+
+def _get_word_sketch_from_pdfs(path, filenames, stemmer=None):
+    """Reads some pdf files and returns a sketch of the word counts of all
+    of them (c.f. `WordSketch`).
+
+    Args:
+        path (Path): Path to the .pdf files.
+        filenames (list of str): File names.
+        stemmer (str, optional): Stemmer for normalizing the text.
+
+    Returns:
+        WordSketch: Approximate word counts.
+    """
+    sketch = WordSketch(epsilon=WORD_SKETCH_EPSILON, delta=WORD_SKETCH_DELTA,
+                        ntop=WORD_SKETCH_NTOP, patterns=PATTERNS_OF_INTEREST)
+    for filename in filenames:
+        sketch.update(_get_tokens_from_pdf(path, filename, stemmer=stemmer))
+    return sketch
+
+
+def _get_word_sketch_parallel(path, filenames, stemmer=None, nprocs=1):
+    """Counts the words of some pdf files by `nprocs` worker processes and
+    merges their sketches.
+    """
+    if nprocs <= 1:
+        return _get_word_sketch_from_pdfs(path, filenames, stemmer)
+
+    chunks = [filenames[i::nprocs] for i in range(nprocs)]
+    count = partial(_get_word_sketch_from_pdfs, path, stemmer=stemmer)
+    with ProcessPoolExecutor(max_workers=nprocs) as executor:
+        sketches = list(executor.map(count, chunks))
+    return reduce(WordSketch.merge, sketches)
+
+
+def _get_tokens_from_pdf(path, filename, stemmer=None):
+    """Reads a pdf file and returns the list of (normalized) words."""
     # Read the pdf
     document = utl.read_pdf(path, filename)
     text = document['text']
@@ -80,11 +136,7 @@ def _get_word_count_from_pdf(path, filename, stemmer=None):
     # Normalize text
     text = utl.normalize_text(text, stemmer=stemmer)
 
-    # Count the appearances of each (normalized) word
-    tokens = text.split()
-    counter = Counter(tokens).most_common()
-
-    return counter
+    return text.split()
 
 
 def _print_nmost_appearances(nmost, counter):
@@ -119,29 +171,94 @@ def _print_pattern_of_interest(pat, counter):
           f'{sum:<{_SPACE_COUNT}}{spw:<{_SPACE_COUNTWORD}.6f}')
 
 
+def _print_sketch_appearances(nmost, sketch):
+    """Prints the `nmost` most occurring words of a sketch together with the
+    estimated count and its error bound in the form
+        |    Word    |    Count    |    Error    |
+    """
+    print(f'{" " * _SPACE_INDENT}{"WORD":{_SPACE_WORDS}}'
+          f'{"COUNT":{_SPACE_COUNT}}{"ERROR":<{_SPACE_ERROR}}')
+    print(f'{" " * _SPACE_INDENT}{hline[_SPACE_INDENT:]}')
+    for word, count, error in sketch.most_common(nmost):
+        print(f'{" " * _SPACE_INDENT}{word:{_SPACE_WORDS}}'
+              f'{count:<{_SPACE_COUNT}}{error:<{_SPACE_ERROR}}')
+
+
+def _print_sketch_pattern(pat, sketch):
+    """Print the most occurring words of a sketch that match a given pattern
+    in the form:
+        |   Place   |   Word    |    (Count +- Error)    |
+    followed by the exact sum over all the matching words.
+    """
+    print(f"{' ' * _SPACE_INDENT}Pattern r'{pat}'")
+    for i, (word, count, error) in enumerate(sketch.most_common()):
+        if re.search(pat, word) is not None:
+            print(f'{" " * _SPACE_INDENT * 2}{i + 1:4d} {word} '
+                  f'({count}x, error {error})')
+    total = sketch.pattern_sum(pat)
+    spw = total / max(sketch.nwords, 1)
+    print(f'{" " * _SPACE_INDENT}{"SUM":{_SPACE_WORDS}}'
+          f'{total:<{_SPACE_COUNT}}{spw:<{_SPACE_COUNTWORD}.6f}')
+
+
+def _parse_args():
+    """Parses the command line arguments."""
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--approx', action='store_true',
+                        help='count the words of all files by a sketch of '
+                             'fixed size')
+    parser.add_argument('--nprocs', type=int, default=1,
+                        help='number of worker processes (with --approx)')
+    prof.add_profile_argument(parser)
+    return parser.parse_args()
+
+
 if __name__ == '__main__':
+    args = _parse_args()
 
-    # Normalization settings
-    stemmer = 'spacy'        # None, 'nltk', 'spacy', or 'personal'
+    with prof.profile('print_word_counts', args.profile):
+        # Normalization settings
+        stemmer = 'spacy'        # None, 'nltk', 'spacy', or 'personal'
 
-    # How many of the most appearing words to show
-    nmost = 50
+        # How many of the most appearing words to show
+        nmost = 50
 
-    # Generate and print the pdf statistics
-    for filename in _FILENAMES:
-        # Get the word count
-        counter = _get_word_count_from_pdf(PATH_DATA_RAW, filename, stemmer)
+        hline = '-' * (_SPACE_INDENT + _SPACE_WORDS + _SPACE_COUNT +
+                       _SPACE_COUNTWORD)
 
-        # Print the Title
-        hline = '-' * (_SPACE_INDENT + _SPACE_WORDS + _SPACE_COUNT + _SPACE_COUNTWORD)
-        print('\n' + hline)
-        print(f'File {filename}')
-        print('')
+        # Approximate statistics of all the files together
+        if args.approx:
+            with prof.stage('count'):
+                sketch = _get_word_sketch_parallel(PATH_DATA_RAW, _FILENAMES,
+                                                   stemmer, args.nprocs)
 
-        # Print statistics for all patterns of interest
-        for pat in PATTERNS_OF_INTEREST:
-            _print_pattern_of_interest(pat, counter)
+            print('\n' + hline)
+            print(f'Files {", ".join(_FILENAMES)} ({sketch.nwords} words, '
+                  f'sketch of {sketch.nbytes / 2**20:.1f} MB, error bound '
+                  f'{sketch.epsilon * sketch.nwords:.0f} with probability '
+                  f'{1 - sketch.delta})')
             print('')
+            for pat in PATTERNS_OF_INTEREST:
+                _print_sketch_pattern(pat, sketch)
+                print('')
+            _print_sketch_appearances(nmost, sketch)
+
+        # Generate and print the pdf statistics
+        for filename in _FILENAMES if not args.approx else []:
+            # Get the word count
+            with prof.stage('count'):
+                counter = _get_word_count_from_pdf(PATH_DATA_RAW, filename,
+                                                   stemmer)
+
+            # Print the Title
+            print('\n' + hline)
+            print(f'File {filename}')
+            print('')
+
+            # Print statistics for all patterns of interest
+            for pat in PATTERNS_OF_INTEREST:
+                _print_pattern_of_interest(pat, counter)
+                print('')
 
-        # Print the appearances
-        _print_nmost_appearances(nmost, counter)
+            # Print the appearances
+            _print_nmost_appearances(nmost, counter)
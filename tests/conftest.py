@@ -0,0 +1,67 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Fixtures shared by the tests of `make_dataset`.
+"""
+
+# -------------------------------------------------------------------------
+#   Author(s): Christoph Jaeggli
+#   Institute: (None)
+#
+#   MIT License
+#   Copyright (c) 2020 Christoph Jaeggli
+#
+#   This program is distributed in the hope that it will be useful, but
+#   WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+
+# Standard library
+import json
+# Third party requirements
+import pytest
+# Local imports
+import src.data._catalog as catalog_module
+import src.data.make_dataset as make_dataset
+import src.utils as utl
+
+# Constants
+_SENTENCES = [
+    'die kunden sind zufrieden',
+    'die mitarbeitenden sind motiviert',
+]
+
+
+@pytest.fixture
+def corpus(tmp_path, monkeypatch):
+    """Raw files, cached sentences, and processed data sets of two reports
+    (the second one lacks the mood of the pattern 'kunde[n]?').
+    """
+    paths = {name: tmp_path / name for name in ['raw', 'interim',
+                                                'processed']}
+    for path in paths.values():
+        path.mkdir()
+    monkeypatch.setattr(make_dataset, 'PATH_DATA_INTERIM', paths['interim'])
+    monkeypatch.setattr(make_dataset, 'PATH_DATA_PROCESSED',
+                        paths['processed'])
+    monkeypatch.setattr(make_dataset, 'PATH_DATA_LEASES',
+                        tmp_path / 'leases')
+    monkeypatch.setattr(make_dataset, 'PATH_DATA_SENTENCES',
+                        paths['processed'] / 'sentences')
+    monkeypatch.setattr(catalog_module, 'PATH_DATA_PROCESSED',
+                        paths['processed'])
+    monkeypatch.setattr(utl, '_score_sentence', lambda sent: (0.5, 0.5))
+
+    pairs = []
+    for filename, patterns in [('Company_2019', ['kunde[n]?']),
+                               ('Company_2020', [])]:
+        pdf_file = paths['raw'] / f'{filename}.pdf'
+        json_file = paths['raw'] / f'{filename}.json'
+        pdf_file.write_bytes(b'%PDF-1.4')
+        json_file.write_text(json.dumps({'Metadata': {'Year': 2019}}))
+        pairs.append((pdf_file, json_file))
+
+        make_dataset.save_sentences(filename, _SENTENCES)
+        data = {'Metadata': {'Filename': filename, 'Year': 2019},
+                'Data': {}}
+        make_dataset.score_sentences(data, _SENTENCES, patterns=patterns)
+        make_dataset.save_dataset(filename, data)
+    return pairs
@@ -0,0 +1,36 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Tests of the figure fingerprints of `utils.save_fig`.
+"""
+
+# -------------------------------------------------------------------------
+#   Author(s): Christoph Jaeggli
+#   Institute: (None)
+#
+#   MIT License
+#   Copyright (c) 2020 Christoph Jaeggli
+#
+#   This program is distributed in the hope that it will be useful, but
+#   WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+
+# Standard library
+# Third party requirements
+import matplotlib
+matplotlib.use('Agg')
+import matplotlib.pyplot as plt
+# Local imports
+import src.utils as utl
+
+
+def test_fingerprint_is_stored_per_format(tmp_path):
+    fig = plt.figure()
+    utl.save_fig(tmp_path, 'profit', fig, format=['svg', 'png'],
+                 fingerprint='old')
+    utl.save_fig(tmp_path, 'profit', fig, format='svg', fingerprint='new')
+    plt.close(fig)
+
+    assert utl.is_fig_up_to_date(tmp_path, 'profit', 'new', format='svg')
+    assert not utl.is_fig_up_to_date(tmp_path, 'profit', 'new',
+                                     format=['svg', 'png'])
+    assert utl.is_fig_up_to_date(tmp_path, 'profit', 'old', format='png')
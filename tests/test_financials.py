@@ -0,0 +1,45 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Tests of the local cache of `_financials.FinancialsLoader`.
+"""
+
+# -------------------------------------------------------------------------
+#   Author(s): Christoph Jaeggli
+#   Institute: (None)
+#
+#   MIT License
+#   Copyright (c) 2020 Christoph Jaeggli
+#
+#   This program is distributed in the hope that it will be useful, but
+#   WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+
+# Standard library
+import json
+import os
+# Third party requirements
+# Local imports
+from src.data._financials import FinancialsLoader, build_standin
+
+
+def _build(tmp_path, profit):
+    file = tmp_path / 'Company_2019.json'
+    file.write_text(json.dumps({
+        'Metadata': {'Year': 2019},
+        'Data': {'Premium': 1, 'Profit': profit, 'Equity': 2},
+    }))
+    build_standin([file], path=tmp_path / 'financials.sqlite')
+
+
+def test_cache_follows_the_standin_database(tmp_path):
+    _build(tmp_path, profit=10)
+    loader = FinancialsLoader('sqlite', cache=tmp_path / 'financials.csv',
+                              path=tmp_path / 'financials.sqlite')
+    assert loader.load([('Company', 2019)])['Profit'].tolist() == [10]
+
+    # Rebuilt database is newer than the cache
+    _build(tmp_path, profit=99)
+    mtime = (tmp_path / 'financials.csv').stat().st_mtime
+    os.utime(tmp_path / 'financials.sqlite', (mtime + 1, mtime + 1))
+    assert loader.load([('Company', 2019)])['Profit'].tolist() == [99]
+    loader.close()
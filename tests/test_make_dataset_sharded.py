@@ -0,0 +1,35 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Tests of `make_dataset.make_dataset_sharded` together with the catalog.
+"""
+
+# -------------------------------------------------------------------------
+#   Author(s): Christoph Jaeggli
+#   Institute: (None)
+#
+#   MIT License
+#   Copyright (c) 2020 Christoph Jaeggli
+#
+#   This program is distributed in the hope that it will be useful, but
+#   WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+
+# Standard library
+# Third party requirements
+# Local imports
+import src.data._catalog as catalog_module
+import src.data.make_dataset as make_dataset
+
+
+def test_sharded_marks_up_to_date_documents_as_processed(corpus, tmp_path):
+    path = tmp_path / 'catalog.sqlite'
+    catalog = catalog_module.Catalog(path)
+    catalog.register(corpus)
+    assert catalog_module.get_processed_files(path=path) == []
+
+    processed = make_dataset.make_dataset_sharded(corpus, worker_id='first',
+                                                  catalog=catalog)
+
+    assert processed == []
+    files = catalog_module.get_processed_files(path=path)
+    assert [file.stem for file in files] == ['Company_2019', 'Company_2020']
@@ -0,0 +1,77 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Tests of the MinHash signatures of `_sentence_dedup.SentenceDeduplicator`.
+"""
+
+# -------------------------------------------------------------------------
+#   Author(s): Christoph Jaeggli
+#   Institute: (None)
+#
+#   MIT License
+#   Copyright (c) 2020 Christoph Jaeggli
+#
+#   This program is distributed in the hope that it will be useful, but
+#   WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+
+# Standard library
+import random
+# Third party requirements
+import numpy as np
+# Local imports
+from src.features._sentence_dedup import SentenceDeduplicator
+
+# Constants
+_NPAIRS = 200
+_NPERM = 256
+_VOCABULARY = [f'wort{i}' for i in range(60)]
+
+
+def _get_bigrams(sentence):
+    words = sentence.split()
+    return {' '.join(words[i:i + 2]) for i in range(max(len(words) - 1, 1))}
+
+
+def _get_jaccard(first, second):
+    first, second = _get_bigrams(first), _get_bigrams(second)
+    return len(first & second) / len(first | second)
+
+
+def _get_pairs(rng):
+    """Returns random sentence pairs sharing a random share of their words."""
+    pairs = []
+    for _ in range(_NPAIRS):
+        words = rng.choices(_VOCABULARY, k=rng.randrange(8, 30))
+        other = [word if rng.random() < rng.random() else
+                 rng.choice(_VOCABULARY) for word in words]
+        pairs.append((' '.join(words), ' '.join(other)))
+    return pairs
+
+
+def test_similarity_estimates_jaccard(tmp_path):
+    dedup = SentenceDeduplicator(tmp_path / 'scores.sqlite', nperm=_NPERM,
+                                 nbands=16, seed=0)
+    errors = []
+    for first, second in _get_pairs(random.Random(0)):
+        similarity = np.mean(dedup._get_signature(first) ==
+                             dedup._get_signature(second))
+        errors.append(similarity - _get_jaccard(first, second))
+
+    # Standard deviation of the estimate is at most 0.5 / sqrt(_NPERM)
+    assert abs(np.mean(errors)) < 0.02
+    assert np.max(np.abs(errors)) < 6 * 0.5 / np.sqrt(_NPERM)
+
+
+def test_unrelated_sentences_are_not_duplicates(tmp_path):
+    dedup = SentenceDeduplicator(tmp_path / 'scores.sqlite', seed=0)
+    dedup.add({'Die Kunden sind mit dem Service sehr zufrieden': (0.5, 0.6)})
+
+    exact, near = dedup.lookup([
+        'Die Kunden sind mit dem Service sehr zufrieden',
+        'Die Kunden sind mit dem Service sehr zufrieden gewesen',
+        'Die Mitarbeitenden haben das Projekt termingerecht abgeschlossen',
+        'Die Kunden haben die Preise im Vorjahr deutlich kritisiert',
+    ])
+    assert list(exact) == ['Die Kunden sind mit dem Service sehr zufrieden']
+    assert list(near) == ['Die Kunden sind mit dem Service sehr zufrieden '
+                          'gewesen']
@@ -0,0 +1,62 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Tests of `make_dataset.update_patterns` together with the catalog.
+"""
+
+# -------------------------------------------------------------------------
+#   Author(s): Christoph Jaeggli
+#   Institute: (None)
+#
+#   MIT License
+#   Copyright (c) 2020 Christoph Jaeggli
+#
+#   This program is distributed in the hope that it will be useful, but
+#   WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+
+# Standard library
+# Third party requirements
+# Local imports
+from src.features._sentence_store import SentenceStore, get_patterns,\
+    get_sentence_file, write_sentences
+import src.data._catalog as catalog_module
+import src.data.make_dataset as make_dataset
+
+
+def test_update_patterns_marks_documents_as_processed(corpus, tmp_path):
+    path = tmp_path / 'catalog.sqlite'
+    catalog = catalog_module.Catalog(path)
+    catalog.register(corpus)
+    assert catalog_module.get_processed_files(path=path) == []
+
+    counts = make_dataset.update_patterns(corpus, patterns=['kunde[n]?'],
+                                          catalog=catalog)
+
+    assert counts == {'Updated': 1, 'Unchanged': 1, 'Generated': 0}
+    files = catalog_module.get_processed_files(path=path)
+    assert [file.stem for file in files] == ['Company_2019', 'Company_2020']
+    assert list(make_dataset.load_dataset('Company_2020')['Data']['Mood']) \
+        == ['kunde[n]?']
+
+
+def test_update_patterns_rewrites_sentence_files(corpus):
+    path = make_dataset.PATH_DATA_SENTENCES
+    for pdf_file, _ in corpus:
+        sentences = make_dataset.load_sentences(pdf_file.stem)
+        make_dataset.save_sentences(pdf_file.stem, sentences, pages=[0, 1])
+    write_sentences(get_sentence_file(path, 'Company_2019'), 'Company_2019',
+                    2019, make_dataset.load_sentences('Company_2019'),
+                    [0, 1], ['kunde[n]?'],
+                    {'die kunden sind zufrieden': (0.25, 0.75)})
+
+    patterns = ['kunde[n]?', 'mitarbeitend']
+    make_dataset.update_patterns(corpus, patterns=patterns, store=True)
+
+    store = SentenceStore(path)
+    for file in store.get_files():
+        table = store.read_file(file)
+        assert get_patterns(table.schema) == patterns
+    table = store.read(patterns=['mitarbeitend'], scored=True)
+    assert table['Polarity'].to_pylist() == [0.5, 0.5]
+    table = store.read(patterns=['kunde[n]?'], scored=True)
+    assert table['Polarity'].to_pylist() == [0.25, 0.5]
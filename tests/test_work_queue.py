@@ -0,0 +1,63 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Tests of the lease files of `_work_queue.LeaseQueue`.
+"""
+
+# -------------------------------------------------------------------------
+#   Author(s): Christoph Jaeggli
+#   Institute: (None)
+#
+#   MIT License
+#   Copyright (c) 2020 Christoph Jaeggli
+#
+#   This program is distributed in the hope that it will be useful, but
+#   WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+
+# Standard library
+import os
+# Third party requirements
+# Local imports
+from src.data._work_queue import LeaseQueue
+
+
+def test_release_frees_own_lease(tmp_path):
+    queue = LeaseQueue(tmp_path, worker_id='first')
+    assert queue.try_claim('Company_2019')
+    queue.release('Company_2019')
+
+    assert list(tmp_path.iterdir()) == []
+    assert LeaseQueue(tmp_path, worker_id='second').try_claim('Company_2019')
+
+
+def test_release_keeps_reclaimed_lease(tmp_path):
+    first = LeaseQueue(tmp_path, ttl=10., worker_id='first')
+    second = LeaseQueue(tmp_path, ttl=10., worker_id='second')
+    assert first.try_claim('Company_2019')
+
+    # Lease of the first worker expires and the second one reclaims it
+    file = tmp_path / 'Company_2019.lease'
+    os.utime(file, (0., 0.))
+    assert second.try_claim('Company_2019')
+
+    first.release('Company_2019')
+    assert [path.name for path in tmp_path.iterdir()] == \
+        ['Company_2019.lease']
+    assert not first.try_claim('Company_2019')
+    second.release('Company_2019')
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_renew_keeps_reclaimed_lease(tmp_path):
+    first = LeaseQueue(tmp_path, ttl=10., worker_id='first')
+    second = LeaseQueue(tmp_path, ttl=10., worker_id='second')
+    assert first.try_claim('Company_2019')
+    assert first.renew('Company_2019')
+
+    file = tmp_path / 'Company_2019.lease'
+    os.utime(file, (0., 0.))
+    assert second.try_claim('Company_2019')
+    os.utime(file, (1., 1.))
+
+    assert not first.renew('Company_2019')
+    assert file.stat().st_mtime == 1.